@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Benchmarks of the Enigma simulator, written as JSON and compared to a baseline.
+
+Run from the repository root:
+
+    python3 benchmarks/run.py --output results.json --baseline benchmarks/baseline.json
+
+Every result is a number with a unit; letters/s results are better when higher,
+s/call results when lower. A result is flagged as a regression when it is worse
+than the baseline by more than the threshold, and the script then exits with 1.
+"""
+
+from copy import copy
+from pathlib import Path
+from random import Random
+from string import ascii_uppercase
+from typing import Callable
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import timeit
+
+# modules of the simulator are imported by name, as the tests do from src/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# pylint: disable=wrong-import-position
+from machine import BACKENDS, Enigma  # noqa: E402
+from rotors import (  # noqa: E402
+    ROTOR_I,
+    ROTOR_II,
+    ROTOR_III,
+    PLUGBOARD_EMPTY,
+    REFLECTOR_B,
+)
+from vectorized import NUMPY_AVAILABLE  # noqa: E402
+
+# multipliers of the size suffixes accepted on the command line
+SUFFIXES: dict[str, int] = {"K": 1_000, "M": 1_000_000}
+
+# units of the results, and whether a higher value is better
+UNITS: dict[str, bool] = {"letters/s": True, "s/call": False}
+
+
+def parse_size(size: str) -> int:
+    """Turn a size such as "10K" or "100M" into a number of letters.
+
+    :param size: number of letters, optionally followed by K or M
+    :type size: str
+    :returns: number of letters
+    :rtype: int
+    :raises ValueError: if size is not a positive number
+    :example: parse_size("10K") -> 10000
+
+    """
+
+    size = size.strip().upper()
+    multiplier: int = SUFFIXES.get(size[-1:], 1)
+
+    if size[-1:] in SUFFIXES:
+        size = size[:-1]
+
+    if not size.isdigit() or int(size) == 0:
+        raise ValueError(f"Size must be a positive number of letters: {size}.")
+
+    return int(size) * multiplier
+
+
+def build_machine() -> Enigma:
+    """Build machine with config B-I-II-III, as the CLI does.
+
+    :returns: machine with fresh copies of the default components
+    :rtype: Enigma
+    :example: build_machine() -> Enigma(...)
+
+    """
+
+    return Enigma(
+        rotors=[copy(ROTOR_III), copy(ROTOR_II), copy(ROTOR_I)],
+        plugboard=copy(PLUGBOARD_EMPTY),
+        reflector=copy(REFLECTOR_B),
+    )
+
+
+def best_time(function: Callable[[], object], min_time: float, repeat: int) -> float:
+    """Run a function until `min_time` has passed or it ran `repeat` times.
+    A first untimed run fills caches, such as the keystream tables.
+
+    :param function: function to be timed
+    :type function: Callable[[], object]
+    :param min_time: seconds after which no new run is started
+    :type min_time: float
+    :param repeat: most runs
+    :type repeat: int
+    :returns: seconds of the fastest run
+    :rtype: float
+    :example: best_time(lambda: machine.encrypt(text), 0.5, 5) -> 0.021
+
+    """
+
+    function()
+
+    best: float = float("inf")
+    deadline: float = time.perf_counter() + min_time
+
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+        if time.perf_counter() >= deadline:
+            break
+
+    return best
+
+
+def bench_encrypt(
+    sizes: list[int], backend: str, verbose: bool, min_time: float, repeat: int
+) -> dict[str, dict]:
+    """Measure letters/s of `Enigma.encrypt` for each message size.
+    Output of verbose runs is thrown away, so printing is measured but not shown.
+
+    :param sizes: numbers of letters to encrypt
+    :type sizes: list[int]
+    :param backend: backend to encrypt with
+    :type backend: str
+    :param verbose: whether to encrypt with verbose on
+    :type verbose: bool
+    :param min_time: seconds after which no new run of a size is started
+    :type min_time: float
+    :param repeat: most runs of each size
+    :type repeat: int
+    :returns: results by name
+    :rtype: dict[str, dict]
+    :example: bench_encrypt([1000], "reference", False, 0.5, 5) -> {"encrypt/reference/1000": {...}}
+
+    """
+
+    random: Random = Random(0)
+    results: dict[str, dict] = {}
+
+    for size in sizes:
+        plaintext: str = "".join(random.choices(ascii_uppercase, k=size))
+
+        def run(plaintext: str = plaintext) -> None:
+            """Encrypt the message of this size with a fresh machine."""
+
+            machine: Enigma = build_machine()
+            with contextlib.redirect_stdout(io.StringIO() if verbose else sys.stdout):
+                machine.encrypt(plaintext, verbose=verbose, backend=backend)
+
+        name: str = f"encrypt/{backend}{'/verbose' if verbose else ''}/{size}"
+        results[name] = {
+            "value": size / best_time(run, min_time, repeat),
+            "unit": "letters/s",
+        }
+
+    return results
+
+
+def bench_calls(min_time: float) -> dict[str, dict]:
+    """Measure the cost of single rotor calls and of building a machine.
+
+    :param min_time: seconds each call is timed for at least
+    :type min_time: float
+    :returns: results by name
+    :rtype: dict[str, dict]
+    :example: bench_calls(0.2) -> {"call/Rotor.turn": {...}, ...}
+
+    """
+
+    rotor = copy(ROTOR_I)
+    # a turned rotor with a ring setting takes the slowest path of each call
+    rotor.ring_setting = "F"
+    for _ in range(13):
+        rotor.turn()
+
+    calls: dict[str, Callable[[], object]] = {
+        "call/Rotor.encrypt_letter": lambda: rotor.encrypt_letter("Q"),
+        "call/Rotor.reverse_encrypt_letter": lambda: rotor.reverse_encrypt_letter("Q"),
+        "call/Rotor.get_key": rotor.get_key,
+        "call/Rotor.turn": rotor.turn,
+        "call/Enigma": build_machine,
+    }
+
+    results: dict[str, dict] = {}
+
+    for name, call in calls.items():
+        timer: timeit.Timer = timeit.Timer(call)
+        number, elapsed = timer.autorange()
+
+        # keep timing until min_time is reached, taking the best of the runs
+        runs: int = max(1, int(min_time / max(elapsed, 1e-9)))
+        best: float = min([elapsed] + timer.repeat(repeat=runs, number=number))
+
+        results[name] = {"value": best / number, "unit": "s/call"}
+
+    return results
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """Find the results that are worse than the baseline by more than a threshold.
+    Results missing from either side are not compared.
+
+    :param results: results by name
+    :type results: dict[str, dict]
+    :param baseline: baseline results by name
+    :type baseline: dict[str, dict]
+    :param threshold: fraction a result may be worse by, e.g. 0.1 for 10%
+    :type threshold: float
+    :returns: one line per regression
+    :rtype: list[str]
+    :example: compare({"call/Enigma": {"value": 2.0, "unit": "s/call"}}, {"call/Enigma": {"value": 1.0, "unit": "s/call"}}, 0.1) -> ["call/Enigma: ..."]
+
+    """
+
+    regressions: list[str] = []
+
+    for name, result in results.items():
+        if name not in baseline or baseline[name]["unit"] != result["unit"]:
+            continue
+
+        old: float = baseline[name]["value"]
+        new: float = result["value"]
+
+        # change as a fraction of the baseline, positive when worse
+        if UNITS[result["unit"]]:
+            change: float = (old - new) / old
+        else:
+            change = (new - old) / old
+
+        if change > threshold:
+            regressions.append(
+                f"{name}: {new:.4g} {result['unit']} vs {old:.4g} ({change:+.1%} worse)"
+            )
+
+    return regressions
+
+
+def main() -> int:
+    """Run the benchmarks, write their results and compare them to a baseline.
+
+    :returns: exit code, 1 if any result regressed
+    :rtype: int
+    :example: main() -> 0
+
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="1K,10K,100K",
+        help="message sizes of the reference backend, e.g. 1K,1M,100M",
+    )
+    parser.add_argument(
+        "--verbose-sizes",
+        default="1K,10K",
+        help="message sizes encrypted with verbose on",
+    )
+    parser.add_argument(
+        "--backend-sizes",
+        default="1K,100K,1M",
+        help="message sizes of the other backends",
+    )
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="file to write results to")
+    parser.add_argument("--baseline", type=Path, help="results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fraction a result may be worse than the baseline by",
+    )
+    arguments = parser.parse_args()
+
+    def sizes(option: str) -> list[int]:
+        """Parse a comma-separated list of sizes."""
+
+        return [parse_size(size) for size in option.split(",") if size.strip()]
+
+    results: dict[str, dict] = {}
+    results.update(
+        bench_encrypt(
+            sizes(arguments.sizes),
+            "reference",
+            False,
+            arguments.min_time,
+            arguments.repeat,
+        )
+    )
+    results.update(
+        bench_encrypt(
+            sizes(arguments.verbose_sizes),
+            "reference",
+            True,
+            arguments.min_time,
+            arguments.repeat,
+        )
+    )
+
+    for backend in BACKENDS:
+        if backend == "reference" or (backend == "numpy" and not NUMPY_AVAILABLE):
+            continue
+        results.update(
+            bench_encrypt(
+                sizes(arguments.backend_sizes),
+                backend,
+                False,
+                arguments.min_time,
+                arguments.repeat,
+            )
+        )
+
+    results.update(bench_calls(arguments.min_time))
+
+    for name, result in results.items():
+        print(f"{name:48} {result['value']:12.4g} {result['unit']}")
+
+    report: dict = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    if arguments.output is not None:
+        arguments.output.write_text(
+            json.dumps(report, indent=2) + "\n", encoding="utf-8"
+        )
+
+    if arguments.baseline is None:
+        return 0
+
+    baseline: dict = json.loads(arguments.baseline.read_text(encoding="utf-8"))
+    regressions: list[str] = compare(results, baseline["results"], arguments.threshold)
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with a ciphertext-only attack that ranks rotor settings by index of coincidence."""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import permutations
+from multiprocessing.synchronize import Event
+from string import ascii_uppercase
+from typing import Callable, Iterable, NamedTuple
+import heapq
+import multiprocessing
+import os
+
+from engine import ALPHABET_SIZE
+from formatting import NOT_LETTERS
+from keystream import STATES, TO_NUMBERS, KeystreamTable, order_table, unpack_state
+
+# index of coincidence of German text, which a right decryption gets close to
+GERMAN_IC: float = 0.0762
+
+# start positions tried between two looks at the stop flag
+STOP_EVERY: int = ALPHABET_SIZE**2
+
+# set once any task meets the threshold, so tasks already running stop too
+_STOP: Event | None = None
+
+
+def _init_worker(stop: Event) -> None:
+    """Keep the stop flag of the search in a worker process.
+
+    :param stop: flag set once a task meets the threshold
+    :type stop: Event
+    :returns: None
+    :rtype: None
+    :example: ProcessPoolExecutor(initializer=_init_worker, initargs=(multiprocessing.Event(),))
+
+    """
+
+    global _STOP  # pylint: disable=global-statement
+    _STOP = stop
+
+
+class Candidate(NamedTuple):
+    """Rotor settings ranked by the index of coincidence of their decryption.
+
+    :param score: index of coincidence of the decryption
+    :type score: float
+    :param order: names of the rotors from left to right
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right
+    :type ring_settings: str
+    :param windows: letters on the rotor windows from left to right before the message
+    :type windows: str
+
+    """
+
+    score: float
+    order: tuple[str, ...]
+    ring_settings: str
+    windows: str
+
+
+def index_of_coincidence(counts: list[int]) -> float:
+    """Get the chance that two letters picked from a text are the same.
+
+    :param counts: number of times each letter appears
+    :type counts: list[int]
+    :returns: index of coincidence, 0 for texts under two letters
+    :rtype: float
+    :example: index_of_coincidence([2, 2]) -> 0.3333333333333333
+
+    """
+
+    total: int = sum(counts)
+
+    if total < 2:
+        return 0.0
+
+    return sum(count * (count - 1) for count in counts) / (total * (total - 1))
+
+
+def _search_task(
+    order: tuple[str, ...],
+    ring_settings: str,
+    reflector: str,
+    numbers: bytes,
+    top: int,
+    threshold: float | None,
+) -> tuple[list[Candidate], int]:
+    """Decrypt with every start position of one rotor order and ring setting.
+    The plugboard is left empty, so the keystream table is shared with the bombe.
+
+    :param order: names of the rotors from left to right
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right
+    :type ring_settings: str
+    :param reflector: name of the reflector
+    :type reflector: str
+    :param numbers: ciphertext as letter numbers
+    :type numbers: bytes
+    :param top: number of best candidates to keep
+    :type top: int
+    :param threshold: score at which to stop searching, defaults to never when None
+    :type threshold: float | None
+    :returns: best candidates of the task and number of candidates tried
+    :rtype: tuple[list[Candidate], int]
+    :example: _search_task(("I", "II", "III"), "AAA", "B", numbers, 10, None) -> ([Candidate(...), ...], 17576)
+
+    """
+
+    table: KeystreamTable = order_table(order, ring_settings, reflector)
+    tables: bytes = table.numbers
+    successor = table.successor
+
+    # least good of the kept candidates is at the top of the heap
+    heap: list[tuple[int, int]] = []
+    pairs: int = len(numbers) * (len(numbers) - 1) or 1
+    tried: int = 0
+
+    for start in range(STATES):
+        # another task met the threshold, nothing found here will be kept
+        if _STOP is not None and start % STOP_EVERY == 0 and _STOP.is_set():
+            break
+
+        counts: list[int] = [0] * ALPHABET_SIZE
+        state: int = start
+
+        for number in numbers:
+            state = successor[state]
+            counts[tables[ALPHABET_SIZE * state + number]] += 1
+
+        # unnormalized score keeps the hot loop in integers
+        score: int = sum(count * (count - 1) for count in counts)
+        tried += 1
+
+        if len(heap) < top:
+            heapq.heappush(heap, (score, start))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, start))
+
+        if threshold is not None and score / pairs >= threshold:
+            break
+
+    candidates: list[Candidate] = [
+        Candidate(
+            score=score / pairs,
+            order=order,
+            ring_settings=ring_settings,
+            windows="".join(ascii_uppercase[x] for x in unpack_state(start)[::-1]),
+        )
+        for score, start in heap
+    ]
+
+    return candidates, tried
+
+
+def ciphertext_only_attack(
+    ciphertext: str,
+    rotors: tuple[str, ...] = ("I", "II", "III", "IV", "V"),
+    reflector: str = "B",
+    ring_settings: Iterable[str] = ("AAA",),
+    top: int = 10,
+    threshold: float | None = None,
+    workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> list[Candidate]:
+    """Rank rotor orders, ring settings and start positions by how much their
+    unsteckered decryption looks like language.
+    Each (rotor order, ring setting) pair is searched in a process of its own,
+    which keeps its best candidates; the best of all of them are returned.
+
+    :param ciphertext: intercepted message
+    :type ciphertext: str
+    :param rotors: names of the rotors that may be used, defaults to I to V
+    :type rotors: tuple[str, ...], optional
+    :param reflector: name of the reflector, defaults to "B"
+    :type reflector: str, optional
+    :param ring_settings: ring settings to try from left to right, defaults to "AAA" only
+    :type ring_settings: Iterable[str], optional
+    :param top: number of best candidates to return, defaults to 10
+    :type top: int, optional
+    :param threshold: index of coincidence at which to stop searching, defaults to never
+    :type threshold: float | None, optional
+    :param workers: number of processes, defaults to the number of CPUs
+    :type workers: int | None, optional
+    :param progress: called with candidates tried so far and candidates in total, defaults to None
+    :type progress: Callable[[int, int], None] | None, optional
+    :returns: best candidates, best first
+    :rtype: list[Candidate]
+    :raises ValueError: if `top` is not positive
+    :example: ciphertext_only_attack(ciphertext, threshold=GERMAN_IC)[0] -> Candidate(score=0.071, ...)
+
+    """
+
+    if top <= 0:
+        raise ValueError("At least one candidate must be kept.")
+
+    numbers: bytes = (
+        NOT_LETTERS.sub("", ciphertext).encode("ascii").translate(TO_NUMBERS)
+    )
+    ring_settings = list(ring_settings)
+    tasks: list[tuple[tuple[str, ...], str]] = [
+        (order, rings) for order in permutations(rotors, 3) for rings in ring_settings
+    ]
+    total: int = STATES * len(tasks)
+    workers = workers or os.cpu_count() or 1
+
+    candidates: list[Candidate] = []
+    tried: int = 0
+
+    def collect(result: tuple[list[Candidate], int]) -> bool:
+        """Merge the result of a task, telling whether the threshold was met."""
+
+        nonlocal tried
+
+        candidates.extend(result[0])
+        tried += result[1]
+
+        if progress is not None:
+            progress(tried, total)
+
+        return threshold is not None and any(
+            candidate.score >= threshold for candidate in result[0]
+        )
+
+    if workers == 1:
+        for order, rings in tasks:
+            result = _search_task(order, rings, reflector, numbers, top, threshold)
+            if collect(result):
+                break
+
+        return heapq.nlargest(top, candidates)
+
+    stop: Event = multiprocessing.Event()
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(stop,)
+    ) as pool:
+        pending: set[Future] = {
+            pool.submit(_search_task, order, rings, reflector, numbers, top, threshold)
+            for order, rings in tasks
+        }
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            # every finished task is collected, even after one meets the threshold
+            met: list[bool] = [collect(future.result()) for future in done]
+
+            if any(met):
+                # nothing else needs to run once a good enough candidate is found:
+                # tasks not started are dropped and running ones stop soon after
+                stop.set()
+                pool.shutdown(wait=False, cancel_futures=True)
+                break
+
+    return heapq.nlargest(top, candidates)
@@ -0,0 +1,324 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with a Turing-Welchman bombe that finds rotor settings from a crib."""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from string import ascii_uppercase
+from typing import Iterable, NamedTuple
+import os
+
+from engine import ALPHABET_SIZE
+from formatting import NOT_LETTERS
+from keystream import STATES, KeystreamTable, order_table, pack_state, unpack_state
+
+# one node per (letter, stecker partner) hypothesis
+NODES: int = ALPHABET_SIZE * ALPHABET_SIZE
+
+
+class Stop(NamedTuple):
+    """Rotor settings at which the bombe stopped.
+
+    :param order: names of the rotors from left to right
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right
+    :type ring_settings: str
+    :param windows: letters on the rotor windows from left to right before the message
+    :type windows: str
+    :param test_letter: menu letter whose stecker partner was tested
+    :type test_letter: str
+    :param steckers: stecker partners of the test letter that survived
+    :type steckers: str
+
+    """
+
+    order: tuple[str, ...]
+    ring_settings: str
+    windows: str
+    test_letter: str
+    steckers: str
+
+
+def build_menu(
+    crib: str, ciphertext: str, offset: int = 0
+) -> list[tuple[int, int, int]]:
+    """Build the menu of a crib placed at an offset of the ciphertext.
+    Letters outside A-Z are ignored in both texts.
+
+    :param crib: plaintext guessed to be in the message
+    :type crib: str
+    :param ciphertext: intercepted message
+    :type ciphertext: str
+    :param offset: letter of the ciphertext the crib starts at, defaults to 0
+    :type offset: int, optional
+    :returns: edges as (plain letter number, cipher letter number, keypress) tuples
+    :rtype: list[tuple[int, int, int]]
+    :raises ValueError: if the crib doesn't fit or encrypts a letter to itself
+    :example: build_menu("WETTER", "QBLTWL") -> [(22, 16, 1), (4, 1, 2), ...]
+
+    """
+
+    crib = NOT_LETTERS.sub("", crib)
+    ciphertext = NOT_LETTERS.sub("", ciphertext)[offset : offset + len(crib)]
+
+    if len(ciphertext) != len(crib) or not crib:
+        raise ValueError("Crib must fit inside the ciphertext.")
+
+    menu: list[tuple[int, int, int]] = []
+
+    for position, (plain, cipher) in enumerate(zip(crib, ciphertext)):
+        # the reflector never lets a letter encrypt to itself
+        if plain == cipher:
+            raise ValueError(
+                f"Crib can't be placed here: {plain} at letter {position}."
+            )
+
+        # keypresses are counted from the first letter of the message
+        menu.append((ord(plain) - 65, ord(cipher) - 65, offset + position + 1))
+
+    return menu
+
+
+def menu_test_letter(menu: list[tuple[int, int, int]]) -> int:
+    """Pick the menu letter with the most connections as the test letter.
+
+    :param menu: edges of the menu
+    :type menu: list[tuple[int, int, int]]
+    :returns: number of the test letter
+    :rtype: int
+    :example: menu_test_letter(build_menu("WETTER", "QBLTWL")) -> 19
+
+    """
+
+    connections: list[int] = [0] * ALPHABET_SIZE
+
+    for plain, cipher, _ in menu:
+        connections[plain] += 1
+        connections[cipher] += 1
+
+    return connections.index(max(connections))
+
+
+def _find(parent: list[int], node: int) -> int:
+    """Find the root of a node, halving the path on the way.
+
+    :param parent: parent of every node
+    :type parent: list[int]
+    :param node: node to find the root of
+    :type node: int
+    :returns: root of the node
+    :rtype: int
+    :example: _find(list(range(676)), 5) -> 5
+
+    """
+
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+
+    return node
+
+
+def _diagonal_board() -> list[int]:
+    """Join every (a, x) hypothesis to (x, a), since steckers are pairs.
+
+    :returns: parent of every node once the diagonal board is wired
+    :rtype: list[int]
+    :example: _diagonal_board()[27] -> 27
+
+    """
+
+    parent: list[int] = list(range(NODES))
+
+    for letter in range(ALPHABET_SIZE):
+        for partner in range(letter + 1, ALPHABET_SIZE):
+            node: int = ALPHABET_SIZE * partner + letter
+            parent[node] = ALPHABET_SIZE * letter + partner
+
+    return parent
+
+
+# diagonal board is the same for every rotor position
+DIAGONAL_BOARD: list[int] = _diagonal_board()
+
+
+def check_position(
+    scramblers: list[bytes], menu: list[tuple[int, int, int]], test_letter: int
+) -> list[int]:
+    """Propagate stecker hypotheses through the menu at one rotor position.
+    Every hypothesis ends up joined to all those it implies; a hypothesis
+    survives when it implies a single partner for every letter.
+
+    :param scramblers: substitution of the unsteckered machine at each menu edge
+    :type scramblers: list[bytes]
+    :param menu: edges of the menu
+    :type menu: list[tuple[int, int, int]]
+    :param test_letter: number of the letter whose partner is tested
+    :type test_letter: int
+    :returns: numbers of the surviving stecker partners of the test letter
+    :rtype: list[int]
+    :example: check_position(scramblers, menu, 19) -> [4]
+
+    """
+
+    parent: list[int] = DIAGONAL_BOARD[:]
+
+    # plain steckered to x means cipher steckered to whatever the scrambler turns x into
+    for (plain, cipher, _), scrambler in zip(menu, scramblers):
+        plain *= ALPHABET_SIZE
+        cipher *= ALPHABET_SIZE
+        for partner in range(ALPHABET_SIZE):
+            root_a: int = _find(parent, plain + partner)
+            root_b: int = _find(parent, cipher + scrambler[partner])
+            if root_a != root_b:
+                parent[root_a] = root_b
+
+    first: int = ALPHABET_SIZE * test_letter
+    roots: list[int] = [
+        _find(parent, first + partner) for partner in range(ALPHABET_SIZE)
+    ]
+
+    # hypotheses implying another partner for the test letter are contradictions
+    candidates: set[int] = {root for root in roots if roots.count(root) == 1}
+
+    if not candidates:
+        return []
+
+    # ... and so are those implying two partners for any other letter
+    seen: dict[tuple[int, int], int] = {}
+    contradicted: set[int] = set()
+
+    for node in range(NODES):
+        root: int = _find(parent, node)
+        if root not in candidates:
+            continue
+
+        letter: int = node // ALPHABET_SIZE
+        if seen.setdefault((root, letter), node) != node:
+            contradicted.add(root)
+
+    return [
+        partner
+        for partner, root in enumerate(roots)
+        if root in candidates and root not in contradicted
+    ]
+
+
+def _search_order(
+    order: tuple[str, ...],
+    ring_settings: str,
+    reflector: str,
+    menu: list[tuple[int, int, int]],
+    windows: list[str] | None,
+) -> list[Stop]:
+    """Run the bombe over every start position of one rotor order.
+
+    :param order: names of the rotors from left to right
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right
+    :type ring_settings: str
+    :param reflector: name of the reflector
+    :type reflector: str
+    :param menu: edges of the menu
+    :type menu: list[tuple[int, int, int]]
+    :param windows: start positions to try, defaults to all of them when None
+    :type windows: list[str] | None
+    :returns: stops of this rotor order
+    :rtype: list[Stop]
+    :example: _search_order(("I", "II", "III"), "AAA", "B", menu, None) -> [Stop(...), ...]
+
+    """
+
+    table: KeystreamTable = order_table(order, ring_settings, reflector)
+    numbers: bytes = table.numbers
+    test_letter: int = menu_test_letter(menu)
+
+    if windows is None:
+        starts: Iterable[int] = range(STATES)
+    else:
+        # windows are read from left to right, states from right to left
+        starts = [
+            pack_state([ord(letter) - 65 for letter in reversed(window)])
+            for window in windows
+        ]
+
+    stops: list[Stop] = []
+
+    for start in starts:
+        scramblers: list[bytes] = []
+        for _, _, keypress in menu:
+            state: int = ALPHABET_SIZE * table.state_at(start, keypress)
+            scramblers.append(numbers[state : state + ALPHABET_SIZE])
+
+        steckers: list[int] = check_position(scramblers, menu, test_letter)
+
+        if steckers:
+            offsets: list[int] = unpack_state(start)
+            stops.append(
+                Stop(
+                    order=order,
+                    ring_settings=ring_settings,
+                    windows="".join(ascii_uppercase[x] for x in reversed(offsets)),
+                    test_letter=ascii_uppercase[test_letter],
+                    steckers="".join(ascii_uppercase[x] for x in steckers),
+                )
+            )
+
+    return stops
+
+
+def run_bombe(
+    crib: str,
+    ciphertext: str,
+    offset: int = 0,
+    rotors: tuple[str, ...] = ("I", "II", "III", "IV", "V"),
+    reflector: str = "B",
+    ring_settings: str = "AAA",
+    windows: list[str] | None = None,
+    workers: int | None = None,
+) -> list[Stop]:
+    """Find the rotor orders and start positions consistent with a crib.
+    Every order of three rotors out of `rotors` is searched in its own process.
+
+    :param crib: plaintext guessed to be in the message
+    :type crib: str
+    :param ciphertext: intercepted message
+    :type ciphertext: str
+    :param offset: letter of the ciphertext the crib starts at, defaults to 0
+    :type offset: int, optional
+    :param rotors: names of the rotors that may be used, defaults to I to V
+    :type rotors: tuple[str, ...], optional
+    :param reflector: name of the reflector, defaults to "B"
+    :type reflector: str, optional
+    :param ring_settings: ring setting letters from left to right, defaults to "AAA"
+    :type ring_settings: str, optional
+    :param windows: start positions to try from left to right, defaults to all of them
+    :type windows: list[str] | None, optional
+    :param workers: number of processes, defaults to the number of CPUs
+    :type workers: int | None, optional
+    :returns: every stop, by rotor order and start position
+    :rtype: list[Stop]
+    :raises ValueError: if the crib doesn't fit or encrypts a letter to itself
+    :example: run_bombe("WETTERVORHERSAGE", ciphertext) -> [Stop(order=("II", "IV", "I"), ...), ...]
+
+    """
+
+    menu: list[tuple[int, int, int]] = build_menu(crib, ciphertext, offset)
+    orders: list[tuple[str, ...]] = list(permutations(rotors, 3))
+    workers = workers or os.cpu_count() or 1
+
+    arguments: list[list] = [
+        orders,
+        [ring_settings] * len(orders),
+        [reflector] * len(orders),
+        [menu] * len(orders),
+        [windows] * len(orders),
+    ]
+
+    if workers == 1:
+        results: Iterable[list[Stop]] = map(_search_order, *arguments)
+        return [stop for stops in results for stop in stops]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(orders))) as pool:
+        results = pool.map(_search_order, *arguments)
+        return [stop for stops in results for stop in stops]
@@ -0,0 +1,402 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with an immutable machine configuration that machines are cloned from."""
+
+from string import ascii_uppercase
+from typing import Iterable
+
+from engine import (
+    ALPHABET_SIZE,
+    LETTER_INDEX,
+    CompiledEnigma,
+    rotor_notch_offsets,
+    turn_rotors_to,
+)
+from formatting import DEFAULT_FORMAT, TextFormat
+from machine import Enigma
+from metrics import Metrics
+from rotors import REFLECTORS, ROTORS, Rotor, Stator
+from tracing import Tracer
+from utils import check_key, switch
+
+
+class MachineConfig:
+    """Wiring of a machine, apart from where its rotors are.
+    Keys are checked once; machines built from a config copy its template
+    rotors and share its compiled tables, so building one is cheap.
+    Configs can't be changed once built, so they can be shared freely.
+
+    :param rotors: character mappings of each rotor at window A; right-most rotor first
+    :type rotors: tuple[str, ...]
+    :param notches: letters on the window of each rotor when it turns its neighbour
+    :type notches: tuple[str, ...]
+    :param ring_settings: ring setting letter of each rotor
+    :type ring_settings: tuple[str, ...]
+    :param plugboard: character mappings of the plugboard, defaults to no plugs
+    :type plugboard: str, optional
+    :param reflector: character mappings of the reflector, defaults to reflector B
+    :type reflector: str, optional
+    :returns: MachineConfig
+    :rtype: MachineConfig
+    :raises ValueError: if a key is wrong or the rotor settings don't match up
+    :example: MachineConfig(rotors=("BDFHJLCPRTXVZNYEIWGAKMUSQO", ...), notches=("V", "E", "Q"), ring_settings=("A", "A", "A"))
+
+    """
+
+    __slots__ = (
+        "rotors",
+        "notches",
+        "ring_settings",
+        "plugboard",
+        "reflector",
+        "_templates",
+        "_engine",
+    )
+
+    # what each slot holds, set with `object.__setattr__` since configs are frozen
+    rotors: tuple[str, ...]
+    notches: tuple[str, ...]
+    ring_settings: tuple[str, ...]
+    plugboard: str
+    reflector: str
+    _templates: tuple[Rotor, ...]
+    _engine: CompiledEnigma | None
+
+    def __init__(
+        self,
+        rotors: tuple[str, ...],
+        notches: tuple[str, ...],
+        ring_settings: tuple[str, ...],
+        plugboard: str = ascii_uppercase,
+        reflector: str = REFLECTORS["B"].key,
+    ) -> None:
+        """Check the keys and build the template components."""
+
+        if not len(rotors) == len(notches) == len(ring_settings):
+            raise ValueError("Every rotor needs a notch and a ring setting.")
+
+        # rotors beyond the third never turn, but the first three always do
+        if len(rotors) < 3:
+            raise ValueError("A machine needs at least three rotors.")
+
+        for letter in ring_settings:
+            if len(letter) != 1 or letter not in ascii_uppercase:
+                raise ValueError("Ring settings must be single letters.")
+
+        # a rotor may have several notches, or none at all like the M4's thin rotors
+        for letters in notches:
+            if len(set(letters)) != len(letters) or any(
+                letter not in ascii_uppercase for letter in letters
+            ):
+                raise ValueError("Notches must be distinct letters.")
+
+        # notches are a set, so configs compare equal whatever order they're given in
+        notches = tuple("".join(sorted(letters)) for letters in notches)
+
+        # keys are checked here, by the components, and never again
+        templates: tuple[Rotor, ...] = tuple(
+            Rotor(key=key, notch=notch, current_top="A", ring_setting=ring_setting)
+            for key, notch, ring_setting in zip(rotors, notches, ring_settings)
+        )
+        check_key(plugboard, "plugboard")
+        check_key(reflector, "reflector")
+
+        set_slot = object.__setattr__
+        set_slot(self, "rotors", tuple(rotors))
+        set_slot(self, "notches", tuple(notches))
+        set_slot(self, "ring_settings", tuple(ring_settings))
+        set_slot(self, "plugboard", plugboard)
+        set_slot(self, "reflector", reflector)
+        set_slot(self, "_templates", templates)
+        # compiled on first use, then shared by every machine built from here
+        set_slot(self, "_engine", None)
+
+    @classmethod
+    def from_names(
+        cls,
+        order: Iterable[str],
+        ring_settings: str = "",
+        reflector: str = "B",
+        steckers: Iterable[str] = (),
+    ) -> "MachineConfig":
+        """Build a config out of the default rotors and reflectors.
+
+        :param order: names of the rotors from left to right
+        :type order: Iterable[str]
+        :param ring_settings: ring setting letters from left to right, defaults to all A
+        :type ring_settings: str, optional
+        :param reflector: name of the reflector, defaults to "B"
+        :type reflector: str, optional
+        :param steckers: pairs of letters plugged together, defaults to none
+        :type steckers: Iterable[str], optional
+        :returns: config of those components
+        :rtype: MachineConfig
+        :raises ValueError: if a name is unknown, a stecker isn't a pair of letters or a letter is plugged twice
+        :example: MachineConfig.from_names(("IV", "I", "III"), "AAA", "B", ["AQ", "EZ"])
+
+        """
+
+        order = tuple(order)
+        ring_settings = ring_settings or "A" * len(order)
+
+        unknown: list[str] = [name for name in order if name not in ROTORS]
+        if reflector not in REFLECTORS:
+            unknown.append(reflector)
+        if unknown:
+            raise ValueError(f"Unknown components: {', '.join(unknown)}.")
+
+        if len(ring_settings) != len(order):
+            raise ValueError("Every rotor needs a ring setting.")
+
+        plugboard: str = ascii_uppercase
+        for pair in steckers:
+            if len(pair) != 2 or not set(pair) <= set(ascii_uppercase):
+                raise ValueError(f"Steckers must be pairs of letters: {pair}.")
+            if any(plugboard[ord(x) - 65] != x for x in pair):
+                raise ValueError(f"Letters can only be plugged once: {pair}.")
+            plugboard = switch(plugboard, pair[0], pair[1])
+
+        # rotors are given from left to right, machines keep the right-most first
+        return cls(
+            rotors=tuple(ROTORS[name].init_key for name in reversed(order)),
+            notches=tuple(ROTORS[name].notch for name in reversed(order)),
+            ring_settings=tuple(reversed(ring_settings)),
+            plugboard=plugboard,
+            reflector=REFLECTORS[reflector].key,
+        )
+
+    @classmethod
+    def from_machine(cls, machine: Enigma) -> "MachineConfig":
+        """Get the config of an existing machine.
+
+        :param machine: machine whose wiring is described
+        :type machine: Enigma
+        :returns: config that builds machines wired like this one
+        :rtype: MachineConfig
+        :example: MachineConfig.from_machine(machine).machine(windows=windows_of(machine))
+
+        """
+
+        return cls(
+            rotors=tuple(rotor.base_key for rotor in machine.rotors),
+            # a top letter set apart from the wiring moves the notch with it
+            notches=tuple(
+                "".join(ascii_uppercase[notch] for notch in rotor_notch_offsets(rotor))
+                for rotor in machine.rotors
+            ),
+            ring_settings=tuple(rotor.ring_setting for rotor in machine.rotors),
+            plugboard=machine.plugboard.key,
+            reflector=machine.reflector.key,
+        )
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Refuse any change, since machines share the config."""
+
+        raise AttributeError(f"MachineConfig is immutable: can't set {name}.")
+
+    def __delattr__(self, name: str) -> None:
+        """Refuse any change, since machines share the config."""
+
+        raise AttributeError(f"MachineConfig is immutable: can't delete {name}.")
+
+    def _key(self) -> tuple:
+        """Get the fields that tell configs apart."""
+
+        return (
+            self.rotors,
+            self.notches,
+            self.ring_settings,
+            self.plugboard,
+            self.reflector,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Tell whether two configs wire machines the same way."""
+
+        if not isinstance(other, MachineConfig):
+            return NotImplemented
+
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        """Hash the fields that tell configs apart."""
+
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        """Show the fields that tell configs apart."""
+
+        return (
+            f"MachineConfig(rotors={self.rotors!r}, notches={self.notches!r}, "
+            f"ring_settings={self.ring_settings!r}, plugboard={self.plugboard!r}, "
+            f"reflector={self.reflector!r})"
+        )
+
+    def __reduce__(self) -> tuple:
+        """Pickle the fields only; templates and tables are rebuilt on the other side."""
+
+        return (MachineConfig, self._key())
+
+    def compiled(self) -> CompiledEnigma:
+        """Get the config compiled into integer permutation tables, once.
+
+        :returns: compiled machine shared by every machine built from the config
+        :rtype: CompiledEnigma
+        :example: config.compiled() -> CompiledEnigma(...)
+
+        """
+
+        if self._engine is None:
+            plugboard, reflector = self._stators()
+            engine = CompiledEnigma(list(self._templates), plugboard, reflector)
+            object.__setattr__(self, "_engine", engine)
+
+        return self._engine
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the config, in bytes.
+
+        :returns: size of the keys and of the compiled tables, if compiled yet
+        :rtype: int
+        :example: config.nbytes -> 4290
+
+        """
+
+        keys: int = sum(len(key) for key in self.rotors) + 2 * ALPHABET_SIZE
+
+        return keys + (self._engine.nbytes if self._engine is not None else 0)
+
+    def _stators(self) -> tuple[Stator, Stator]:
+        """Build the plugboard and reflector without checking their keys again."""
+
+        plugboard: Stator = Stator.__new__(Stator)
+        plugboard.key = self.plugboard
+        reflector: Stator = Stator.__new__(Stator)
+        reflector.key = self.reflector
+
+        return plugboard, reflector
+
+    def offsets(self, windows: str = "") -> list[int]:
+        """Get the wiring offset of each rotor for the letters on its window.
+
+        :param windows: letters on the rotor windows from left to right, defaults to all A
+        :type windows: str, optional
+        :returns: wiring offset of each rotor; right-most rotor first
+        :rtype: list[int]
+        :raises ValueError: if there isn't one letter per rotor
+        :example: config.offsets("KDX") -> [23, 3, 10]
+
+        """
+
+        windows = windows or "A" * len(self.rotors)
+
+        if len(windows) != len(self.rotors) or not all(
+            letter in ascii_uppercase for letter in windows
+        ):
+            raise ValueError("Windows must hold one letter per rotor.")
+
+        return [(ord(letter) - 65) % ALPHABET_SIZE for letter in reversed(windows)]
+
+    def machine(
+        self,
+        windows: str = "",
+        tracer: Tracer | None = None,
+        metrics: Metrics | None = None,
+    ) -> Enigma:
+        """Build a machine with its own rotors, set to some window letters.
+
+        :param windows: letters on the rotor windows from left to right, defaults to all A
+        :type windows: str, optional
+        :param tracer: receiver of each encryption step, defaults to None
+        :type tracer: Tracer | None, optional
+        :param metrics: counters and timings to be updated, defaults to None
+        :type metrics: Metrics | None, optional
+        :returns: machine that shares nothing mutable with other machines
+        :rtype: Enigma
+        :raises ValueError: if there isn't one letter per rotor
+        :example: MachineConfig.from_names(("I", "II", "III")).machine("AAZ").encrypt("A") -> " U"
+
+        """
+
+        # copying the attribute dict skips `copy`'s generic protocol and `check_key`
+        rotors: list[Rotor] = []
+        for template in self._templates:
+            rotor: Rotor = Rotor.__new__(Rotor)
+            rotor.__dict__.update(template.__dict__)
+            rotors.append(rotor)
+        turn_rotors_to(rotors, self.offsets(windows))
+
+        plugboard, reflector = self._stators()
+
+        machine: Enigma = Enigma(
+            rotors=rotors,
+            plugboard=plugboard,
+            reflector=reflector,
+            tracer=tracer,
+            metrics=metrics,
+        )
+        # signatures match, so the machine never compiles tables of its own
+        machine._engine = self.compiled()  # pylint: disable=protected-access
+
+        return machine
+
+    def encrypt_batch(
+        self,
+        messages: Iterable[str],
+        start_positions: Iterable[str],
+        text_format: TextFormat = DEFAULT_FORMAT,
+    ) -> list[str]:
+        """Encrypt many messages under this key, each from its own window letters.
+        Messages starting from the same windows go through the same rotor
+        states, so those states are stepped and composed once per start
+        position and every message just looks its letters up in them.
+
+        :param messages: texts to be encrypted
+        :type messages: Iterable[str]
+        :param start_positions: letters on the rotor windows from left to right when each message starts
+        :type start_positions: Iterable[str]
+        :param text_format: how plaintext is normalized and ciphertext laid out, defaults to dropping anything but A-Z and grouping by four
+        :type text_format: TextFormat, optional
+        :returns: encrypted messages, in order, each as `machine(windows).encrypt(message, text_format=text_format)` would give it
+        :rtype: list[str]
+        :raises ValueError: if there isn't one start position per message, or one letter per rotor in each
+        :example: config.encrypt_batch(["HELLO", "WORLD"], ["KDX", "KDX"]) -> [" ...", " ..."]
+
+        """
+
+        # letters are taken out up front, as `Enigma.encrypt` takes them out
+        splits: list[tuple[str, list[str] | None]] = [
+            text_format.split(message) for message in messages
+        ]
+        texts: list[str] = [letters for letters, _ in splits]
+        start_positions = list(start_positions)
+
+        if len(start_positions) != len(texts):
+            raise ValueError("Every message needs a start position.")
+
+        # messages sharing a start position share their keystream
+        groups: dict[str, list[int]] = {}
+        for index, windows in enumerate(start_positions):
+            groups.setdefault(windows, []).append(index)
+
+        engine: CompiledEnigma = self.compiled()
+        ciphertexts: list[str] = [""] * len(texts)
+
+        for windows, indexes in groups.items():
+            # composed table of every keypress, as long as the group's longest message
+            tables: list[str] = engine.tables_ahead(
+                self.offsets(windows), max(len(texts[index]) for index in indexes)
+            )
+
+            for index in indexes:
+                letters: str = "".join(
+                    [
+                        table[LETTER_INDEX[letter]]
+                        for table, letter in zip(tables, texts[index])
+                    ]
+                )
+                # laid out as a fresh machine would, with no letters before these
+                ciphertexts[index] = text_format.join(letters, splits[index][1], 0)
+
+        return ciphertexts
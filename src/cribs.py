@@ -0,0 +1,265 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module that finds where a crib can be placed in long ciphertexts, letting no letter encrypt to itself."""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import compress
+from typing import BinaryIO, Iterable, Iterator, TextIO
+import os
+
+from formatting import NOT_LETTER_BYTES, NOT_LETTERS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the big-integer pass is used instead
+    np = None
+
+# for each letter, a translation that marks where it is with 1 and anything else with 0
+MARKS: dict[int, bytes] = {
+    letter: bytes(int(byte == letter) for byte in range(256))
+    for letter in range(65, 91)
+}
+
+# translation that marks offsets without any clash with 1
+NO_CLASH: bytes = bytes([1] + [0] * 255)
+
+# letters read from an intercept at once, which bounds memory on files of any size
+CHUNK_SIZE: int = 1 << 20
+
+
+def _crib_bytes(crib: str) -> bytes:
+    """Take the letters out of a crib.
+
+    :param crib: plaintext guessed to be in the messages
+    :type crib: str
+    :returns: uppercase ASCII letters of the crib
+    :rtype: bytes
+    :raises ValueError: if the crib has no letters
+    :example: _crib_bytes("WETTER VOR") -> b"WETTERVOR"
+
+    """
+
+    letters: bytes = NOT_LETTERS.sub("", crib).encode("ascii")
+
+    if not letters:
+        raise ValueError("Crib must hold at least one letter.")
+
+    return letters
+
+
+def _positions_numpy(crib: bytes, letters: bytes, start: int = 0) -> array:
+    """Find the offsets without a clash as one vectorized comparison per crib letter.
+
+    :param crib: uppercase ASCII letters of the crib
+    :type crib: bytes
+    :param letters: uppercase ASCII letters of the ciphertext
+    :type letters: bytes
+    :param start: letters of the ciphertext before these, added to every offset, defaults to 0
+    :type start: int, optional
+    :returns: offsets of the ciphertext the crib can start at, ascending
+    :rtype: array
+    :example: _positions_numpy(b"AB", b"BAAB") -> array("q", [0])
+
+    """
+
+    count: int = len(letters) - len(crib) + 1
+    if count <= 0:
+        return array("q")
+
+    cipher: np.ndarray = np.frombuffer(letters, dtype=np.uint8)
+    possible: np.ndarray = np.ones(count, dtype=bool)
+
+    # crib letter i rules out every offset whose letter i of ciphertext is the same
+    for index, letter in enumerate(crib):
+        possible &= cipher[index : index + count] != letter
+
+    offsets: np.ndarray = np.flatnonzero(possible).astype(np.int64) + start
+
+    return array("q", offsets.tobytes())
+
+
+def _positions_bytes(crib: bytes, letters: bytes, start: int = 0) -> array:
+    """Find the offsets without a clash with big-integer shifts, one per crib letter.
+    Each letter of the ciphertext is a byte of an integer that is 1 where the
+    letter is some crib letter, so shifting by a crib position lines clashes
+    up with the offsets they rule out.
+
+    :param crib: uppercase ASCII letters of the crib
+    :type crib: bytes
+    :param letters: uppercase ASCII letters of the ciphertext
+    :type letters: bytes
+    :param start: letters of the ciphertext before these, added to every offset, defaults to 0
+    :type start: int, optional
+    :returns: offsets of the ciphertext the crib can start at, ascending
+    :rtype: array
+    :example: _positions_bytes(b"AB", b"BAAB") -> array("q", [0])
+
+    """
+
+    count: int = len(letters) - len(crib) + 1
+    if count <= 0:
+        return array("q")
+
+    # where each distinct crib letter is in the ciphertext
+    marks: dict[int, int] = {}
+    clashes: int = 0
+
+    for index, letter in enumerate(crib):
+        if letter not in marks:
+            marks[letter] = int.from_bytes(letters.translate(MARKS[letter]), "little")
+        clashes |= marks[letter] >> (8 * index)
+
+    free: bytes = clashes.to_bytes(len(letters), "little")[:count].translate(NO_CLASH)
+
+    return array("q", compress(range(start, start + count), free))
+
+
+def crib_positions(crib: str, ciphertext: str | bytes) -> array:
+    """Find every offset at which a crib can be placed in a ciphertext.
+    Enigma never encrypts a letter to itself, so an offset is ruled out as
+    soon as a crib letter sits over the same ciphertext letter. Letters
+    outside A-Z are ignored in both texts, so offsets are the ones
+    `bombe.run_bombe` takes.
+
+    :param crib: plaintext guessed to be in the message
+    :type crib: str
+    :param ciphertext: intercepted message
+    :type ciphertext: str | bytes
+    :returns: offsets of the ciphertext the crib can start at, ascending
+    :rtype: array
+    :raises ValueError: if the crib has no letters
+    :example: crib_positions("WETTER", ciphertext) -> array("q", [0, 2, 3, ...])
+
+    """
+
+    if isinstance(ciphertext, str):
+        ciphertext = ciphertext.encode("ascii", "ignore")
+
+    letters: bytes = ciphertext.translate(None, NOT_LETTER_BYTES)
+
+    if np is not None:
+        return _positions_numpy(_crib_bytes(crib), letters)
+
+    return _positions_bytes(_crib_bytes(crib), letters)
+
+
+def iter_crib_positions(
+    crib: str,
+    source: Iterable[str | bytes] | BinaryIO | TextIO,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[array]:
+    """Find every offset at which a crib can be placed in a ciphertext read piece by piece.
+    Letters are carried over between pieces, so crib placements across
+    pieces are found too; offsets count letters from the start of the source.
+
+    :param crib: plaintext guessed to be in the message
+    :type crib: str
+    :param source: iterable of str or bytes, or a file object opened in binary or text mode
+    :type source: Iterable[str | bytes] | BinaryIO | TextIO
+    :param chunk_size: most characters read from a file at once, defaults to 1048576
+    :type chunk_size: int, optional
+    :returns: generator of offsets, ascending, a block per piece read
+    :rtype: Iterator[array]
+    :raises ValueError: if the crib has no letters or `chunk_size` is not positive
+    :example: list(iter_crib_positions("WETTER", open("intercepts.txt", "rb"))) -> [array("q", [0, 2, ...]), ...]
+
+    """
+
+    pattern: bytes = _crib_bytes(crib)
+
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+
+    positions = _positions_numpy if np is not None else _positions_bytes
+
+    # file objects are read a chunk at a time, anything else is iterated
+    if hasattr(source, "read"):
+        source = iter(partial(source.read, chunk_size), source.read(0))
+
+    # letters the crib may still start at, and how many letters came before them
+    carry: bytes = b""
+    start: int = 0
+
+    for piece in source:
+        # characters outside ASCII are never letters
+        if isinstance(piece, str):
+            piece = piece.encode("ascii", "ignore")
+
+        letters: bytes = carry + bytes(piece).translate(None, NOT_LETTER_BYTES)
+        found: array = positions(pattern, letters, start)
+
+        if found:
+            yield found
+
+        # the last letters may start a placement that ends in the next piece
+        cut: int = max(len(letters) - len(pattern) + 1, 0)
+        carry = letters[cut:]
+        start += cut
+
+
+def _scan_file(crib: str, path: str, chunk_size: int) -> array:
+    """Find every offset at which a crib can be placed in an intercept file.
+
+    :param crib: plaintext guessed to be in the messages
+    :type crib: str
+    :param path: path of the file
+    :type path: str
+    :param chunk_size: most bytes read at once
+    :type chunk_size: int
+    :returns: offsets of the file's letters the crib can start at, ascending
+    :rtype: array
+    :example: _scan_file("WETTER", "intercepts.txt", 1 << 20) -> array("q", [0, 2, ...])
+
+    """
+
+    found: array = array("q")
+
+    with open(path, "rb") as file:
+        for block in iter_crib_positions(crib, file, chunk_size):
+            found.extend(block)
+
+    return found
+
+
+def scan_files(
+    crib: str,
+    paths: Iterable[str | os.PathLike],
+    workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict[str, array]:
+    """Find every offset at which a crib can be placed in each of many intercept files.
+    Files are streamed, so they can be of any size, and scanned in parallel,
+    one process per file at a time.
+
+    :param crib: plaintext guessed to be in the messages
+    :type crib: str
+    :param paths: paths of the files
+    :type paths: Iterable[str | os.PathLike]
+    :param workers: number of processes, defaults to the number of CPUs
+    :type workers: int | None, optional
+    :param chunk_size: most bytes read from a file at once, defaults to 1048576
+    :type chunk_size: int, optional
+    :returns: offsets of each file's letters the crib can start at, ascending, by path
+    :rtype: dict[str, array]
+    :raises ValueError: if the crib has no letters or `chunk_size` is not positive
+    :example: scan_files("WETTER", ["day1.txt", "day2.txt"]) -> {"day1.txt": array("q", [0, 2, ...]), ...}
+
+    """
+
+    # fail before any process is started
+    _crib_bytes(crib)
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive.")
+
+    paths = [os.fspath(path) for path in paths]
+    workers = workers or os.cpu_count() or 1
+
+    arguments: list[list] = [[crib] * len(paths), paths, [chunk_size] * len(paths)]
+
+    if workers == 1 or len(paths) < 2:
+        return dict(zip(paths, map(_scan_file, *arguments)))
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return dict(zip(paths, pool.map(_scan_file, *arguments)))
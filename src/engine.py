@@ -0,0 +1,814 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module that compiles an Enigma machine configuration into integer permutation tables."""
+
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from string import ascii_uppercase
+import sys
+
+from formatting import NOT_LETTERS, group_text
+from rotors import ALPHABET_SIZE, Rotor, Stator
+
+from utils import letter_to_number
+
+# joint positions of the right-most and middle rotors, which decide every keypress
+PAIRS: int = ALPHABET_SIZE**2
+
+# offset a rotor turns to from each offset; tuples are the quickest to index
+NEXT_OFFSET: tuple[int, ...] = tuple(
+    (offset + 1) % ALPHABET_SIZE for offset in range(ALPHABET_SIZE)
+)
+
+# memory of one composed table: its string, its rotor state key and a dict slot
+COMPOSED_TABLE_BYTES: int = (
+    sys.getsizeof(ascii_uppercase) + sys.getsizeof((0, 0, 0)) + 3 * 8
+)
+
+# memory of one inner path: its table, its rotor state key and a dict slot
+INNER_PATH_BYTES: int = (
+    sys.getsizeof(bytes(ALPHABET_SIZE)) + sys.getsizeof((0, 0)) + 3 * 8
+)
+
+# map every letter the machine can encrypt to its number
+LETTER_INDEX: dict[str, int] = {
+    letter: number for number, letter in enumerate(ascii_uppercase)
+}
+
+
+def key_table(key: str) -> bytes:
+    """Compile character mappings into an integer table.
+
+    :param key: character mappings, where index X holds the letter X is mapped to
+    :type key: str
+    :returns: table where index X holds the number of the letter X is mapped to
+    :rtype: bytes
+    :example: key_table(REFLECTOR_B.key)[0] -> 24
+
+    """
+
+    return bytes(letter_to_number(letter) for letter in key)
+
+
+def rotor_notch_offsets(rotor: Rotor) -> tuple[int, ...]:
+    """Get the wiring offsets at which any of a rotor's notches is on top.
+    Wiring offset and top letter always turn together, so a notch is on top
+    at a fixed offset even if `current_top` was set independently.
+
+    :param rotor: rotor whose notches will be located
+    :type rotor: Rotor
+    :returns: values of `rotor.times_turned` at which a letter of `rotor.notch` is on top, sorted
+    :rtype: tuple[int, ...]
+    :example: rotor_notch_offsets(ROTOR_VI) -> (12, 25)
+
+    """
+
+    return tuple(
+        sorted(
+            (
+                letter_to_number(notch)
+                - letter_to_number(rotor.current_top)
+                + rotor.times_turned
+            )
+            % ALPHABET_SIZE
+            for notch in rotor.notch
+        )
+    )
+
+
+def rotor_tables(
+    base_key: str, ring_setting: str
+) -> tuple[tuple[bytes, ...], tuple[bytes, ...]]:
+    """Compile a rotor into forward and reverse tables, one per wiring offset.
+    Tables reproduce `Rotor.encrypt_letter` and `Rotor.reverse_encrypt_letter`
+    for a rotor with key `base_key` turned `offset` times.
+
+    :param base_key: rotor's character mappings at offset zero
+    :type base_key: str
+    :param ring_setting: letter at which the wiring will be offset
+    :type ring_setting: str
+    :returns: forward and reverse tables indexed by offset and then by letter number
+    :rtype: tuple[tuple[bytes, ...], tuple[bytes, ...]]
+    :example: rotor_tables("EKMFLGDQVZNTOWYHXUSPAIBRCJ", "A")[0][0][0] -> 4
+
+    """
+
+    ring: int = letter_to_number(ring_setting)
+    base: list[int] = [letter_to_number(letter) for letter in base_key]
+
+    forward: list[bytes] = []
+    reverse: list[bytes] = []
+
+    for offset in range(ALPHABET_SIZE):
+        # key as seen after turning the rotor `offset` times
+        key: list[int] = base[offset:] + base[:offset]
+
+        inverse: list[int] = [0] * ALPHABET_SIZE
+        for number, cipher_number in enumerate(key):
+            inverse[cipher_number] = number
+
+        forward.append(
+            bytes(
+                (key[number] - offset + ring) % ALPHABET_SIZE
+                for number in range(ALPHABET_SIZE)
+            )
+        )
+        reverse.append(
+            bytes(
+                (inverse[(number + offset) % ALPHABET_SIZE] - ring) % ALPHABET_SIZE
+                for number in range(ALPHABET_SIZE)
+            )
+        )
+
+    return tuple(forward), tuple(reverse)
+
+
+def signature(rotors: list[Rotor], plugboard: Stator, reflector: Stator) -> tuple:
+    """Describe a machine configuration independently of its rotor positions.
+    Two machines with the same signature encrypt identically from the same offsets.
+
+    :param rotors: rotors of the machine; right-most rotor is the first one in the list
+    :type rotors: list[Rotor]
+    :param plugboard: plugboard of the machine
+    :type plugboard: Stator
+    :param reflector: reflector of the machine
+    :type reflector: Stator
+    :returns: hashable description of the machine's wiring
+    :rtype: tuple
+    :example: signature([ROTOR_III, ROTOR_II, ROTOR_I], PLUGBOARD_EMPTY, REFLECTOR_B)
+
+    """
+
+    return (
+        tuple(
+            (rotor.base_key, rotor.ring_setting, rotor_notch_offsets(rotor))
+            for rotor in rotors
+        ),
+        plugboard.key,
+        reflector.key,
+    )
+
+
+def config_id(rotors: list[Rotor], plugboard: Stator, reflector: Stator) -> bytes:
+    """Get a short digest of the parts of a machine's wiring that never move.
+    Unlike `signature`, it leaves out ring settings and rotor positions, so
+    machines that can be set to each other's state share it.
+
+    :param rotors: rotors of the machine; right-most rotor is the first one in the list
+    :type rotors: list[Rotor]
+    :param plugboard: plugboard of the machine
+    :type plugboard: Stator
+    :param reflector: reflector of the machine
+    :type reflector: Stator
+    :returns: 8-byte digest of the rotor keys and notches, plugboard and reflector
+    :rtype: bytes
+    :example: config_id([ROTOR_III, ROTOR_II, ROTOR_I], PLUGBOARD_EMPTY, REFLECTOR_B) -> b"\\x8f..."
+
+    """
+
+    # notches are a set, whatever order their letters were given in
+    wiring: list[str] = [
+        rotor.base_key + "".join(sorted(rotor.notch)) for rotor in rotors
+    ]
+    wiring += [plugboard.key, reflector.key]
+
+    return blake2b("|".join(wiring).encode("ascii"), digest_size=8).digest()
+
+
+def rotor_offsets(rotors: list[Rotor]) -> list[int]:
+    """Get the wiring offset of each rotor.
+
+    :param rotors: rotors whose offsets will be read
+    :type rotors: list[Rotor]
+    :returns: wiring offset of each rotor, in the same order
+    :rtype: list[int]
+    :example: rotor_offsets([ROTOR_III, ROTOR_II, ROTOR_I]) -> [0, 0, 0]
+
+    """
+
+    return [rotor.times_turned % ALPHABET_SIZE for rotor in rotors]
+
+
+def turn_rotors_to(rotors: list[Rotor], offsets: list[int]) -> None:
+    """Turn each rotor forward until it reaches the given wiring offset.
+    The result is the same as calling `Rotor.turn` the required number of times.
+
+    :param rotors: rotors to be turned
+    :type rotors: list[Rotor]
+    :param offsets: wiring offset each rotor must end at
+    :type offsets: list[int]
+    :returns: None
+    :rtype: None
+    :example: turn_rotors_to([ROTOR_III, ROTOR_II, ROTOR_I], [5, 0, 0]) -> None
+
+    """
+
+    for rotor, offset in zip(rotors, offsets):
+        rotor.turn((offset - rotor.times_turned) % ALPHABET_SIZE)
+
+
+def _span(prefix: array, start: int, length: int) -> int:
+    """Add up `length` consecutive entries of a cycle from `start`, wrapping around.
+
+    :param prefix: running totals of the cycle, one more than its length
+    :type prefix: array
+    :param start: position in the cycle of the first entry
+    :type start: int
+    :param length: number of entries, at most the length of the cycle
+    :type length: int
+    :returns: sum of the entries
+    :rtype: int
+    :example: _span(array("H", [0, 1, 1, 2]), 2, 2) -> 2
+
+    """
+
+    cycle: int = len(prefix) - 1
+    end: int = start + length
+
+    if end <= cycle:
+        return prefix[end] - prefix[start]
+
+    return prefix[cycle] - prefix[start] + prefix[end - cycle]
+
+
+class SteppingSchedule:
+    """Stepping of the turning rotors compiled for any notch sets.
+    The right-most and middle rotors alone decide every keypress, so each of
+    their joint positions is tabulated with the one the next keypress leads
+    to; the left rotor only ever follows the middle one. Every joint position
+    ends up in a cycle, so any number of keypresses is skipped with a few
+    lookups, whichever letters the notches are at.
+
+    :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+    :type notches: tuple[tuple[int, ...], tuple[int, ...]]
+    :returns: SteppingSchedule
+    :rtype: SteppingSchedule
+    :example: SteppingSchedule(notches=((21,), (4,)))
+
+    """
+
+    def __init__(self, notches: tuple[tuple[int, ...], tuple[int, ...]]) -> None:
+        """Tabulate the joint position every keypress leads to."""
+
+        self.notches: tuple[tuple[int, ...], tuple[int, ...]] = (
+            tuple(notches[0]),
+            tuple(notches[1]),
+        )
+
+        # whether the right-most rotor turns the middle one from each offset
+        self.carry: tuple[bool, ...] = tuple(
+            offset in self.notches[0] for offset in range(ALPHABET_SIZE)
+        )
+        # ... and whether the middle rotor turns itself and the left one
+        self.double: tuple[bool, ...] = tuple(
+            offset in self.notches[1] for offset in range(ALPHABET_SIZE)
+        )
+
+        # joint position reached from each one, packed as right + 26 * middle
+        self.successor: array = array("H", bytes(2 * PAIRS))
+        for pair in range(PAIRS):
+            right, middle = pair % ALPHABET_SIZE, pair // ALPHABET_SIZE
+            middle += self.double[middle] + self.carry[right]
+            self.successor[pair] = NEXT_OFFSET[right] + ALPHABET_SIZE * (
+                middle % ALPHABET_SIZE
+            )
+
+        # cycles are found lazily, each with running totals of carries and double-steps
+        self._cycles: list[tuple[array, array, array]] = []
+        self._cycle_of: array = array("i", [-1]) * PAIRS
+        self._position: array = array("i", [-1]) * PAIRS
+
+    def step(self, offsets: list[int]) -> None:
+        """Turn rotors the same way `Enigma._turn_rotors` does, in place.
+
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :returns: None
+        :rtype: None
+        :example: schedule.step(offsets) -> None
+
+        """
+
+        right, middle = offsets[0], offsets[1]
+
+        if self.double[middle]:
+            offsets[2] = NEXT_OFFSET[offsets[2]]
+
+        offsets[1] = (middle + self.double[middle] + self.carry[right]) % ALPHABET_SIZE
+        offsets[0] = NEXT_OFFSET[right]
+
+    def _locate(self, pair: int) -> tuple[list[int], int, int]:
+        """Follow a joint position until it enters a cycle, recording the cycle if it is new.
+
+        :param pair: joint position of the right-most and middle rotors
+        :type pair: int
+        :returns: positions before the cycle, cycle number and position of the first one in the cycle
+        :rtype: tuple[list[int], int, int]
+        :example: self._locate(0) -> ([], 0, 0)
+
+        """
+
+        # positions visited before reaching a known cycle
+        path: list[int] = []
+        visited: dict[int, int] = {}
+
+        while self._cycle_of[pair] == -1 and pair not in visited:
+            visited[pair] = len(path)
+            path.append(pair)
+            pair = self.successor[pair]
+
+        # walked into a cycle no one had seen yet
+        if self._cycle_of[pair] == -1:
+            start: int = visited[pair]
+            cycle: array = array("H", path[start:])
+            carried: array = array("H", [0])
+            doubled: array = array("H", [0])
+
+            for position, cycle_pair in enumerate(cycle):
+                self._cycle_of[cycle_pair] = len(self._cycles)
+                self._position[cycle_pair] = position
+                carried.append(carried[-1] + self.carry[cycle_pair % ALPHABET_SIZE])
+                doubled.append(doubled[-1] + self.double[cycle_pair // ALPHABET_SIZE])
+
+            self._cycles.append((cycle, carried, doubled))
+            path = path[:start]
+
+        return path, self._cycle_of[pair], self._position[pair]
+
+    def counts(self, offsets: list[int], keypresses: int) -> tuple[int, int]:
+        """Count the turnovers a number of keypresses causes without stepping.
+        Same counts as `keypresses` calls to `Enigma._turn_rotors` would give.
+
+        :param offsets: wiring offset of each rotor; right-most rotor is the first one
+        :type offsets: list[int]
+        :param keypresses: number of keypresses
+        :type keypresses: int
+        :returns: times the right-most rotor turns the middle one, and times the middle rotor double-steps with the left one
+        :rtype: tuple[int, int]
+        :raises ValueError: if `keypresses` is negative
+        :example: schedule.counts([0, 0, 0], 1000) -> (38, 2)
+
+        """
+
+        if keypresses < 0:
+            raise ValueError("Rotors can only be turned forward.")
+
+        tail, cycle, position = self._locate(offsets[0] + ALPHABET_SIZE * offsets[1])
+        carries: int = 0
+        double_steps: int = 0
+
+        # the few keypresses before the cycle, if any, are counted one by one
+        for pair in tail[:keypresses]:
+            carries += self.carry[pair % ALPHABET_SIZE]
+            double_steps += self.double[pair // ALPHABET_SIZE]
+
+        keypresses -= len(tail)
+        if keypresses <= 0:
+            return carries, double_steps
+
+        # whole laps of the cycle, then what is left of one
+        pairs, carried, doubled = self._cycles[cycle]
+        laps, rest = divmod(keypresses, len(pairs))
+        carries += laps * carried[-1] + _span(carried, position, rest)
+        double_steps += laps * doubled[-1] + _span(doubled, position, rest)
+
+        return carries, double_steps
+
+    def totals(self, offsets: list[int]) -> tuple[list[int], list[int], int]:
+        """List the turnovers up to each keypress over the way into the cycle and one lap of it.
+        Entry t holds the counts after t keypresses; past the last entry they
+        go up by the counts of one lap every lap.
+
+        :param offsets: wiring offset of each rotor; right-most rotor is the first one
+        :type offsets: list[int]
+        :returns: running carries and double-steps, and keypresses before the cycle
+        :rtype: tuple[list[int], list[int], int]
+        :example: schedule.totals([0, 0, 0]) -> ([0, 0, ..., 25], [0, 0, ..., 25], 0)
+
+        """
+
+        tail, cycle, position = self._locate(offsets[0] + ALPHABET_SIZE * offsets[1])
+        pairs: array = self._cycles[cycle][0]
+        carried: list[int] = [0]
+        doubled: list[int] = [0]
+
+        for index in range(len(tail) + len(pairs)):
+            pair: int = (
+                tail[index]
+                if index < len(tail)
+                else pairs[(position + index - len(tail)) % len(pairs)]
+            )
+            carried.append(carried[-1] + self.carry[pair % ALPHABET_SIZE])
+            doubled.append(doubled[-1] + self.double[pair // ALPHABET_SIZE])
+
+        return carried, doubled, len(tail)
+
+
+@lru_cache(maxsize=1024)
+def stepping_schedule(
+    notches: tuple[tuple[int, ...], tuple[int, ...]],
+) -> SteppingSchedule:
+    """Get the stepping schedule of some notch sets, compiling it only once.
+
+    :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+    :type notches: tuple[tuple[int, ...], tuple[int, ...]]
+    :returns: schedule shared by every machine with those notches
+    :rtype: SteppingSchedule
+    :example: stepping_schedule(((21,), (4,))) -> SteppingSchedule(...)
+
+    """
+
+    return SteppingSchedule(notches)
+
+
+def step_counts(
+    offsets: list[int], notches: list[tuple[int, ...]], keypresses: int
+) -> tuple[int, int]:
+    """Count the turnovers a number of keypresses causes without stepping.
+    Same counts as `keypresses` calls to `Enigma._turn_rotors` would give.
+
+    :param offsets: wiring offset of each rotor; right-most rotor is the first one
+    :type offsets: list[int]
+    :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+    :type notches: list[tuple[int, ...]]
+    :param keypresses: number of keypresses
+    :type keypresses: int
+    :returns: times the right-most rotor turns the middle one, and times the middle rotor double-steps with the left one
+    :rtype: tuple[int, int]
+    :raises ValueError: if `keypresses` is negative
+    :example: step_counts([0, 0, 0], [(21,), (4,)], 1000) -> (38, 2)
+
+    """
+
+    return stepping_schedule(tuple(notches)).counts(offsets, keypresses)
+
+
+def offsets_after(
+    offsets: list[int], notches: list[tuple[int, ...]], keypresses: int
+) -> list[int]:
+    """Work out rotor offsets after a number of keypresses without stepping.
+    Same result as `keypresses` calls to `Enigma._turn_rotors`, double-stepping included.
+
+    :param offsets: wiring offset of each rotor; right-most rotor is the first one
+    :type offsets: list[int]
+    :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+    :type notches: list[tuple[int, ...]]
+    :param keypresses: number of keypresses
+    :type keypresses: int
+    :returns: wiring offset of each rotor after the keypresses
+    :rtype: list[int]
+    :raises ValueError: if `keypresses` is negative
+    :example: offsets_after([0, 0, 0], [(21,), (4,)], 1000) -> [12, 14, 2]
+
+    """
+
+    carries, double_steps = step_counts(offsets, notches, keypresses)
+
+    offsets = list(offsets)
+    offsets[0] = (offsets[0] + keypresses) % ALPHABET_SIZE
+    offsets[1] = (offsets[1] + carries + double_steps) % ALPHABET_SIZE
+    offsets[2] = (offsets[2] + double_steps) % ALPHABET_SIZE
+
+    return offsets
+
+
+class CompiledEnigma:
+    """Enigma machine compiled into integer permutation tables.
+    The whole signal path for a rotor state is composed into a single table,
+    so each keypress is one lookup once its state has been seen.
+
+    :param rotors: list of rotors to be used; right-most rotor is the first one in the list
+    :type rotors: list[Rotor]
+    :param plugboard: plugboard to be used
+    :type plugboard: Stator
+    :param reflector: reflector to be used
+    :type reflector: Stator
+    :returns: CompiledEnigma
+    :rtype: CompiledEnigma
+    :example: CompiledEnigma(rotors=[ROTOR_III, ROTOR_II, ROTOR_I], plugboard=PLUGBOARD_EMPTY, reflector=REFLECTOR_B)
+
+    """
+
+    def __init__(self, rotors: list[Rotor], plugboard: Stator, reflector: Stator):
+        """Compile the rotors, plugboard and reflector into tables."""
+
+        self._compile(signature(rotors, plugboard, reflector))
+
+    @classmethod
+    def from_signature(cls, wiring: tuple) -> "CompiledEnigma":
+        """Compile a machine out of its signature alone.
+        Signatures are small and hashable, so other processes can be sent one
+        instead of a whole engine and keep the engine they build from it.
+
+        :param wiring: signature of the machine, as `signature` gives it
+        :type wiring: tuple
+        :returns: compiled machine
+        :rtype: CompiledEnigma
+        :example: CompiledEnigma.from_signature(engine.signature)
+
+        """
+
+        engine: CompiledEnigma = cls.__new__(cls)
+        engine._compile(wiring)
+
+        return engine
+
+    def _compile(self, wiring: tuple) -> None:
+        """Build the tables of a signature.
+
+        :param wiring: signature of the machine, as `signature` gives it
+        :type wiring: tuple
+        :returns: None
+        :rtype: None
+        :example: self._compile(signature(rotors, plugboard, reflector)) -> None
+
+        """
+
+        self.signature: tuple = wiring
+
+        # forward and reverse tables of every rotor, indexed by offset
+        self.forward: list[tuple[bytes, ...]] = []
+        self.reverse: list[tuple[bytes, ...]] = []
+
+        for base_key, ring_setting, _ in self.signature[0]:
+            forward, reverse = rotor_tables(base_key, ring_setting)
+            self.forward.append(forward)
+            self.reverse.append(reverse)
+
+        # offsets at which each rotor turns its neighbour
+        self.notches: tuple[tuple[int, ...], ...] = tuple(
+            notches for _, _, notches in self.signature[0]
+        )
+        # how the turning rotors step, shared by machines with the same notches
+        self.schedule: SteppingSchedule = stepping_schedule(self.notches[:2])
+
+        self.plugboard: bytes = key_table(self.signature[1])
+        self.reflector: bytes = key_table(self.signature[2])
+
+        # composed tables of every rotor state seen so far
+        self._tables: dict[tuple[int, ...], str] = {}
+        # signal path behind the right-most rotor, there and back, of every
+        # state of the other rotors seen so far; it only changes when the
+        # middle rotor turns, about once every 26 keypresses
+        self._inner: dict[tuple[int, ...], bytes] = {}
+
+    def __getstate__(self) -> dict:
+        """Leave composed tables out when pickling, since they are cheap to rebuild.
+
+        :returns: attributes to be pickled
+        :rtype: dict
+        :example: pickle.dumps(engine)
+
+        """
+
+        state: dict = self.__dict__.copy()
+        state["_tables"] = {}
+        state["_inner"] = {}
+
+        return state
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the tables, in bytes.
+
+        :returns: size of the rotor, plugboard and reflector tables and of the composed tables and inner paths so far
+        :rtype: int
+        :example: engine.nbytes -> 4108
+
+        """
+
+        rotors: int = sum(
+            len(table) for tables in self.forward + self.reverse for table in tables
+        )
+
+        return (
+            rotors
+            + len(self.plugboard)
+            + len(self.reflector)
+            + COMPOSED_TABLE_BYTES * len(self._tables)
+            + INNER_PATH_BYTES * len(self._inner)
+        )
+
+    def table(self, offsets: tuple[int, ...]) -> str:
+        """Compose the whole signal path for a rotor state.
+
+        :param offsets: wiring offset of each rotor
+        :type offsets: tuple[int, ...]
+        :returns: string where index X holds the letter X is encrypted to
+        :rtype: str
+        :example: engine.table((1, 0, 0))[0] -> "B"
+
+        """
+
+        table: str | None = self._tables.get(offsets)
+
+        if table is not None:
+            return table
+
+        inner: bytes = self.inner_path(offsets[1:])
+        forward: bytes = self.forward[0][offsets[0]]
+        reverse: bytes = self.reverse[0][offsets[0]]
+        plugboard: bytes = self.plugboard
+
+        # only the plugboard and right-most rotor are left around the inner path
+        table = "".join(
+            ascii_uppercase[plugboard[reverse[inner[forward[plugboard[number]]]]]]
+            for number in range(ALPHABET_SIZE)
+        )
+        self._tables[offsets] = table
+
+        return table
+
+    def inner_path(self, offsets: tuple[int, ...]) -> bytes:
+        """Compose the signal path behind the right-most rotor, there and back.
+        Covers every rotor but the right-most one and the reflector, so it's
+        shared by the 26 states the right-most rotor goes through before the
+        middle one turns.
+
+        :param offsets: wiring offset of each rotor but the right-most one
+        :type offsets: tuple[int, ...]
+        :returns: table where index X holds the number of the letter X comes back as
+        :rtype: bytes
+        :example: engine.inner_path((0, 0))[0] -> 11
+
+        """
+
+        inner: bytes | None = self._inner.get(offsets)
+
+        if inner is not None:
+            return inner
+
+        forward: list[bytes] = [
+            tables[offset] for tables, offset in zip(self.forward[1:], offsets)
+        ]
+        reverse: list[bytes] = [
+            tables[offset] for tables, offset in zip(self.reverse[1:], offsets)
+        ]
+        reverse.reverse()
+
+        numbers: list[int] = []
+
+        for number in range(ALPHABET_SIZE):
+            for rotor in forward:
+                number = rotor[number]
+            number = self.reflector[number]
+            for rotor in reverse:
+                number = rotor[number]
+            numbers.append(number)
+
+        inner = bytes(numbers)
+        self._inner[offsets] = inner
+
+        return inner
+
+    def step(self, offsets: list[int]) -> None:
+        """Turn rotors the same way `Enigma._turn_rotors` does, in place.
+
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :returns: None
+        :rtype: None
+        :example: engine.step(offsets) -> None
+
+        """
+
+        self.schedule.step(offsets)
+
+    def tables_ahead(self, offsets: list[int], keypresses: int) -> list[str]:
+        """Compose the tables of the next keypresses, turning rotors as `encrypt` does.
+
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :param keypresses: number of keypresses
+        :type keypresses: int
+        :returns: composed table of each keypress, as `table` gives them
+        :rtype: list[str]
+        :example: engine.tables_ahead([0, 0, 0], 2) -> ["...", "..."]
+
+        """
+
+        tables: dict[tuple[int, ...], str] = self._tables
+        compose = self.table
+        ahead: list[str] = []
+        append = ahead.append
+
+        # only the three right-most rotors ever turn
+        offset_0, offset_1, offset_2 = offsets[0], offsets[1], offsets[2]
+        still: tuple[int, ...] = tuple(offsets[3:])
+        carry, double = self.schedule.carry, self.schedule.double
+
+        for _ in range(keypresses):
+            if double[offset_1]:
+                offset_1 = NEXT_OFFSET[offset_1]
+                offset_2 = NEXT_OFFSET[offset_2]
+            if carry[offset_0]:
+                offset_1 = NEXT_OFFSET[offset_1]
+            offset_0 = NEXT_OFFSET[offset_0]
+
+            state: tuple[int, ...] = (offset_0, offset_1, offset_2) + still
+            append(tables.get(state) or compose(state))
+
+        offsets[0], offsets[1], offsets[2] = offset_0, offset_1, offset_2
+
+        return ahead
+
+    def encrypt_bytes(self, letters: bytes, offsets: list[int]) -> bytes:
+        """Encrypt uppercase ASCII letters, ungrouped, turning rotors as `encrypt` does.
+
+        :param letters: uppercase ASCII letters, nothing else
+        :type letters: bytes
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :returns: encrypted letters
+        :rtype: bytes
+        :example: engine.encrypt_bytes(b"AAAAA", [0, 0, 0]) -> b"BDZGO"
+
+        """
+
+        tables: list[str] = self.tables_ahead(offsets, len(letters))
+
+        # letter numbers are byte values minus that of "A"
+        return "".join(
+            [table[letter - 65] for table, letter in zip(tables, letters)]
+        ).encode("ascii")
+
+    def encrypt(
+        self,
+        plaintext: str,
+        offsets: list[int],
+        encryptions: int = 0,
+        should_turn: bool = True,
+    ) -> tuple[str, int]:
+        """Encrypt a plaintext string starting from the given rotor state.
+        Output is the same as `Enigma.encrypt`, grouping included.
+
+        :param plaintext: text to be encrypted
+        :type plaintext: str
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :param encryptions: letters encrypted before this call, defaults to 0
+        :type encryptions: int, optional
+        :param should_turn: whether to turn rotors, defaults to True
+        :type should_turn: bool, optional
+        :returns: encrypted text and updated encrypted-letter count
+        :rtype: tuple[str, int]
+        :example: engine.encrypt("AAAAA", [0, 0, 0]) -> (" BDZG O", 5)
+
+        """
+
+        letters: str = NOT_LETTERS.sub("", plaintext)
+        ciphertext: str = self.encrypt_letters(letters, offsets, should_turn)
+
+        return group_text(ciphertext, encryptions), encryptions + len(letters)
+
+    def encrypt_letters(
+        self, letters: str, offsets: list[int], should_turn: bool = True
+    ) -> str:
+        """Encrypt uppercase letters, ungrouped, so the loop only does rotor work.
+
+        :param letters: uppercase letters, nothing else
+        :type letters: str
+        :param offsets: wiring offset of each rotor, updated in place
+        :type offsets: list[int]
+        :param should_turn: whether to turn rotors, defaults to True
+        :type should_turn: bool, optional
+        :returns: encrypted letters
+        :rtype: str
+        :example: engine.encrypt_letters("AAAAA", [0, 0, 0]) -> "BDZGO"
+
+        """
+
+        # rotors don't move, so one translation serves the whole text
+        if should_turn is False:
+            return letters.translate(
+                str.maketrans(ascii_uppercase, self.table(tuple(offsets)))
+            )
+
+        tables: dict[tuple[int, ...], str] = self._tables
+        compose = self.table
+
+        # result of encryption of `letters`
+        ciphertext: list[str] = []
+        append = ciphertext.append
+
+        # only the three right-most rotors ever turn
+        offset_0, offset_1, offset_2 = offsets[0], offsets[1], offsets[2]
+        still: tuple[int, ...] = tuple(offsets[3:])
+        carry, double = self.schedule.carry, self.schedule.double
+
+        for letter in letters:
+            # same stepping as `Enigma._turn_rotors`, whatever the notches
+            if double[offset_1]:
+                offset_1 = NEXT_OFFSET[offset_1]
+                offset_2 = NEXT_OFFSET[offset_2]
+            if carry[offset_0]:
+                offset_1 = NEXT_OFFSET[offset_1]
+            offset_0 = NEXT_OFFSET[offset_0]
+
+            state: tuple[int, ...] = (offset_0, offset_1, offset_2) + still
+            append((tables.get(state) or compose(state))[LETTER_INDEX[letter]])
+
+        offsets[0], offsets[1], offsets[2] = offset_0, offset_1, offset_2
+
+        return "".join(ciphertext)
@@ -0,0 +1,149 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with whole-message passes that prepare plaintext and lay ciphertext out."""
+
+from string import ascii_lowercase, ascii_uppercase
+import re
+
+# characters that aren't encrypted
+NOT_LETTERS: re.Pattern = re.compile("[^A-Z]+")
+
+# every byte but A-Z, dropped from bytes-like input with `bytes.translate`
+NOT_LETTER_BYTES: bytes = bytes(byte for byte in range(256) if not 65 <= byte <= 90)
+
+# splits text into runs of letters, at even indexes, and runs of anything else
+LETTER_RUNS: re.Pattern = re.compile("([^A-Z]+)")
+
+
+def group_text(letters: str, encryptions: int = 0, size: int = 4) -> str:
+    """Put a space before every `size`-th letter, counting letters encrypted before.
+
+    :param letters: encrypted letters, ungrouped
+    :type letters: str
+    :param encryptions: letters encrypted before these, defaults to 0
+    :type encryptions: int, optional
+    :param size: letters per group, or 0 for no grouping, defaults to 4
+    :type size: int, optional
+    :returns: grouped letters
+    :rtype: str
+    :example: group_text("BDZGO", 0) -> " BDZG O"
+
+    """
+
+    if size <= 0:
+        return letters
+
+    # letters that still belong to the group started before these
+    head: int = -encryptions % size
+
+    return letters[:head] + "".join(
+        " " + letters[start : start + size] for start in range(head, len(letters), size)
+    )
+
+
+class TextFormat:
+    """How plaintext is normalized before encryption and ciphertext laid out after it.
+    Every step is a pass over the whole message, so the per-letter loop of
+    a backend only does rotor work. The default drops anything but
+    uppercase letters and puts a space before every fourth letter.
+
+    :param fold_case: whether lowercase letters are encrypted as uppercase instead of dropped, defaults to False
+    :type fold_case: bool, optional
+    :param keep_punctuation: whether anything but letters is kept in place, unencrypted, instead of dropped; ciphertext then keeps the plaintext's layout and isn't grouped, defaults to False
+    :type keep_punctuation: bool, optional
+    :param space: letter that stands in for spaces, as in the "X" convention, defaults to none
+    :type space: str, optional
+    :param group_size: letters per group, or 0 for no grouping, defaults to 4
+    :type group_size: int, optional
+    :returns: TextFormat
+    :rtype: TextFormat
+    :raises ValueError: if `space` isn't an uppercase letter or `group_size` is negative
+    :example: TextFormat(fold_case=True, space="X", group_size=5)
+
+    """
+
+    def __init__(
+        self,
+        fold_case: bool = False,
+        keep_punctuation: bool = False,
+        space: str = "",
+        group_size: int = 4,
+    ) -> None:
+        """Initialize format and its translation table."""
+
+        if space and (len(space) != 1 or space not in ascii_uppercase):
+            raise ValueError("Space must stand for a single uppercase letter.")
+
+        if group_size < 0:
+            raise ValueError("Group size must not be negative.")
+
+        self.fold_case: bool = fold_case
+        self.keep_punctuation: bool = keep_punctuation
+        self.space: str = space
+        self.group_size: int = group_size
+
+        # case folding and spaces are done by a single `str.translate`
+        self._table: dict[int, str] = {}
+        if fold_case:
+            self._table.update(str.maketrans(ascii_lowercase, ascii_uppercase))
+        if space:
+            self._table[ord(" ")] = space
+
+    def split(self, text: str) -> tuple[str, list[str] | None]:
+        """Normalize plaintext and take its letters out.
+
+        :param text: plaintext as given
+        :type text: str
+        :returns: letters to be encrypted, and the runs of text they came from if punctuation is kept
+        :rtype: tuple[str, list[str] | None]
+        :example: TextFormat(fold_case=True, space="X").split("Hi there") -> ("HIXTHERE", None)
+
+        """
+
+        if self._table:
+            text = text.translate(self._table)
+
+        if not self.keep_punctuation:
+            return NOT_LETTERS.sub("", text), None
+
+        runs: list[str] = LETTER_RUNS.split(text)
+
+        return "".join(runs[::2]), runs
+
+    def join(self, ciphertext: str, runs: list[str] | None, encryptions: int) -> str:
+        """Lay encrypted letters out.
+
+        :param ciphertext: encrypted letters, ungrouped
+        :type ciphertext: str
+        :param runs: runs of text the letters came from, as `split` gave them
+        :type runs: list[str] | None
+        :param encryptions: letters encrypted before these
+        :type encryptions: int
+        :returns: ciphertext as it's handed over
+        :rtype: str
+        :example: TextFormat().join("BDZGO", None, 0) -> " BDZG O"
+
+        """
+
+        if runs is None:
+            return group_text(ciphertext, encryptions, self.group_size)
+
+        # encrypted letters go back where they were, between what was kept
+        laid_out: list[str] = []
+        start: int = 0
+
+        for index, run in enumerate(runs):
+            if index % 2:
+                laid_out.append(run)
+            else:
+                laid_out.append(ciphertext[start : start + len(run)])
+                start += len(run)
+
+        return "".join(laid_out)
+
+
+# how `Enigma.encrypt` has always handled text
+DEFAULT_FORMAT: TextFormat = TextFormat()
+
+# letters only, as byte-level encryption hands them over
+UNGROUPED: TextFormat = TextFormat(group_size=0)
@@ -0,0 +1,515 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module that recovers the plugboard of known rotor settings by n-gram hill climbing."""
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from math import log10
+from random import Random
+from string import ascii_uppercase
+from typing import Iterable, NamedTuple
+import time
+
+from engine import ALPHABET_SIZE, CompiledEnigma, rotor_offsets
+from formatting import NOT_LETTERS
+from keystream import TO_NUMBERS
+from machine import Enigma
+from rotors import PLUGBOARD_EMPTY
+
+
+class NgramScorer:
+    """Log-probabilities of every n-gram, kept in a flat array.
+    Index of an n-gram is its letter numbers read as a base-26 number.
+
+    :param n: length of the n-grams, between 1 and 5
+    :type n: int
+    :param counts: number of times each n-gram was seen
+    :type counts: dict[str, int]
+    :returns: NgramScorer
+    :rtype: NgramScorer
+    :raises ValueError: if `n` is out of range or no n-gram has been counted
+    :example: NgramScorer(n=2, counts={"TH": 100, "HE": 90})
+
+    """
+
+    def __init__(self, n: int, counts: dict[str, int]) -> None:
+        """Turn n-gram counts into log-probabilities."""
+
+        if not 1 <= n <= 5:
+            raise ValueError("N-grams must be 1 to 5 letters long.")
+
+        total: int = sum(counts.values())
+
+        if total == 0:
+            raise ValueError("At least one n-gram must be counted.")
+
+        self.n: int = n
+
+        # n-grams never seen are given a tenth of the chance of one seen once
+        self.floor: float = log10(0.1 / total)
+        self.table: array = array("d", [self.floor]) * ALPHABET_SIZE**n
+
+        for ngram, count in counts.items():
+            if len(ngram) == n and count > 0:
+                self.table[self.index(ngram.encode("ascii").translate(TO_NUMBERS))] = (
+                    log10(count / total)
+                )
+
+    @classmethod
+    def from_counts(cls, lines: Iterable[str]) -> "NgramScorer":
+        """Load n-gram counts given as "NGRAM COUNT" lines.
+
+        :param lines: lines with an uppercase n-gram and its count
+        :type lines: Iterable[str]
+        :returns: scorer of those n-grams
+        :rtype: NgramScorer
+        :raises ValueError: if n-grams have different lengths
+        :example: NgramScorer.from_counts(open("english_quadgrams.txt", encoding="utf-8"))
+
+        """
+
+        counts: dict[str, int] = {}
+
+        for line in lines:
+            if not line.strip():
+                continue
+            ngram, count = line.split()
+            counts[ngram.upper()] = counts.get(ngram.upper(), 0) + int(count)
+
+        lengths: set[int] = {len(ngram) for ngram in counts}
+
+        if len(lengths) != 1:
+            raise ValueError("All n-grams must have the same length.")
+
+        return cls(lengths.pop(), counts)
+
+    @classmethod
+    def from_text(cls, text: str, n: int = 4) -> "NgramScorer":
+        """Count the n-grams of a sample text.
+
+        :param text: text to learn from; anything but letters is ignored
+        :type text: str
+        :param n: length of the n-grams, defaults to 4
+        :type n: int, optional
+        :returns: scorer of the text's n-grams
+        :rtype: NgramScorer
+        :example: NgramScorer.from_text(open("corpus.txt", encoding="utf-8").read(), n=3)
+
+        """
+
+        letters: str = NOT_LETTERS.sub("", text.upper())
+        counts: dict[str, int] = {}
+
+        for start in range(len(letters) - n + 1):
+            ngram: str = letters[start : start + n]
+            counts[ngram] = counts.get(ngram, 0) + 1
+
+        return cls(n, counts)
+
+    def index(self, numbers: bytes | list[int]) -> int:
+        """Get the index of an n-gram in the table.
+
+        :param numbers: letter numbers of the n-gram
+        :type numbers: bytes | list[int]
+        :returns: index in `table`
+        :rtype: int
+        :example: scorer.index([19, 7]) -> 501
+
+        """
+
+        index: int = 0
+
+        for number in numbers:
+            index = index * ALPHABET_SIZE + number
+
+        return index
+
+    def score(self, numbers: bytes | list[int]) -> float:
+        """Get the log-probability of a text, given as letter numbers.
+
+        :param numbers: letter numbers of the text
+        :type numbers: bytes | list[int]
+        :returns: sum of the log-probabilities of every n-gram of the text
+        :rtype: float
+        :example: scorer.score([19, 7, 4]) -> -2.5
+
+        """
+
+        return self.score_windows(numbers, range(len(numbers) - self.n + 1))
+
+    def score_windows(self, numbers: bytes | list[int], starts: Iterable[int]) -> float:
+        """Get the log-probability of some of the n-grams of a text.
+
+        :param numbers: letter numbers of the text
+        :type numbers: bytes | list[int]
+        :param starts: positions the n-grams to be scored start at
+        :type starts: Iterable[int]
+        :returns: sum of the log-probabilities of those n-grams
+        :rtype: float
+        :example: scorer.score_windows([19, 7, 4], [1]) -> -1.3
+
+        """
+
+        table: array = self.table
+        n: int = self.n
+        total: float = 0.0
+
+        for start in starts:
+            index: int = 0
+            for number in numbers[start : start + n]:
+                index = index * ALPHABET_SIZE + number
+            total += table[index]
+
+        return total
+
+
+class Solution(NamedTuple):
+    """Plugboard found by the hill climber.
+
+    :param score: n-gram log-probability of the decryption
+    :type score: float
+    :param steckers: plugged letter pairs
+    :type steckers: tuple[str, ...]
+    :param plaintext: decryption with this plugboard
+    :type plaintext: str
+
+    """
+
+    score: float
+    steckers: tuple[str, ...]
+    plaintext: str
+
+
+def scrambler_tables(machine: Enigma, length: int) -> list[bytes]:
+    """Get the unsteckered substitution of each keypress of a message.
+    The machine is left untouched; its plugboard is ignored.
+
+    :param machine: machine set to the start of the message
+    :type machine: Enigma
+    :param length: number of letters in the message
+    :type length: int
+    :returns: substitution as letter numbers for each keypress
+    :rtype: list[bytes]
+    :example: scrambler_tables(machine, 3) -> [b"\\x14\\x04...", ...]
+
+    """
+
+    engine: CompiledEnigma = CompiledEnigma(
+        machine.rotors, PLUGBOARD_EMPTY, machine.reflector
+    )
+    offsets: list[int] = rotor_offsets(machine.rotors)
+
+    tables: list[bytes] = []
+    for _ in range(length):
+        engine.step(offsets)
+        tables.append(
+            engine.table(tuple(offsets)).encode("ascii").translate(TO_NUMBERS)
+        )
+
+    return tables
+
+
+def plugged_pairs(plugboard: list[int]) -> list[tuple[int, int]]:
+    """Get the pairs of letters plugged together.
+
+    :param plugboard: letter number each letter is plugged to
+    :type plugboard: list[int]
+    :returns: pairs of letter numbers, lowest number first
+    :rtype: list[tuple[int, int]]
+    :example: plugged_pairs([1, 0, 2, ...]) -> [(0, 1)]
+
+    """
+
+    return [
+        (letter, partner)
+        for letter, partner in enumerate(plugboard)
+        if letter < partner
+    ]
+
+
+class _Climber:
+    """State of a single hill climb, updated one plug at a time.
+    Decrypted letters only change where the swapped letters go in or come
+    out of the scrambler, so a move only rescores the n-grams around those.
+
+    :param scramblers: unsteckered substitution of each keypress
+    :type scramblers: list[bytes]
+    :param ciphertext: ciphertext as letter numbers
+    :type ciphertext: bytes
+    :param scorer: scorer of the decryptions
+    :type scorer: NgramScorer
+    :param plugboard: letter number each letter is plugged to
+    :type plugboard: list[int]
+
+    """
+
+    def __init__(
+        self,
+        scramblers: list[bytes],
+        ciphertext: bytes,
+        scorer: NgramScorer,
+        plugboard: list[int],
+    ) -> None:
+        """Decrypt and score the ciphertext with the starting plugboard."""
+
+        self.scramblers: list[bytes] = scramblers
+        self.ciphertext: bytes = ciphertext
+        self.scorer: NgramScorer = scorer
+        self.plugboard: list[int] = plugboard
+
+        # positions of each letter going into the plugboard, which never change
+        self.by_cipher: list[list[int]] = [[] for _ in range(ALPHABET_SIZE)]
+        for position, number in enumerate(ciphertext):
+            self.by_cipher[number].append(position)
+
+        # letter each position leaves the scrambler with, and positions of each one
+        self.middle: list[int] = [
+            scrambler[plugboard[number]]
+            for scrambler, number in zip(scramblers, ciphertext)
+        ]
+        self.by_middle: list[set[int]] = [set() for _ in range(ALPHABET_SIZE)]
+        for position, number in enumerate(self.middle):
+            self.by_middle[number].add(position)
+
+        self.plaintext: list[int] = [plugboard[number] for number in self.middle]
+        self.score: float = scorer.score(self.plaintext)
+
+    def moved(self, a: int, b: int) -> list[int]:
+        """Get the plugboard with a and b plugged together, or unplugged if they already were.
+
+        :param a: number of a letter
+        :type a: int
+        :param b: number of another letter
+        :type b: int
+        :returns: new plugboard
+        :rtype: list[int]
+        :example: self.moved(0, 1) -> [1, 0, 2, ...]
+
+        """
+
+        plugboard: list[int] = self.plugboard[:]
+
+        if plugboard[a] == b:
+            plugboard[a], plugboard[b] = a, b
+            return plugboard
+
+        # free both letters before plugging them together
+        for letter in (a, b):
+            partner: int = plugboard[letter]
+            plugboard[letter], plugboard[partner] = letter, partner
+
+        plugboard[a], plugboard[b] = b, a
+
+        return plugboard
+
+    def try_move(self, plugboard: list[int]) -> bool:
+        """Keep a new plugboard if it scores better than the current one.
+
+        :param plugboard: plugboard to be tried
+        :type plugboard: list[int]
+        :returns: whether the plugboard was kept
+        :rtype: bool
+        :example: self.try_move(self.moved(0, 1)) -> True
+
+        """
+
+        changed: list[int] = [
+            letter
+            for letter in range(ALPHABET_SIZE)
+            if plugboard[letter] != self.plugboard[letter]
+        ]
+
+        # positions whose input or output goes through a changed plug
+        positions: set[int] = set()
+        for letter in changed:
+            positions.update(self.by_cipher[letter])
+            positions.update(self.by_middle[letter])
+
+        n: int = self.scorer.n
+        last: int = len(self.plaintext) - n
+        windows: set[int] = set()
+        for position in positions:
+            windows.update(range(max(0, position - n + 1), min(position, last) + 1))
+
+        plaintext: list[int] = self.plaintext[:]
+        middles: dict[int, int] = {}
+        for position in positions:
+            cipher: int = plugboard[self.ciphertext[position]]
+            middle: int = self.scramblers[position][cipher]
+            middles[position] = middle
+            plaintext[position] = plugboard[middle]
+
+        delta: float = self.scorer.score_windows(
+            plaintext, windows
+        ) - self.scorer.score_windows(self.plaintext, windows)
+
+        if delta <= 0:
+            return False
+
+        for position, middle in middles.items():
+            self.by_middle[self.middle[position]].discard(position)
+            self.by_middle[middle].add(position)
+            self.middle[position] = middle
+
+        self.plugboard = plugboard
+        self.plaintext = plaintext
+        self.score += delta
+
+        return True
+
+    def climb(self, max_pairs: int, deadline: float) -> None:
+        """Keep trying every single-plug change until none helps or time runs out.
+
+        :param max_pairs: most pairs the plugboard may have
+        :type max_pairs: int
+        :param deadline: `time.monotonic()` value at which to stop
+        :type deadline: float
+        :returns: None
+        :rtype: None
+        :example: self.climb(10, time.monotonic() + 5) -> None
+
+        """
+
+        improved: bool = True
+
+        while improved and time.monotonic() < deadline:
+            improved = False
+
+            for a in range(ALPHABET_SIZE):
+                for b in range(a + 1, ALPHABET_SIZE):
+                    plugboard: list[int] = self.moved(a, b)
+
+                    if len(plugged_pairs(plugboard)) > max_pairs:
+                        continue
+
+                    improved = self.try_move(plugboard) or improved
+
+
+def _restarts(
+    scramblers: list[bytes],
+    ciphertext: bytes,
+    scorer: NgramScorer,
+    max_pairs: int,
+    restarts: int,
+    time_budget: float,
+    seed: int,
+) -> tuple[float, list[int]]:
+    """Climb from random plugboards, keeping the best one reached.
+
+    :param scramblers: unsteckered substitution of each keypress
+    :type scramblers: list[bytes]
+    :param ciphertext: ciphertext as letter numbers
+    :type ciphertext: bytes
+    :param scorer: scorer of the decryptions
+    :type scorer: NgramScorer
+    :param max_pairs: most pairs the plugboard may have
+    :type max_pairs: int
+    :param restarts: number of climbs
+    :type restarts: int
+    :param time_budget: seconds after which no new climb is started
+    :type time_budget: float
+    :param seed: seed of the random starting plugboards
+    :type seed: int
+    :returns: best score and its plugboard
+    :rtype: tuple[float, list[int]]
+    :example: _restarts(scramblers, ciphertext, scorer, 10, 20, 5.0, 0) -> (-310.2, [16, 10, ...])
+
+    """
+
+    random: Random = Random(seed)
+    deadline: float = time.monotonic() + time_budget
+
+    best: tuple[float, list[int]] = (float("-inf"), list(range(ALPHABET_SIZE)))
+
+    for restart in range(restarts):
+        if time.monotonic() >= deadline:
+            break
+
+        # first climb starts from an empty plugboard, others from random plugs
+        plugboard: list[int] = list(range(ALPHABET_SIZE))
+        if restart:
+            letters: list[int] = random.sample(range(ALPHABET_SIZE), 2 * max_pairs)
+            for a, b in zip(letters[::2], letters[1::2]):
+                plugboard[a], plugboard[b] = b, a
+
+        climber: _Climber = _Climber(scramblers, ciphertext, scorer, plugboard)
+        climber.climb(max_pairs, deadline)
+
+        if climber.score > best[0]:
+            best = (climber.score, climber.plugboard)
+
+    return best
+
+
+def solve_plugboard(
+    machine: Enigma,
+    ciphertext: str,
+    scorer: NgramScorer,
+    max_pairs: int = 10,
+    restarts: int = 20,
+    time_budget: float = 10.0,
+    workers: int = 1,
+    seed: int = 0,
+) -> Solution:
+    """Recover the plugboard of a message whose rotor settings are known.
+
+    :param machine: machine set to the start of the message; its plugboard is ignored
+    :type machine: Enigma
+    :param ciphertext: intercepted message
+    :type ciphertext: str
+    :param scorer: scorer of the decryptions
+    :type scorer: NgramScorer
+    :param max_pairs: most pairs the plugboard may have, defaults to 10
+    :type max_pairs: int, optional
+    :param restarts: number of climbs per process, defaults to 20
+    :type restarts: int, optional
+    :param time_budget: seconds after which no new climb is started, defaults to 10
+    :type time_budget: float, optional
+    :param workers: number of processes climbing at once, defaults to 1
+    :type workers: int, optional
+    :param seed: seed of the random starting plugboards, defaults to 0
+    :type seed: int, optional
+    :returns: best plugboard found
+    :rtype: Solution
+    :raises ValueError: if `max_pairs` is not between 0 and 13 or `workers` is not positive
+    :example: solve_plugboard(machine, ciphertext, NgramScorer.from_text(corpus)) -> Solution(steckers=("AQ", ...), ...)
+
+    """
+
+    if not 0 <= max_pairs <= 13:
+        raise ValueError("A plugboard has between 0 and 13 pairs.")
+
+    if workers <= 0:
+        raise ValueError("Number of workers must be positive.")
+
+    numbers: bytes = (
+        NOT_LETTERS.sub("", ciphertext).encode("ascii").translate(TO_NUMBERS)
+    )
+    scramblers: list[bytes] = scrambler_tables(machine, len(numbers))
+
+    arguments: list[tuple] = [
+        (scramblers, numbers, scorer, max_pairs, restarts, time_budget, seed + worker)
+        for worker in range(workers)
+    ]
+
+    if workers == 1:
+        results: list[tuple[float, list[int]]] = [_restarts(*arguments[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_restarts, *zip(*arguments)))
+
+    score, plugboard = max(results, key=lambda result: result[0])
+
+    plaintext: str = "".join(
+        ascii_uppercase[plugboard[scrambler[plugboard[number]]]]
+        for scrambler, number in zip(scramblers, numbers)
+    )
+
+    return Solution(
+        score=score,
+        steckers=tuple(
+            ascii_uppercase[letter] + ascii_uppercase[partner]
+            for letter, partner in plugged_pairs(plugboard)
+        ),
+        plaintext=plaintext,
+    )
@@ -0,0 +1,458 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module that numbers every rotor order, ring setting and start position of a search, so it can be split and resumed."""
+
+from hashlib import blake2b
+from itertools import permutations
+from string import ascii_uppercase
+from typing import Iterable, Iterator, NamedTuple
+import os
+import struct
+
+from rotors import ALPHABET_SIZE, ROTORS
+
+# layout of a checkpoint: version, shard, number of shards, keyspace digest and
+# first candidate not done yet
+CHECKPOINT_VERSION: int = 1
+CHECKPOINT: struct.Struct = struct.Struct("<BII8sQ")
+
+# candidates committed between two checkpoints
+CHECKPOINT_EVERY: int = 1 << 16
+
+
+class Settings(NamedTuple):
+    """Rotor settings a candidate stands for.
+
+    :param order: names of the rotors from left to right
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right
+    :type ring_settings: str
+    :param windows: letters on the rotor windows from left to right before the message
+    :type windows: str
+
+    """
+
+    order: tuple[str, ...]
+    ring_settings: str
+    windows: str
+
+
+def _letters(number: int, length: int) -> str:
+    """Write a number in base 26 with letters, most significant first.
+
+    :param number: number to be written, below 26 ** `length`
+    :type number: int
+    :param length: number of letters
+    :type length: int
+    :returns: letters of the number
+    :rtype: str
+    :example: _letters(27, 3) -> "ABB"
+
+    """
+
+    letters: list[str] = []
+
+    for _ in range(length):
+        number, digit = divmod(number, ALPHABET_SIZE)
+        letters.append(ascii_uppercase[digit])
+
+    return "".join(reversed(letters))
+
+
+def _number(letters: str) -> int:
+    """Read letters written by `_letters` back as a number.
+
+    :param letters: letters of the number, most significant first
+    :type letters: str
+    :returns: number
+    :rtype: int
+    :example: _number("ABB") -> 27
+
+    """
+
+    number: int = 0
+
+    for letter in letters:
+        number = number * ALPHABET_SIZE + ord(letter) - 65
+
+    return number
+
+
+class Keyspace:
+    """Every rotor order, ring setting and start position of a search, numbered.
+    A candidate is a single integer, so shards are plain ranges and a
+    checkpoint is a single number. Candidates of the same rotor order and
+    ring settings are numbered next to each other, so a shard reuses the
+    tables built for them.
+
+    :param rotors: names of the rotors that may be used, from `rotors.ROTORS`, defaults to I to V
+    :type rotors: Iterable[str], optional
+    :param slots: number of rotors in the machine, defaults to 3
+    :type slots: int, optional
+    :param ring_settings: ring settings to try from left to right, defaults to all of them
+    :type ring_settings: Iterable[str] | None, optional
+    :param windows: start positions to try from left to right, defaults to all of them
+    :type windows: Iterable[str] | None, optional
+    :returns: Keyspace
+    :rtype: Keyspace
+    :raises ValueError: if a rotor is unknown or settings don't hold one letter per slot
+    :example: Keyspace(("I", "II", "III"), ring_settings=["AAA"])
+
+    """
+
+    def __init__(
+        self,
+        rotors: Iterable[str] = ("I", "II", "III", "IV", "V"),
+        slots: int = 3,
+        ring_settings: Iterable[str] | None = None,
+        windows: Iterable[str] | None = None,
+    ) -> None:
+        """Number the candidates of a search."""
+
+        rotors = tuple(rotors)
+
+        if any(name not in ROTORS for name in rotors):
+            raise ValueError(f"Rotors must be some of {', '.join(ROTORS)}.")
+        if not 0 < slots <= len(rotors):
+            raise ValueError("Slots must be between one and the number of rotors.")
+
+        self.rotors: tuple[str, ...] = rotors
+        self.slots: int = slots
+        self.orders: tuple[tuple[str, ...], ...] = tuple(permutations(rotors, slots))
+
+        # settings given one by one are indexed; all of them are counted in base 26
+        self.ring_settings: tuple[str, ...] | None = self._settings(ring_settings)
+        self.windows: tuple[str, ...] | None = self._settings(windows)
+
+        self._rings: int = (
+            len(self.ring_settings)
+            if self.ring_settings is not None
+            else ALPHABET_SIZE**slots
+        )
+        self._windows: int = (
+            len(self.windows) if self.windows is not None else ALPHABET_SIZE**slots
+        )
+
+    def _settings(self, settings: Iterable[str] | None) -> tuple[str, ...] | None:
+        """Check ring settings or windows given one by one.
+
+        :param settings: letters from left to right, or None for all of them
+        :type settings: Iterable[str] | None
+        :returns: settings, in the order given
+        :rtype: tuple[str, ...] | None
+        :raises ValueError: if settings don't hold one letter per slot
+        :example: self._settings(["AAA", "KDX"]) -> ("AAA", "KDX")
+
+        """
+
+        if settings is None:
+            return None
+
+        settings = tuple(settings)
+
+        if any(
+            len(letters) != self.slots
+            or any(letter not in ascii_uppercase for letter in letters)
+            for letters in settings
+        ):
+            raise ValueError("Settings must hold one letter per slot.")
+
+        return settings
+
+    def __len__(self) -> int:
+        """Get the number of candidates.
+
+        :returns: number of candidates
+        :rtype: int
+        :example: len(Keyspace()) -> 18534946560
+
+        """
+
+        return len(self.orders) * self._rings * self._windows
+
+    @property
+    def digest(self) -> bytes:
+        """Identify the keyspace, so checkpoints of another search are refused.
+
+        :returns: 8-byte digest of the rotors, slots, ring settings and windows
+        :rtype: bytes
+        :example: Keyspace().digest -> b"g\\xc2..."
+
+        """
+
+        parts: list[str] = [
+            ",".join(self.rotors),
+            str(self.slots),
+            ",".join(self.ring_settings) if self.ring_settings is not None else "*",
+            ",".join(self.windows) if self.windows is not None else "*",
+        ]
+
+        return blake2b("|".join(parts).encode("ascii"), digest_size=8).digest()
+
+    def encode(self, order: tuple[str, ...], ring_settings: str, windows: str) -> int:
+        """Get the number of a candidate.
+
+        :param order: names of the rotors from left to right
+        :type order: tuple[str, ...]
+        :param ring_settings: ring setting letters from left to right
+        :type ring_settings: str
+        :param windows: letters on the rotor windows from left to right
+        :type windows: str
+        :returns: candidate
+        :rtype: int
+        :raises ValueError: if the settings aren't part of the keyspace
+        :example: Keyspace().encode(("I", "II", "III"), "AAA", "AAB") -> 1
+
+        """
+
+        # letters are checked even when all settings are counted in base 26
+        self._settings([ring_settings, windows])
+
+        rings: int = (
+            self.ring_settings.index(ring_settings)
+            if self.ring_settings is not None
+            else _number(ring_settings)
+        )
+        window: int = (
+            self.windows.index(windows)
+            if self.windows is not None
+            else _number(windows)
+        )
+
+        order_number: int = self.orders.index(tuple(order))
+
+        return (order_number * self._rings + rings) * self._windows + window
+
+    def decode(self, candidate: int) -> Settings:
+        """Get the settings a candidate stands for.
+
+        :param candidate: number of the candidate
+        :type candidate: int
+        :returns: rotor order, ring settings and windows
+        :rtype: Settings
+        :raises ValueError: if the candidate is out of range
+        :example: Keyspace().decode(1) -> Settings(order=("I", "II", "III"), ring_settings="AAA", windows="AAB")
+
+        """
+
+        if not 0 <= candidate < len(self):
+            raise ValueError("Candidate is out of range.")
+
+        rest, window = divmod(candidate, self._windows)
+        order, rings = divmod(rest, self._rings)
+
+        return Settings(
+            self.orders[order],
+            (
+                self.ring_settings[rings]
+                if self.ring_settings is not None
+                else _letters(rings, self.slots)
+            ),
+            (
+                self.windows[window]
+                if self.windows is not None
+                else _letters(window, self.slots)
+            ),
+        )
+
+    def shard(self, index: int, count: int) -> range:
+        """Get the candidates of one of `count` shards.
+        Shards are consecutive and differ in size by one at most, so every
+        host that is given the same keyspace and count gets the same split.
+
+        :param index: shard number, from 0
+        :type index: int
+        :param count: number of shards
+        :type count: int
+        :returns: candidates of the shard
+        :rtype: range
+        :raises ValueError: if the shard doesn't exist
+        :example: Keyspace().shard(0, 4) -> range(0, 4633736640)
+
+        """
+
+        if not 0 <= index < count:
+            raise ValueError("Shard must be between zero and the number of shards.")
+
+        return range(len(self) * index // count, len(self) * (index + 1) // count)
+
+    def iterate(
+        self,
+        index: int = 0,
+        count: int = 1,
+        checkpoint: str | os.PathLike | None = None,
+        every: int = CHECKPOINT_EVERY,
+    ) -> "ShardProgress":
+        """Get the candidates of a shard, resuming from a checkpoint file if there is one.
+
+        :param index: shard number, from 0, defaults to 0
+        :type index: int, optional
+        :param count: number of shards, defaults to 1
+        :type count: int, optional
+        :param checkpoint: path of the checkpoint file, defaults to none
+        :type checkpoint: str | os.PathLike | None, optional
+        :param every: candidates committed between two checkpoints, defaults to 65536
+        :type every: int, optional
+        :returns: candidates not yet done, to be committed as they are
+        :rtype: ShardProgress
+        :raises ValueError: if the shard doesn't exist, `every` isn't positive or the checkpoint belongs to another search
+        :example: progress = keyspace.iterate(2, 8, "shard-2.ckpt")
+
+        """
+
+        return ShardProgress(self, index, count, checkpoint, every)
+
+
+class ShardProgress:
+    """Candidates of a shard and how far they have been done.
+    Iterating hands out every candidate not done when the shard was
+    resumed; only candidates given to `commit` count as done. The
+    checkpoint holds the first candidate not done, so candidates handed out
+    but lost, to a prefetching pool or a crash, are handed out again on
+    resume, and a job killed at any point repeats fewer than `every`
+    committed candidates.
+
+    :param keyspace: keyspace the shard is part of
+    :type keyspace: Keyspace
+    :param index: shard number, from 0
+    :type index: int
+    :param count: number of shards
+    :type count: int
+    :param checkpoint: path of the checkpoint file, defaults to none
+    :type checkpoint: str | os.PathLike | None, optional
+    :param every: candidates committed between two checkpoints, defaults to 65536
+    :type every: int, optional
+    :returns: ShardProgress
+    :rtype: ShardProgress
+    :raises ValueError: if the shard doesn't exist, `every` isn't positive or the checkpoint belongs to another search
+    :example: for candidate in progress: test(keyspace.decode(candidate)); progress.commit(candidate)
+
+    """
+
+    def __init__(
+        self,
+        keyspace: Keyspace,
+        index: int,
+        count: int,
+        checkpoint: str | os.PathLike | None = None,
+        every: int = CHECKPOINT_EVERY,
+    ) -> None:
+        """Find where the shard is resumed from."""
+
+        if every <= 0:
+            raise ValueError("Checkpoints must be some candidates apart.")
+
+        self.candidates: range = keyspace.shard(index, count)
+        self.index: int = index
+        self.count: int = count
+        self.checkpoint: str | os.PathLike | None = checkpoint
+        self.every: int = every
+        self._digest: bytes = keyspace.digest
+
+        # first candidate not done; everything before it is
+        self.done: int = self.candidates.start
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self.done = self._load()
+
+        self.start: int = self.done
+        self._saved: int = self.done
+
+        # candidates done past `done`, while some before them are still out
+        self._ahead: set[int] = set()
+
+    def __iter__(self) -> Iterator[int]:
+        """Hand out the candidates not done when the shard was resumed."""
+
+        return iter(range(self.start, self.candidates.stop))
+
+    @property
+    def finished(self) -> bool:
+        """Whether every candidate of the shard is done."""
+
+        return self.done == self.candidates.stop
+
+    def commit(self, candidate: int) -> None:
+        """Count a candidate as done, in any order, saving a checkpoint every `every` candidates.
+
+        :param candidate: candidate that has been tried
+        :type candidate: int
+        :returns: None
+        :rtype: None
+        :raises ValueError: if the candidate isn't part of the shard
+        :example: progress.commit(263722000) -> None
+
+        """
+
+        if candidate not in self.candidates:
+            raise ValueError("Candidate isn't part of the shard.")
+
+        if candidate != self.done:
+            if candidate > self.done:
+                self._ahead.add(candidate)
+            return
+
+        # candidates done out of order join once those before them are
+        self.done += 1
+        while self.done in self._ahead:
+            self._ahead.remove(self.done)
+            self.done += 1
+
+        if self.done - self._saved >= self.every or self.finished:
+            self.save()
+
+    def save(self) -> None:
+        """Write the first candidate not done to the checkpoint, if there is one.
+        The file is replaced in one step, so a job killed while saving leaves
+        the previous checkpoint behind.
+
+        :returns: None
+        :rtype: None
+        :example: progress.save() -> None
+
+        """
+
+        self._saved = self.done
+
+        if self.checkpoint is None:
+            return
+
+        partial: str = os.fspath(self.checkpoint) + ".tmp"
+
+        with open(partial, "wb") as file:
+            file.write(
+                CHECKPOINT.pack(
+                    CHECKPOINT_VERSION, self.index, self.count, self._digest, self.done
+                )
+            )
+
+        os.replace(partial, self.checkpoint)
+
+    def _load(self) -> int:
+        """Read the first candidate not done from the checkpoint.
+
+        :returns: candidate to resume from
+        :rtype: int
+        :raises ValueError: if the checkpoint is malformed or belongs to another search or shard
+        :example: self._load() -> 263722000
+
+        """
+
+        with open(self.checkpoint, "rb") as file:
+            blob: bytes = file.read()
+
+        if len(blob) != CHECKPOINT.size:
+            raise ValueError("Checkpoint is malformed.")
+
+        version, shard, shards, digest, start = CHECKPOINT.unpack(blob)
+
+        if (version, shard, shards, digest) != (
+            CHECKPOINT_VERSION,
+            self.index,
+            self.count,
+            self._digest,
+        ):
+            raise ValueError("Checkpoint belongs to another search or shard.")
+        if not self.candidates.start <= start <= self.candidates.stop:
+            raise ValueError("Checkpoint is malformed.")
+
+        return start
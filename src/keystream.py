@@ -0,0 +1,437 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with full-period keystream tables and a memory-capped LRU cache of them."""
+
+from array import array
+from collections import OrderedDict
+from string import ascii_uppercase
+
+from engine import ALPHABET_SIZE, LETTER_INDEX, CompiledEnigma
+from formatting import NOT_LETTERS, group_text
+from rotors import PLUGBOARD_EMPTY, REFLECTORS, ROTORS, Rotor, Stator
+
+# number of states the three turning rotors can be in
+STATES: int = ALPHABET_SIZE**3
+
+# turns letters into their numbers
+TO_NUMBERS: bytes = bytes.maketrans(
+    ascii_uppercase.encode("ascii"), bytes(range(ALPHABET_SIZE))
+)
+
+
+def pack_state(offsets: list[int]) -> int:
+    """Pack the offsets of the three turning rotors into a single number.
+
+    :param offsets: wiring offset of each rotor; right-most rotor is the first one
+    :type offsets: list[int]
+    :returns: state number between 0 and `STATES` - 1
+    :rtype: int
+    :example: pack_state([1, 2, 3]) -> 2081
+
+    """
+
+    return offsets[0] + ALPHABET_SIZE * (offsets[1] + ALPHABET_SIZE * offsets[2])
+
+
+def unpack_state(state: int) -> list[int]:
+    """Unpack a state number into the offsets of the three turning rotors.
+
+    :param state: state number, as returned by `pack_state`
+    :type state: int
+    :returns: wiring offset of the three turning rotors
+    :rtype: list[int]
+    :example: unpack_state(2081) -> [1, 2, 3]
+
+    """
+
+    return [
+        state % ALPHABET_SIZE,
+        state // ALPHABET_SIZE % ALPHABET_SIZE,
+        state // ALPHABET_SIZE**2,
+    ]
+
+
+class KeystreamTable:
+    """Substitution of every rotor state of a machine configuration.
+    States are packed with `pack_state`; rotors past the third one never
+    turn, so their offsets are fixed for the whole table.
+
+    :param engine: compiled machine whose states will be tabulated
+    :type engine: CompiledEnigma
+    :param still: wiring offsets of the rotors that never turn
+    :type still: tuple[int, ...]
+    :returns: KeystreamTable
+    :rtype: KeystreamTable
+    :example: KeystreamTable(engine=machine.compiled(), still=())
+
+    """
+
+    def __init__(self, engine: CompiledEnigma, still: tuple[int, ...] = ()) -> None:
+        """Tabulate the substitution and the successor of every state."""
+
+        self.signature: tuple = engine.signature
+        self.still: tuple[int, ...] = still
+
+        # 26 letters per state, where index 26 * state + X holds the letter X is encrypted to
+        self.tables: str = self._tabulate(engine, still)
+
+        # state reached from each state on the next keypress
+        self.successor: array = array("H", bytes(2 * STATES))
+        for state in range(STATES):
+            offsets: list[int] = unpack_state(state)
+            engine.step(offsets)
+            self.successor[state] = pack_state(offsets)
+
+        # same substitutions as numbers, built when first needed
+        self._numbers: bytes | None = None
+
+        # every state ends up in a cycle; cycles are found lazily when first needed
+        self._cycles: list[array] = []
+        self._cycle_of: array = array("i", [-1]) * STATES
+        self._position: array = array("i", [-1]) * STATES
+
+    @staticmethod
+    def _tabulate(engine: CompiledEnigma, still: tuple[int, ...]) -> str:
+        """Compose the signal path of every state, reusing the part behind the right-most rotor.
+
+        :param engine: compiled machine whose states will be tabulated
+        :type engine: CompiledEnigma
+        :param still: wiring offsets of the rotors that never turn
+        :type still: tuple[int, ...]
+        :returns: letters of every state, 26 per state
+        :rtype: str
+        :example: KeystreamTable._tabulate(engine, ())[:26] -> "UEJOBTPZWCNSRKDGVMLFAQIYXH"
+
+        """
+
+        plugboard: bytes = engine.plugboard
+
+        # rotors that never turn are folded into the reflector once
+        reflector: list[int] = []
+        for number in range(ALPHABET_SIZE):
+            for rotor, offset in zip(engine.forward[3:], still):
+                number = rotor[offset][number]
+            number = engine.reflector[number]
+            for rotor, offset in reversed(list(zip(engine.reverse[3:], still))):
+                number = rotor[offset][number]
+            reflector.append(number)
+
+        letters: list[str] = []
+
+        for offset_2 in range(ALPHABET_SIZE):
+            for offset_1 in range(ALPHABET_SIZE):
+                # signal path through middle and left rotors, there and back
+                inner: list[int] = [
+                    engine.reverse[1][offset_1][
+                        engine.reverse[2][offset_2][
+                            reflector[
+                                engine.forward[2][offset_2][
+                                    engine.forward[1][offset_1][number]
+                                ]
+                            ]
+                        ]
+                    ]
+                    for number in range(ALPHABET_SIZE)
+                ]
+
+                for offset_0 in range(ALPHABET_SIZE):
+                    forward: bytes = engine.forward[0][offset_0]
+                    reverse: bytes = engine.reverse[0][offset_0]
+                    letters.extend(
+                        ascii_uppercase[
+                            plugboard[reverse[inner[forward[plugboard[number]]]]]
+                        ]
+                        for number in range(ALPHABET_SIZE)
+                    )
+
+        return "".join(letters)
+
+    @property
+    def numbers(self) -> bytes:
+        """Substitutions as letter numbers, where index 26 * state + X holds the number X is encrypted to.
+
+        :returns: numbers of every state, 26 per state
+        :rtype: bytes
+        :example: table.numbers[0] -> 20
+
+        """
+
+        if self._numbers is None:
+            self._numbers = self.tables.encode("ascii").translate(TO_NUMBERS)
+
+        return self._numbers
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the table, in bytes.
+
+        :returns: size of the substitutions, successors and cycles found so far
+        :rtype: int
+        :example: table.nbytes -> 666536
+
+        """
+
+        return (
+            len(self.tables)
+            + (len(self._numbers) if self._numbers is not None else 0)
+            + self.successor.itemsize * len(self.successor)
+            + self._cycle_of.itemsize * len(self._cycle_of)
+            + self._position.itemsize * len(self._position)
+            + sum(cycle.itemsize * len(cycle) for cycle in self._cycles)
+        )
+
+    def _locate(self, state: int) -> tuple[list[int], int, int]:
+        """Follow a state until it enters a cycle, recording the cycle if it is new.
+
+        :param state: state number to start from
+        :type state: int
+        :returns: states before the cycle, cycle number and position of the first state in the cycle
+        :rtype: tuple[list[int], int, int]
+        :example: self._locate(0) -> ([], 0, 0)
+
+        """
+
+        # states visited before reaching a known cycle
+        path: list[int] = []
+        visited: dict[int, int] = {}
+
+        while self._cycle_of[state] == -1 and state not in visited:
+            visited[state] = len(path)
+            path.append(state)
+            state = self.successor[state]
+
+        # walked into a cycle no one had seen yet
+        if self._cycle_of[state] == -1:
+            start: int = visited[state]
+            cycle: array = array("H", path[start:])
+
+            for position, cycle_state in enumerate(cycle):
+                self._cycle_of[cycle_state] = len(self._cycles)
+                self._position[cycle_state] = position
+
+            self._cycles.append(cycle)
+            path = path[:start]
+
+        return path, self._cycle_of[state], self._position[state]
+
+    def period(self, state: int) -> int:
+        """Get the number of keypresses after which the machine repeats itself.
+
+        :param state: state number to start from
+        :type state: int
+        :returns: length of the cycle the state ends up in
+        :rtype: int
+        :example: table.period(0) -> 16900
+
+        """
+
+        _, cycle, _ = self._locate(state)
+
+        return len(self._cycles[cycle])
+
+    def state_at(self, state: int, keypresses: int) -> int:
+        """Get the state reached after a number of keypresses, without stepping.
+
+        :param state: state number to start from
+        :type state: int
+        :param keypresses: number of keypresses
+        :type keypresses: int
+        :returns: state number after `keypresses` keypresses
+        :rtype: int
+        :example: table.state_at(0, 16900) -> 0
+
+        """
+
+        tail, cycle, position = self._locate(state)
+
+        if keypresses < len(tail):
+            return tail[keypresses]
+
+        states: array = self._cycles[cycle]
+
+        return states[(position + keypresses - len(tail)) % len(states)]
+
+    def encrypt(
+        self, plaintext: str, state: int, encryptions: int = 0
+    ) -> tuple[str, int, int]:
+        """Encrypt a plaintext string starting from the given state.
+        Output is the same as `Enigma.encrypt`, grouping included.
+
+        :param plaintext: text to be encrypted
+        :type plaintext: str
+        :param state: state number to start from
+        :type state: int
+        :param encryptions: letters encrypted before this call, defaults to 0
+        :type encryptions: int, optional
+        :returns: encrypted text, state number reached and updated encrypted-letter count
+        :rtype: tuple[str, int, int]
+        :example: table.encrypt("AAAAA", 0) -> (" BDZG O", 5, 5)
+
+        """
+
+        letters: str = NOT_LETTERS.sub("", plaintext)
+        ciphertext, state = self.encrypt_letters(letters, state)
+
+        return group_text(ciphertext, encryptions), state, encryptions + len(letters)
+
+    def encrypt_letters(self, letters: str, state: int) -> tuple[str, int]:
+        """Encrypt uppercase letters, ungrouped, starting from the given state.
+
+        :param letters: uppercase letters, nothing else
+        :type letters: str
+        :param state: state number to start from
+        :type state: int
+        :returns: encrypted letters and state number reached
+        :rtype: tuple[str, int]
+        :example: table.encrypt_letters("AAAAA", 0) -> ("BDZGO", 5)
+
+        """
+
+        tables: str = self.tables
+        successor: array = self.successor
+
+        # result of encryption of `letters`
+        ciphertext: list[str] = []
+        append = ciphertext.append
+
+        for letter in letters:
+            state = successor[state]
+            append(tables[ALPHABET_SIZE * state + LETTER_INDEX[letter]])
+
+        return "".join(ciphertext), state
+
+
+class KeystreamCache:
+    """Least recently used cache of keystream tables with a memory cap.
+
+    :param max_bytes: memory the cached tables may use, defaults to 64 MiB
+    :type max_bytes: int, optional
+    :returns: KeystreamCache
+    :rtype: KeystreamCache
+    :raises ValueError: if `max_bytes` is not positive
+    :example: KeystreamCache(max_bytes=16 * 2**20)
+
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20) -> None:
+        """Initialize an empty cache."""
+
+        if max_bytes <= 0:
+            raise ValueError("Memory cap must be a positive number of bytes.")
+
+        self.max_bytes: int = max_bytes
+
+        # most recently used table is the last one
+        self._tables: OrderedDict[tuple, KeystreamTable] = OrderedDict()
+
+        # keep track of how well the cache is doing
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        """Get the number of cached tables."""
+
+        return len(self._tables)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the cached tables, in bytes."""
+
+        return sum(table.nbytes for table in self._tables.values())
+
+    def get(
+        self, engine: CompiledEnigma, still: tuple[int, ...] = ()
+    ) -> KeystreamTable:
+        """Get the keystream table of a configuration, tabulating it on a miss.
+        Least recently used tables are evicted while the cache is over its
+        memory cap, though the requested table is always kept.
+
+        :param engine: compiled machine whose table is wanted
+        :type engine: CompiledEnigma
+        :param still: wiring offsets of the rotors that never turn, defaults to ()
+        :type still: tuple[int, ...], optional
+        :returns: keystream table of the configuration
+        :rtype: KeystreamTable
+        :example: KEYSTREAM_CACHE.get(machine.compiled()) -> KeystreamTable(...)
+
+        """
+
+        key: tuple = (engine.signature, still)
+        table: KeystreamTable | None = self._tables.get(key)
+
+        if table is not None:
+            self.hits += 1
+            self._tables.move_to_end(key)
+            return table
+
+        self.misses += 1
+        table = KeystreamTable(engine, still)
+        self._tables[key] = table
+
+        # evict least recently used tables until under the cap
+        while len(self._tables) > 1 and self.nbytes > self.max_bytes:
+            self._tables.popitem(last=False)
+
+        return table
+
+    def clear(self) -> None:
+        """Remove every cached table.
+
+        :returns: None
+        :rtype: None
+        :example: KEYSTREAM_CACHE.clear() -> None
+
+        """
+
+        self._tables.clear()
+
+
+# cache shared by every machine in the process
+KEYSTREAM_CACHE: KeystreamCache = KeystreamCache()
+
+
+def order_table(
+    order: tuple[str, ...],
+    ring_settings: str = "",
+    reflector: str = "B",
+    plugboard: Stator = PLUGBOARD_EMPTY,
+    cache: KeystreamCache = KEYSTREAM_CACHE,
+) -> KeystreamTable:
+    """Get the keystream table of a rotor order made of the default rotors.
+    States of the table are the rotor windows, since default rotors start at A.
+
+    :param order: names of the rotors from left to right, as in `ROTORS`
+    :type order: tuple[str, ...]
+    :param ring_settings: ring setting letters from left to right, defaults to all A
+    :type ring_settings: str, optional
+    :param reflector: name of the reflector, as in `REFLECTORS`, defaults to "B"
+    :type reflector: str, optional
+    :param plugboard: plugboard to be used, defaults to no plugs
+    :type plugboard: Stator, optional
+    :param cache: cache to get the table from, defaults to `KEYSTREAM_CACHE`
+    :type cache: KeystreamCache, optional
+    :returns: keystream table of the configuration
+    :rtype: KeystreamTable
+    :raises KeyError: if a rotor or reflector name is unknown
+    :example: order_table(("I", "II", "III"), "AAA", "B")
+
+    """
+
+    ring_settings = ring_settings or "A" * len(order)
+
+    # machines list the right-most rotor first
+    rotors: list[Rotor] = [
+        Rotor(
+            key=ROTORS[name].init_key,
+            notch=ROTORS[name].notch,
+            current_top="A",
+            ring_setting=ring_setting,
+        )
+        for name, ring_setting in zip(reversed(order), reversed(ring_settings))
+    ]
+
+    # rotors past the third one never turn and stay at A
+    return cache.get(
+        CompiledEnigma(rotors, plugboard, REFLECTORS[reflector]),
+        (0,) * (len(rotors) - 3),
+    )
@@ -4,17 +4,148 @@
 
 """Module containing a model of the Enigma machine in a class with methods to encrypt and decrypt text"""
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from string import ascii_uppercase
-
+from typing import BinaryIO, Iterable, Iterator, TextIO
+import os
+import struct
+import time
+
+from engine import (
+    ALPHABET_SIZE,
+    CompiledEnigma,
+    config_id,
+    offsets_after,
+    rotor_notch_offsets,
+    rotor_offsets,
+    signature,
+    turn_rotors_to,
+)
+from formatting import (
+    DEFAULT_FORMAT,
+    NOT_LETTER_BYTES,
+    NOT_LETTERS,
+    UNGROUPED,
+    TextFormat,
+    group_text,
+)
+from keystream import KEYSTREAM_CACHE, pack_state, unpack_state
+from metrics import Metrics
 from rotors import Rotor, Stator
+from shared import KeystreamHandle, SharedKeystream, attach
+from tracing import PrintTracer, RingBufferTracer, Tracer
+from vectorized import NUMPY_AVAILABLE, encrypt_letters
 
 from utils import format_key
 
+# ways `Enigma.encrypt` can run the cipher
+BACKENDS: tuple[str, ...] = ("reference", "compiled", "keystream", "numpy")
+
+# most input bytes `encrypt_into` filters at once, so mapped files aren't copied whole
+BUFFER_CHUNK: int = 1 << 20
+
+# layout of a snapshot: version, number of rotors, config id and letters
+# encrypted, then window, ring setting and wiring offset of each rotor
+SNAPSHOT_VERSION: int = 1
+SNAPSHOT_HEADER: struct.Struct = struct.Struct("<BB8sQ")
+SNAPSHOT_ROTOR: struct.Struct = struct.Struct("<BBB")
+
+# compiled machine shared by the chunks a worker process encrypts
+_WORKER_ENGINE: CompiledEnigma | None = None
+
+
+def _init_worker(engine: CompiledEnigma) -> None:
+    """Keep the compiled machine in a worker process so it's sent only once.
+
+    :param engine: compiled machine to encrypt chunks with
+    :type engine: CompiledEnigma
+    :returns: None
+    :rtype: None
+    :example: ProcessPoolExecutor(initializer=_init_worker, initargs=(engine,))
+
+    """
+
+    global _WORKER_ENGINE  # pylint: disable=global-statement
+    _WORKER_ENGINE = engine
+
+
+def _encrypt_chunk(chunk: str, offsets: list[int], encryptions: int) -> str:
+    """Encrypt a chunk of letters in a worker process.
+
+    :param chunk: letters to be encrypted
+    :type chunk: str
+    :param offsets: wiring offset of each rotor before the chunk
+    :type offsets: list[int]
+    :param encryptions: letters encrypted before the chunk
+    :type encryptions: int
+    :returns: encrypted chunk, grouped as if it were part of the whole text
+    :rtype: str
+    :example: _encrypt_chunk("HELLO", [0, 0, 0], 0) -> " HJYZ V"
+
+    """
+
+    ciphertext, _ = _WORKER_ENGINE.encrypt(chunk, offsets, encryptions)
+
+    return ciphertext
+
+
+def _encrypt_shared_chunk(
+    handle: KeystreamHandle, chunk: str, state: int, encryptions: int
+) -> str:
+    """Encrypt a chunk of letters in a worker process with a published keystream table.
+
+    :param handle: handle of the published table
+    :type handle: KeystreamHandle
+    :param chunk: letters to be encrypted
+    :type chunk: str
+    :param state: state number before the chunk, as packed by `pack_state`
+    :type state: int
+    :param encryptions: letters encrypted before the chunk
+    :type encryptions: int
+    :returns: encrypted chunk, grouped as if it were part of the whole text
+    :rtype: str
+    :example: _encrypt_shared_chunk(shared.handle, "HELLO", 0, 0) -> " HJYZ V"
+
+    """
+
+    ciphertext, _ = attach(handle).encrypt_letters(chunk, state)
+
+    return group_text(ciphertext, encryptions)
+
+
+def _group_bytes(letters: bytes, encryptions: int) -> bytes:
+    """Put a space before every fourth letter, counting letters encrypted before.
+
+    :param letters: encrypted letters, ungrouped
+    :type letters: bytes
+    :param encryptions: letters encrypted before these
+    :type encryptions: int
+    :returns: grouped letters
+    :rtype: bytes
+    :example: _group_bytes(b"BDZGO", 0) -> b" BDZG O"
+
+    """
+
+    # letters that still belong to the group started before these
+    head: int = -encryptions % 4
+
+    return letters[:head] + b"".join(
+        b" " + letters[start : start + 4] for start in range(head, len(letters), 4)
+    )
+
 
 class Enigma:
     """Model of the Enigma machine"""
 
-    def __init__(self, rotors: list[Rotor], plugboard: Stator, reflector: Stator):
+    def __init__(
+        self,
+        rotors: list[Rotor],
+        plugboard: Stator,
+        reflector: Stator,
+        tracer: Tracer | None = None,
+        metrics: Metrics | None = None,
+    ):
         """Initialize Enigma machine with rotors, plugboard and reflector.
 
         :param rotors: list of rotors to be used; right-most rotor is the first one in the list
@@ -23,6 +154,10 @@ class Enigma:
         :type plugboard: Stator
         :param reflector: reflector to be used
         :type reflector: Stator
+        :param tracer: receiver of each encryption step, defaults to None
+        :type tracer: Tracer | None, optional
+        :param metrics: counters and timings to be updated, defaults to None
+        :type metrics: Metrics | None, optional
         :returns: None
         :rtype: None
         :example: Enigma(rotors=[Rotor(...), Rotor(...), Rotor(...)], plugboard=Stator(...), reflector=Stator(...))
@@ -35,76 +170,409 @@ class Enigma:
 
         # keep track of how many letters have been encrypted
         self.encryptions: int = 0
-        # keep track of each individual encryption step
-        self.log: list[tuple] = []
+        # receives each individual encryption step; nothing is traced when unset
+        self.tracer: Tracer | None = tracer
+        # counts letters and turnovers; nothing is counted when unset
+        self.metrics: Metrics | None = metrics
+
+        # integer tables of the current configuration, compiled on demand
+        self._engine: CompiledEnigma | None = None
 
-    def _turn_rotors(self) -> None:
+        # rotor state the machine was built with, which `seek` counts from
+        self._origin: list[tuple[str, int]] = [
+            (rotor.current_top, rotor.times_turned) for rotor in rotors
+        ]
+
+    @property
+    def log(self) -> list[tuple[str, str, str]]:
+        """Get the encryption steps kept by a ring buffer tracer.
+
+        :returns: kept encryption steps, oldest first; empty if no ring buffer is set
+        :rtype: list[tuple[str, str, str]]
+        :example: self.log -> [("(A)BC...", "A", "A"), ...]
+
+        """
+
+        if isinstance(self.tracer, RingBufferTracer):
+            return self.tracer.steps()
+
+        return []
+
+    def compiled(self) -> CompiledEnigma:
+        """Get the machine compiled into integer permutation tables.
+        The tables are only rebuilt when the configuration changes.
+
+        :returns: compiled machine
+        :rtype: CompiledEnigma
+        :example: self.compiled() -> CompiledEnigma(...)
+
+        """
+
+        current: tuple = signature(self.rotors, self.plugboard, self.reflector)
+
+        if self._engine is None or self._engine.signature != current:
+            self._engine = CompiledEnigma(self.rotors, self.plugboard, self.reflector)
+
+        return self._engine
+
+    def _turn_rotors(self) -> bool:
         """Turn adjacent rotor to any one whose turnover is on top.
 
-        :returns: None
-        :rtype: None
-        :example: self._turn_rotors()
+        :returns: whether the middle rotor turned, and with it maybe the left one
+        :rtype: bool
+        :example: self._turn_rotors() -> False
 
         """
 
-        # TODO make rotor turning not hardcoded
-        # TODO support double notch
+        # only the three right-most rotors turn; a fourth one, like the M4's
+        # thin rotor, stays where it was set
 
-        # turn other rotors when current rotor notch is on top
-        if self.rotors[1].current_top == self.rotors[1].notch:
+        # turn other rotors when any of current rotor's notches is on top
+        double_step: bool = self.rotors[1].on_notch
+        if double_step:
             self.rotors[1].turn()
             self.rotors[2].turn()
 
-        if self.rotors[0].current_top == self.rotors[0].notch:
+        carry: bool = self.rotors[0].on_notch
+        if carry:
             self.rotors[1].turn()
 
         # right-most rotor turns on every key press
         self.rotors[0].turn()
 
+        return double_step or carry
+
+    def _inner_path(self) -> dict[str, str]:
+        """Map each letter through every rotor but the right-most one and the reflector, there and back.
+        That part of the signal path only changes when the middle rotor turns.
+
+        :returns: letter each letter comes back as
+        :rtype: dict[str, str]
+        :example: self._inner_path()["A"] -> "L"
+
+        """
+
+        inner: list[Rotor] = self.rotors[1:]
+
+        # whole mappings are composed, one translation per component
+        keys: list[str] = [rotor.get_key() for rotor in inner]
+        keys.append(self.reflector.key)
+        keys += [rotor.reverse_get_key() for rotor in reversed(inner)]
+
+        path: str = ascii_uppercase
+        for key in keys:
+            path = path.translate(str.maketrans(ascii_uppercase, key))
+
+        return dict(zip(ascii_uppercase, path))
+
+    def advance(self, keypresses: int) -> None:
+        """Turn rotors as if a number of letters had been encrypted, without stepping through them.
+
+        :param keypresses: number of letters to skip
+        :type keypresses: int
+        :returns: None
+        :rtype: None
+        :raises ValueError: if `keypresses` is negative
+        :example: self.advance(1000) -> None
+
+        """
+
+        offsets: list[int] = offsets_after(
+            rotor_offsets(self.rotors),
+            [rotor_notch_offsets(rotor) for rotor in self.rotors[:2]],
+            keypresses,
+        )
+
+        turn_rotors_to(self.rotors, offsets)
+
+        # keep grouping in step with the position in the stream
+        self.encryptions += keypresses
+
+    def seek(self, position: int) -> None:
+        """Put the machine where it would be after encrypting `position` letters
+        from the rotor state it was built with.
+
+        :param position: number of letters encrypted since the machine was built
+        :type position: int
+        :returns: None
+        :rtype: None
+        :raises ValueError: if `position` is negative
+        :example: self.seek(0) -> None
+
+        """
+
+        if position < 0:
+            raise ValueError("Position must not be negative.")
+
+        for rotor, (current_top, times_turned) in zip(self.rotors, self._origin):
+            rotor.current_top = current_top
+            rotor.times_turned = times_turned
+
+        self.encryptions = 0
+        self.advance(position)
+
+    def snapshot(self) -> bytes:
+        """Pack the state of the machine into a few bytes.
+        Wiring is only identified by its digest, so the blob can be restored
+        into any machine wired the same way, in this process or another.
+
+        :returns: state of the machine; 27 bytes for three rotors
+        :rtype: bytes
+        :example: self.snapshot() -> b"\\x01\\x03\\x8f..."
+
+        """
+
+        header: bytes = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION,
+            len(self.rotors),
+            config_id(self.rotors, self.plugboard, self.reflector),
+            self.encryptions,
+        )
+
+        return header + b"".join(
+            SNAPSHOT_ROTOR.pack(
+                ord(rotor.current_top) - 65,
+                ord(rotor.ring_setting) - 65,
+                rotor.times_turned % ALPHABET_SIZE,
+            )
+            for rotor in self.rotors
+        )
+
+    def restore(self, blob: bytes) -> None:
+        """Set the machine to the state packed by `snapshot`.
+        Takes the same time whatever the number of letters encrypted;
+        `seek` still counts from the state the machine was built with.
+
+        :param blob: state packed by `snapshot`
+        :type blob: bytes
+        :returns: None
+        :rtype: None
+        :raises ValueError: if the blob is malformed or comes from a machine wired differently
+        :example: self.restore(other.snapshot()) -> None
+
+        """
+
+        if len(blob) != SNAPSHOT_HEADER.size + SNAPSHOT_ROTOR.size * len(self.rotors):
+            raise ValueError("Snapshot doesn't fit this machine's rotors.")
+
+        version, count, wiring, encryptions = SNAPSHOT_HEADER.unpack_from(blob)
+
+        if version != SNAPSHOT_VERSION or count != len(self.rotors):
+            raise ValueError("Snapshot doesn't fit this machine's rotors.")
+        if wiring != config_id(self.rotors, self.plugboard, self.reflector):
+            raise ValueError("Snapshot comes from a machine wired differently.")
+
+        states: list[tuple[int, int, int]] = list(
+            SNAPSHOT_ROTOR.iter_unpack(blob[SNAPSHOT_HEADER.size :])
+        )
+
+        if any(value >= ALPHABET_SIZE for state in states for value in state):
+            raise ValueError("Snapshot holds a rotor position out of range.")
+
+        for rotor, (window, ring, offset) in zip(self.rotors, states):
+            rotor.current_top = ascii_uppercase[window]
+            rotor.ring_setting = ascii_uppercase[ring]
+            rotor.times_turned = offset
+
+        self.encryptions = encryptions
+
     def encrypt(
-        self, plaintext: str, verbose: bool = False, should_turn: bool = True
+        self,
+        plaintext: str,
+        verbose: bool = False,
+        should_turn: bool = True,
+        backend: str = "reference",
+        text_format: TextFormat = DEFAULT_FORMAT,
     ) -> str:
-        """Log and encrypt a plaintext string.
+        """Encrypt a plaintext string, tracing each step if a tracer is set.
 
         :param plaintext: text to be encrypted
         :type plaintext: str
-        :param verbose: whether to print encryption log, defaults to False
+        :param verbose: whether to print encryption steps, defaults to False
         :type verbose: bool, optional
         :param should_turn: whether to turn rotors, defaults to True
         :type should_turn: bool, optional
+        :param backend: "reference" to step through every component, "compiled" to use permutation tables (slower than "reference" on short messages, it only pays off on long ones, as the tables of each rotor state are composed the first time it's reached), "keystream" to use cached full-period tables or "numpy" to gather over the whole message (falls back to "compiled" without NumPy), defaults to "reference"
+        :type backend: str, optional
+        :param text_format: how plaintext is normalized and ciphertext laid out, defaults to dropping anything but A-Z and grouping by four
+        :type text_format: TextFormat, optional
         :returns: encrypted text
         :rtype: str
+        :raises ValueError: if backend is unknown
         :example: self.encrypt_wrapper(plaintext="HELLO", verbose=True, should_turn=True) -> "IVFKP"
 
         """
-        self.log = []
 
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend must be one of {', '.join(BACKENDS)}.")
+
+        # steps are only formatted when someone is listening
+        tracer: Tracer | None = self.tracer
+        if verbose:
+            tracer = PrintTracer(then=tracer)
+
+        # compiled tables don't keep the intermediate letters needed for tracing
+        if tracer is not None:
+            backend = "reference"
+        elif backend == "keystream" and not should_turn:
+            backend = "compiled"
+        elif backend == "numpy" and not NUMPY_AVAILABLE:
+            backend = "compiled"
+
+        metrics: Metrics | None = self.metrics
+        if metrics is None:
+            return self._encrypt_with(
+                backend, plaintext, should_turn, tracer, text_format
+            )
+
+        started: float = time.perf_counter()
+        offsets: list[int] = rotor_offsets(self.rotors)
+        notches: list[tuple[int, ...]] = [
+            rotor_notch_offsets(rotor) for rotor in self.rotors[:2]
+        ]
+        encryptions: int = self.encryptions
 
-        # result of encryption of `plaintext`
-        ciphertext: str = ""
+        ciphertext: str = self._encrypt_with(
+            backend, plaintext, should_turn, tracer, text_format
+        )
 
-        for letter in plaintext:
-            # not a letter
-            if letter not in ascii_uppercase:
-                # ciphertext += letter
-                continue
+        metrics.count(offsets, notches, self.encryptions - encryptions, should_turn)
+        metrics.time_call(backend, time.perf_counter() - started)
+
+        return ciphertext
+
+    def _encrypt_with(
+        self,
+        backend: str,
+        plaintext: str,
+        should_turn: bool,
+        tracer: Tracer | None,
+        text_format: TextFormat = DEFAULT_FORMAT,
+    ) -> str:
+        """Encrypt a plaintext string with a backend that can run as asked.
+        Normalization and layout are whole-message passes around the backend,
+        which only sees the letters to encrypt.
+
+        :param backend: backend to encrypt with
+        :type backend: str
+        :param plaintext: text to be encrypted
+        :type plaintext: str
+        :param should_turn: whether to turn rotors
+        :type should_turn: bool
+        :param tracer: receiver of each encryption step, only used by "reference"
+        :type tracer: Tracer | None
+        :param text_format: how plaintext is normalized and ciphertext laid out, defaults to dropping anything but A-Z and grouping by four
+        :type text_format: TextFormat, optional
+        :returns: encrypted text
+        :rtype: str
+        :example: self._encrypt_with("compiled", "HELLO", True, None) -> " HJYZ V"
+
+        """
+
+        letters, runs = text_format.split(plaintext)
+        encryptions: int = self.encryptions
+
+        if backend == "keystream":
+            ciphertext: str = self._encrypt_keystream(letters)
+        elif backend == "numpy":
+            ciphertext = self._encrypt_numpy(letters, should_turn)
+        elif backend == "compiled":
+            ciphertext = self._encrypt_compiled(letters, should_turn)
+        else:
+            ciphertext = self._encrypt_reference(letters, should_turn, tracer)
+
+        return text_format.join(ciphertext, runs, encryptions)
+
+    def _encrypt_reference(
+        self, letters: str, should_turn: bool, tracer: Tracer | None
+    ) -> str:
+        """Encrypt uppercase letters stepping through every component.
+        Stages of every `metrics.sample_every`-th letter are timed. Letters
+        that are neither traced nor timed skip the middle and left rotors and
+        reflector, whose joint path is kept until the middle rotor turns.
+
+        :param letters: uppercase letters to be encrypted, nothing else
+        :type letters: str
+        :param should_turn: whether to turn rotors
+        :type should_turn: bool
+        :param tracer: receiver of each encryption step, defaults to None
+        :type tracer: Tracer | None
+        :returns: encrypted letters, ungrouped
+        :rtype: str
+        :example: self._encrypt_reference("HELLO", True, None) -> "HJYZV"
+
+        """
+
+        # result of encryption of `plaintext`, joined once at the end
+        ciphertext: list[str] = []
+
+        # encryption steps of the current letter
+        log: list[tuple[str, str, str]] | None = None
+
+        # stages are only timed on sampled letters, so unsampled ones pay a check
+        sample_every: int = self.metrics.sample_every if self.metrics else 0
+        timed: bool = False
+        clock: float = 0.0
+
+        # path behind the right-most rotor, built when first needed
+        inner: dict[str, str] | None = None
+        right: Rotor = self.rotors[0]
+        plugboard: Stator = self.plugboard
+
+        def lap(stage: str) -> None:
+            """Add the time since the last lap to a stage."""
+
+            nonlocal clock
+
+            now: float = time.perf_counter()
+            self.metrics.stages[stage] += now - clock
+            clock = now
+
+        for letter in letters:
+            if sample_every:
+                timed = self.encryptions % sample_every == 0
+                if timed:
+                    self.metrics.samples += 1
+                    clock = time.perf_counter()
 
             # wether to turn rotors or stay in the same state
-            if should_turn is True:
-                self._turn_rotors()
+            if should_turn is True and self._turn_rotors():
+                inner = None
+            if timed:
+                lap("stepping")
+
+            # nothing to report, so only plugboard and right-most rotor are gone through
+            if tracer is None and not timed:
+                if inner is None:
+                    inner = self._inner_path()
+
+                cypher_letter: str = plugboard.encrypt_letter(letter)
+                cypher_letter = right.encrypt_letter(cypher_letter)
+                cypher_letter = right.reverse_encrypt_letter(inner[cypher_letter])
+                ciphertext.append(plugboard.encrypt_letter(cypher_letter))
+
+                # increment encrypted-letter count by one
+                self.encryptions += 1
+                continue
 
             # the enciphering of a character resulting from the application of
             # a given component's mapping serves as the input to the mapping of
             # the subsequent component
-            # self.log.append((ascii_uppercase, letter, letter))
-            self.log.append((format_key(ascii_uppercase, letter), letter, letter))
+            if tracer is not None:
+                log = [(format_key(ascii_uppercase, letter), letter, letter)]
 
             # substitute letter in plugboard
             cypher_letter: str = self.plugboard.encrypt_letter(letter)
-            # self.log.append((self.plugboard.key, letter, cypher_letter))
-            self.log.append(
-                (format_key(self.plugboard.key, cypher_letter), letter, cypher_letter)
-            )
+            if log is not None:
+                log.append(
+                    (
+                        format_key(self.plugboard.key, cypher_letter),
+                        letter,
+                        cypher_letter,
+                    )
+                )
+            if timed:
+                lap("plugboard")
 
             # aux for logging
             old_cypher_letter: str = cypher_letter
@@ -113,61 +581,375 @@ class Enigma:
             for rotor in self.rotors:
                 # update key for rotor-rotor mapping
                 cypher_letter: str = rotor.encrypt_letter(cypher_letter)
-                # self.log.append((rotor.get_key(), old_cypher_letter, cypher_letter))
-                self.log.append(
-                    (
-                        format_key(rotor.get_key(), cypher_letter),
-                        old_cypher_letter,
-                        cypher_letter,
+                if log is not None:
+                    log.append(
+                        (
+                            format_key(rotor.get_key(), cypher_letter),
+                            old_cypher_letter,
+                            cypher_letter,
+                        )
                     )
-                )
                 old_cypher_letter: str = cypher_letter
+            if timed:
+                lap("forward")
 
             # reflect letter
             cypher_letter: str = self.reflector.encrypt_letter(cypher_letter)
-            # self.log.append((self.reflector.key, old_cypher_letter, cypher_letter))
-            self.log.append(
-                (
-                    format_key(self.reflector.key, cypher_letter),
-                    old_cypher_letter,
-                    cypher_letter,
+            if log is not None:
+                log.append(
+                    (
+                        format_key(self.reflector.key, cypher_letter),
+                        old_cypher_letter,
+                        cypher_letter,
+                    )
                 )
-            )
             old_cypher_letter: str = cypher_letter
+            if timed:
+                lap("reflector")
 
             # current flowing in reverse direction
             for rotor in reversed(self.rotors):
                 # update key for reflector-rotor mapping
                 cypher_letter: str = rotor.reverse_encrypt_letter(cypher_letter)
-                # self.log.append(
-                #     (rotor.reverse_get_key(), old_cypher_letter, cypher_letter)
-                # )
-                self.log.append(
-                    (
-                        format_key(rotor.reverse_get_key(), cypher_letter),
-                        old_cypher_letter,
-                        cypher_letter,
+                if log is not None:
+                    log.append(
+                        (
+                            format_key(rotor.reverse_get_key(), cypher_letter),
+                            old_cypher_letter,
+                            cypher_letter,
+                        )
                     )
-                )
                 old_cypher_letter: str = cypher_letter
+            if timed:
+                lap("reverse")
 
             # substitute letter in plugboard
             cypher_letter: str = self.plugboard.encrypt_letter(cypher_letter)
-            # self.log.append((self.plugboard.key, old_cypher_letter, cypher_letter))
-            self.log.append(
-                (format_key(self.plugboard.key, cypher_letter), letter, cypher_letter)
-            )
+            if log is not None:
+                log.append(
+                    (
+                        format_key(self.plugboard.key, cypher_letter),
+                        letter,
+                        cypher_letter,
+                    )
+                )
+
+                # hand encryption steps of the letter over
+                tracer.record(self.encryptions, log)
+            if timed:
+                lap("plugboard")
 
-            if self.encryptions % 4 == 0:
-                ciphertext += " "
-            ciphertext += cypher_letter
+            ciphertext.append(cypher_letter)
+            if timed:
+                lap("output")
 
             # increment encrypted-letter count by one
             self.encryptions += 1
 
-            # print encryption log for the letter
-            if verbose:
-                for entry in self.log:
-                    print(entry)
+        return "".join(ciphertext)
+
+    def encrypt_stream(
+        self,
+        source: Iterable[str | bytes] | BinaryIO | TextIO,
+        chunk_size: int = 1 << 16,
+        backend: str = "compiled",
+        text_format: TextFormat = DEFAULT_FORMAT,
+    ) -> Iterator[str]:
+        """Encrypt text as it is read, yielding encrypted chunks.
+        Rotors and grouping carry over from one chunk to the next, so joining
+        the chunks gives the same result as a single `encrypt` call.
+
+        :param source: iterable of str or bytes, or a file object opened in binary or text mode
+        :type source: Iterable[str | bytes] | BinaryIO | TextIO
+        :param chunk_size: most characters encrypted at once, defaults to 65536
+        :type chunk_size: int, optional
+        :param backend: backend each chunk is encrypted with, defaults to "compiled"
+        :type backend: str, optional
+        :param text_format: how plaintext is normalized and ciphertext laid out, defaults to dropping anything but A-Z and grouping by four
+        :type text_format: TextFormat, optional
+        :returns: generator of encrypted chunks
+        :rtype: Iterator[str]
+        :raises ValueError: if `chunk_size` is not positive
+        :example: "".join(self.encrypt_stream(open("message.txt", "rb"))) -> " HJYZ V..."
+
+        """
+
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be positive.")
+
+        # file objects are read a chunk at a time, anything else is iterated
+        if hasattr(source, "read"):
+            source = iter(partial(source.read, chunk_size), source.read(0))
+
+        for piece in source:
+            # bytes keep one character per byte; anything outside A-Z is skipped anyway
+            if isinstance(piece, (bytes, bytearray, memoryview)):
+                piece = bytes(piece).decode("latin-1")
+
+            for start in range(0, len(piece), chunk_size):
+                ciphertext: str = self.encrypt(
+                    piece[start : start + chunk_size],
+                    backend=backend,
+                    text_format=text_format,
+                )
+
+                if ciphertext:
+                    yield ciphertext
+
+    def encrypt_into(self, data: bytes, out: bytearray, group: bool = False) -> int:
+        """Encrypt bytes straight into a preallocated buffer.
+        Anything but uppercase ASCII letters is skipped, as `encrypt` skips it;
+        rotors and letter count move on as if `encrypt` had been called. Input
+        is read in slices, so memory-mapped files are never copied whole.
+
+        :param data: bytes, bytearray, memoryview, mmap or anything else exposing a contiguous buffer
+        :type data: bytes
+        :param out: writable buffer the ciphertext is written to, from its start
+        :type out: bytearray
+        :param group: whether to put a space before every fourth letter as `encrypt` does, defaults to False
+        :type group: bool, optional
+        :returns: number of bytes written to `out`
+        :rtype: int
+        :raises TypeError: if `out` is read-only
+        :raises ValueError: if `out` can't hold the ciphertext; nothing is written then
+        :example: self.encrypt_into(b"HELLO", buffer) -> 5
+
+        """
+
+        source: memoryview = memoryview(data).cast("B")
+        target: memoryview = memoryview(out).cast("B")
+
+        if target.readonly:
+            raise TypeError("Output buffer must be writable.")
+
+        starts: range = range(0, len(source), BUFFER_CHUNK)
+
+        def letters_at(start: int) -> bytes:
+            """Get the letters of a slice of the input, dropping everything else."""
+
+            piece: bytes = source[start : start + BUFFER_CHUNK].tobytes()
+
+            return piece.translate(None, NOT_LETTER_BYTES)
+
+        # count letters first, so a buffer too small is refused before anything moves
+        letters: int = sum(len(letters_at(start)) for start in starts)
+        needed: int = letters
+        if group:
+            # letter counts that are multiples of 4 get a space
+            first, last = self.encryptions, self.encryptions + letters
+            needed += (last + 3) // 4 - (first + 3) // 4
+
+        if needed > len(target):
+            raise ValueError(
+                f"Output buffer holds {len(target)} bytes, ciphertext needs {needed}."
+            )
+
+        written: int = 0
+
+        for start in starts:
+            encryptions: int = self.encryptions
+            ciphertext: bytes = self._encrypt_bytes(letters_at(start))
+
+            if group:
+                ciphertext = _group_bytes(ciphertext, encryptions)
+
+            target[written : written + len(ciphertext)] = ciphertext
+            written += len(ciphertext)
+
+        return written
+
+    def _encrypt_bytes(self, letters: bytes) -> bytes:
+        """Encrypt uppercase ASCII letters, ungrouped, with the quickest backend at hand.
+
+        :param letters: uppercase ASCII letters, nothing else
+        :type letters: bytes
+        :returns: encrypted letters
+        :rtype: bytes
+        :example: self._encrypt_bytes(b"HELLO") -> b"HJYZV"
+
+        """
+
+        # tracing and metrics are `encrypt`'s business
+        if self.tracer is not None or self.metrics is not None:
+            backend: str = "numpy" if NUMPY_AVAILABLE else "compiled"
+            return self.encrypt(
+                letters.decode("ascii"), backend=backend, text_format=UNGROUPED
+            ).encode("ascii")
+
+        engine: CompiledEnigma = self.compiled()
+        offsets: list[int] = rotor_offsets(self.rotors)
+
+        if NUMPY_AVAILABLE:
+            ciphertext: bytes = encrypt_letters(engine, offsets, letters)
+            offsets = offsets_after(offsets, list(engine.notches[:2]), len(letters))
+        else:
+            ciphertext = engine.encrypt_bytes(letters, offsets)
+
+        turn_rotors_to(self.rotors, offsets)
+        self.encryptions += len(letters)
+
+        return ciphertext
+
+    def encrypt_parallel(
+        self,
+        plaintext: str,
+        workers: int | None = None,
+        chunk_size: int = 1 << 16,
+        shared: bool = False,
+    ) -> str:
+        """Encrypt a plaintext string split into chunks across a process pool.
+        Each chunk starts from the rotor state its offset leads to, so the
+        result is the same as `encrypt`, grouping included. With `shared`,
+        the keystream table of the machine is published once into shared
+        memory and every worker reads it in place instead of composing
+        tables of its own.
+
+        :param plaintext: text to be encrypted
+        :type plaintext: str
+        :param workers: number of processes, defaults to the number of CPUs
+        :type workers: int | None, optional
+        :param chunk_size: smallest number of letters worth sending to a process, defaults to 65536
+        :type chunk_size: int, optional
+        :param shared: whether workers read a keystream table from shared memory, defaults to False
+        :type shared: bool, optional
+        :returns: encrypted text
+        :rtype: str
+        :raises ValueError: if `workers` or `chunk_size` is not positive
+        :example: self.encrypt_parallel(plaintext="HELLO" * 100000, workers=64, shared=True) -> " HJYZ V..."
+
+        """
+
+        workers = workers or os.cpu_count() or 1
+
+        if workers <= 0 or chunk_size <= 0:
+            raise ValueError("Workers and chunk size must be positive.")
+
+        # drop what `encrypt` would skip so offsets count letters only
+        letters: str = NOT_LETTERS.sub("", plaintext)
+
+        # split evenly, but not into chunks too small to be worth a process
+        size: int = max(chunk_size, -(-len(letters) // workers))
+
+        if workers == 1 or len(letters) <= size:
+            return self.encrypt(letters, backend="compiled")
+
+        engine: CompiledEnigma = self.compiled()
+        offsets: list[int] = rotor_offsets(self.rotors)
+        notches: list[tuple[int, ...]] = list(engine.notches[:2])
+
+        starts: range = range(0, len(letters), size)
+        chunks: list[str] = [letters[start : start + size] for start in starts]
+        before: list[list[int]] = [
+            offsets_after(offsets, notches, start) for start in starts
+        ]
+        encryptions: list[int] = [self.encryptions + start for start in starts]
+
+        if shared:
+            table = KEYSTREAM_CACHE.get(engine, tuple(offsets[3:]))
+
+            # workers get a handle to the table, never the table itself
+            with SharedKeystream(table) as published, ProcessPoolExecutor(
+                max_workers=min(workers, len(starts))
+            ) as pool:
+                ciphertext: str = "".join(
+                    pool.map(
+                        _encrypt_shared_chunk,
+                        [published.handle] * len(starts),
+                        chunks,
+                        [pack_state(state) for state in before],
+                        encryptions,
+                    )
+                )
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(starts)),
+                initializer=_init_worker,
+                initargs=(engine,),
+            ) as pool:
+                ciphertext = "".join(
+                    pool.map(_encrypt_chunk, chunks, before, encryptions)
+                )
+
+        turn_rotors_to(self.rotors, offsets_after(offsets, notches, len(letters)))
+        self.encryptions += len(letters)
+
+        if self.metrics is not None:
+            self.metrics.count(offsets, notches, len(letters), True)
+
+        return ciphertext
+
+    def _encrypt_compiled(self, letters: str, should_turn: bool) -> str:
+        """Encrypt uppercase letters with the compiled permutation tables.
+        Rotors end up in the same state as if `encrypt` had turned them.
+
+        :param letters: uppercase letters to be encrypted, nothing else
+        :type letters: str
+        :param should_turn: whether to turn rotors
+        :type should_turn: bool
+        :returns: encrypted letters, ungrouped
+        :rtype: str
+        :example: self._encrypt_compiled(letters="HELLO", should_turn=True) -> "HJYZV"
+
+        """
+
+        offsets: list[int] = rotor_offsets(self.rotors)
+
+        ciphertext: str = self.compiled().encrypt_letters(letters, offsets, should_turn)
+
+        turn_rotors_to(self.rotors, offsets)
+        self.encryptions += len(letters)
+
+        return ciphertext
+
+    def _encrypt_keystream(self, letters: str) -> str:
+        """Encrypt uppercase letters with the cached full-period keystream table.
+        Rotors end up in the same state as if `encrypt` had turned them.
+
+        :param letters: uppercase letters to be encrypted, nothing else
+        :type letters: str
+        :returns: encrypted letters, ungrouped
+        :rtype: str
+        :example: self._encrypt_keystream(letters="HELLO") -> "HJYZV"
+
+        """
+
+        offsets: list[int] = rotor_offsets(self.rotors)
+        table = KEYSTREAM_CACHE.get(self.compiled(), tuple(offsets[3:]))
+
+        ciphertext, state = table.encrypt_letters(letters, pack_state(offsets))
+
+        offsets[:3] = unpack_state(state)
+        turn_rotors_to(self.rotors, offsets)
+        self.encryptions += len(letters)
+
+        return ciphertext
+
+    def _encrypt_numpy(self, letters: str, should_turn: bool) -> str:
+        """Encrypt uppercase letters as batched gathers over the whole message.
+        Rotors end up in the same state as if `encrypt` had turned them.
+
+        :param letters: uppercase letters to be encrypted, nothing else
+        :type letters: str
+        :param should_turn: whether to turn rotors
+        :type should_turn: bool
+        :returns: encrypted letters, ungrouped
+        :rtype: str
+        :example: self._encrypt_numpy(letters="HELLO", should_turn=True) -> "HJYZV"
+
+        """
+
+        engine: CompiledEnigma = self.compiled()
+        offsets: list[int] = rotor_offsets(self.rotors)
+
+        ciphertext: str = encrypt_letters(
+            engine, offsets, letters.encode("ascii"), should_turn
+        ).decode("ascii")
+
+        if should_turn:
+            turn_rotors_to(
+                self.rotors,
+                offsets_after(offsets, list(engine.notches[:2]), len(letters)),
+            )
+        self.encryptions += len(letters)
 
         return ciphertext
@@ -4,13 +4,42 @@
 
 """Module for CLI interface."""
 
+from concurrent.futures import ProcessPoolExecutor
+import json
 import sys
 
+from formatting import TextFormat
 from machine import Enigma
+from metrics import Metrics
 from rotors import ROTOR_I, ROTOR_II, ROTOR_III, PLUGBOARD_EMPTY, REFLECTOR_B
+from server import run_server
 from utils import quit_safely
 
 
+def serve(address: list[str]) -> None:
+    """Run the encryption server until interrupted.
+    Addresses are HOST:PORT, :PORT or a Unix socket path.
+
+    :param address: address to listen on, defaults to 127.0.0.1:8765 when empty
+    :type address: list[str]
+    :returns: None
+    :rtype: None
+    :raises ValueError: if the port is not a number
+    :example: serve(["127.0.0.1:8765"])
+
+    """
+
+    where: str = address[0] if address else "127.0.0.1:8765"
+
+    # bulk chunks are encrypted in other processes, leaving the event loop free
+    with ProcessPoolExecutor() as executor:
+        if ":" not in where:
+            run_server(path=where, executor=executor)
+        else:
+            host, port = where.rsplit(":", 1)
+            run_server(host=host or None, port=int(port), executor=executor)
+
+
 @quit_safely
 def main() -> None:
     """This function is executed when the script is run directly.
@@ -22,6 +51,24 @@ def main() -> None:
 
     """
 
+    # serve many sessions over a socket instead of reading from the terminal
+    if "--serve" in sys.argv[1:]:
+        serve(sys.argv[sys.argv.index("--serve") + 1 :][:1])
+        return
+
+    verbose: bool = "--verbose" in sys.argv[1:] or "-v" in sys.argv[1:]
+
+    # time the stages of every letter, since typed messages are short
+    metrics: Metrics | None = None
+    if "--profile" in sys.argv[1:]:
+        metrics = Metrics(sample_every=1)
+
+    # spaces are typed as X, as operators did, and punctuation kept in place on request
+    text_format: TextFormat = TextFormat(
+        space="X" if "--x-for-space" in sys.argv[1:] else "",
+        keep_punctuation="--keep-punctuation" in sys.argv[1:],
+    )
+
     machine: Enigma = Enigma(
         rotors=[
             # right-most rotor
@@ -33,13 +80,9 @@ def main() -> None:
         ],
         plugboard=PLUGBOARD_EMPTY,
         reflector=REFLECTOR_B,
+        metrics=metrics,
     )
 
-    verbose: bool = False
-
-    if len(sys.argv) > 1 and sys.argv[1] in ("--verbose", "-v"):
-        verbose = True
-
     while True:
         # get current settings
         settings: str = ""
@@ -53,9 +96,14 @@ def main() -> None:
         plaintext: str = input(">>> ").strip().upper()
 
         print(f"Current settings: {settings}")
-        ciphertext: str = machine.encrypt(plaintext=plaintext, verbose=verbose)
+        ciphertext: str = machine.encrypt(
+            plaintext=plaintext, verbose=verbose, text_format=text_format
+        )
         print(f"\nEncrypted: {ciphertext}")
 
+        if metrics is not None:
+            print(f"Metrics: {json.dumps(metrics.snapshot(), indent=2)}")
+
 
 if __name__ == "__main__":
     main()
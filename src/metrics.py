@@ -0,0 +1,143 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with runtime counters and sampled per-stage timings of a machine."""
+
+from engine import step_counts
+
+# stages of the reference encryption that can be timed
+STAGES: tuple[str, ...] = (
+    "stepping",
+    "plugboard",
+    "forward",
+    "reflector",
+    "reverse",
+    "output",
+)
+
+
+class Metrics:
+    """Counters of what a machine did, and optional timings of where time went.
+    Counting costs a few integer operations per `encrypt` call, whatever the
+    backend; stage timings are only taken by the reference backend, and only
+    on every `sample_every`-th letter.
+
+    :param sample_every: time the stages of one letter out of this many, defaults to 0 (never)
+    :type sample_every: int, optional
+    :returns: Metrics
+    :rtype: Metrics
+    :raises ValueError: if `sample_every` is negative
+    :example: Enigma(..., metrics=Metrics(sample_every=100))
+
+    """
+
+    def __init__(self, sample_every: int = 0) -> None:
+        """Initialize every counter to zero."""
+
+        if sample_every < 0:
+            raise ValueError("Sampling interval must not be negative.")
+
+        self.sample_every: int = sample_every
+        self.reset()
+
+    def reset(self) -> None:
+        """Set every counter and timing back to zero.
+
+        :returns: None
+        :rtype: None
+        :example: metrics.reset() -> None
+
+        """
+
+        # letters encrypted, whichever backend encrypted them
+        self.letters: int = 0
+        # ... and how many of them turned the rotors
+        self.keypresses: int = 0
+        # times the right-most rotor turned the middle one
+        self.carries: int = 0
+        # times the middle rotor turned itself and the left one
+        self.double_steps: int = 0
+
+        # calls and seconds spent by each backend
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+
+        # seconds spent on each stage of the sampled letters
+        self.samples: int = 0
+        self.stages: dict[str, float] = dict.fromkeys(STAGES, 0.0)
+
+    def count(
+        self,
+        offsets: list[int],
+        notches: list[tuple[int, ...]],
+        letters: int,
+        should_turn: bool,
+    ) -> None:
+        """Count the letters of an encryption and the turnovers they caused.
+
+        :param offsets: wiring offset of each rotor before the letters
+        :type offsets: list[int]
+        :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+        :type notches: list[tuple[int, ...]]
+        :param letters: number of letters encrypted
+        :type letters: int
+        :param should_turn: whether rotors were turned
+        :type should_turn: bool
+        :returns: None
+        :rtype: None
+        :example: metrics.count([0, 0, 0], [(21,), (4,)], 1000, True) -> None
+
+        """
+
+        self.letters += letters
+
+        if should_turn:
+            self.keypresses += letters
+            carries, double_steps = step_counts(offsets, notches, letters)
+            self.carries += carries
+            self.double_steps += double_steps
+
+    def time_call(self, backend: str, seconds: float) -> None:
+        """Add an `encrypt` call and the time it took.
+
+        :param backend: backend that encrypted
+        :type backend: str
+        :param seconds: time the call took
+        :type seconds: float
+        :returns: None
+        :rtype: None
+        :example: metrics.time_call("compiled", 0.002) -> None
+
+        """
+
+        self.calls[backend] = self.calls.get(backend, 0) + 1
+        self.seconds[backend] = self.seconds.get(backend, 0.0) + seconds
+
+    def snapshot(self) -> dict:
+        """Get every counter and timing as plain values.
+        Stage timings are given per sampled letter.
+
+        :returns: counters, rotor turns from right to left, calls and timings
+        :rtype: dict
+        :example: metrics.snapshot() -> {"letters": 1000, "turnovers": 40, ...}
+
+        """
+
+        samples: int = self.samples or 1
+
+        return {
+            "letters": self.letters,
+            "turnovers": self.carries + self.double_steps,
+            "double_steps": self.double_steps,
+            # the middle rotor turns on carries and on double steps, the left one only on the latter
+            "rotor_turns": [
+                self.keypresses,
+                self.carries + self.double_steps,
+                self.double_steps,
+            ],
+            "calls": dict(self.calls),
+            "seconds": dict(self.seconds),
+            "sampled_letters": self.samples,
+            "stage_seconds": {
+                stage: seconds / samples for stage, seconds in self.stages.items()
+            },
+        }
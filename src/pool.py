@@ -0,0 +1,204 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with a least recently used pool of machine configs keyed by daily key settings."""
+
+from collections import OrderedDict
+from typing import Iterable
+
+from config import MachineConfig
+from machine import Enigma
+from metrics import Metrics
+from tracing import Tracer
+
+
+def settings_key(
+    order: Iterable[str],
+    ring_settings: str = "",
+    reflector: str = "B",
+    steckers: Iterable[str] = (),
+) -> tuple:
+    """Normalize key settings so equal keys written differently match.
+    Ring settings default to all A, and stecker pairs are sorted both ways.
+
+    :param order: names of the rotors from left to right
+    :type order: Iterable[str]
+    :param ring_settings: ring setting letters from left to right, defaults to all A
+    :type ring_settings: str, optional
+    :param reflector: name of the reflector, defaults to "B"
+    :type reflector: str, optional
+    :param steckers: pairs of letters plugged together, defaults to none
+    :type steckers: Iterable[str], optional
+    :returns: hashable settings
+    :rtype: tuple
+    :example: settings_key(["iv", "I", "III"], "", "B", ["QA", "ez"]) -> (("IV", "I", "III"), "AAA", "B", ("AQ", "EZ"))
+
+    """
+
+    order = tuple(name.upper() for name in order)
+
+    return (
+        order,
+        ring_settings.upper() or "A" * len(order),
+        reflector.upper(),
+        tuple(sorted("".join(sorted(pair.upper())) for pair in steckers)),
+    )
+
+
+class MachinePool:
+    """Least recently used pool of machine configs with a size and a memory cap.
+    Configs are checked and compiled once; every machine handed out is a
+    fresh clone of one, reset to the asked window letters.
+
+    :param max_size: most configs kept, defaults to 128
+    :type max_size: int, optional
+    :param max_bytes: memory the kept configs may use, defaults to 64 MiB
+    :type max_bytes: int, optional
+    :returns: MachinePool
+    :rtype: MachinePool
+    :raises ValueError: if `max_size` or `max_bytes` is not positive
+    :example: MachinePool(max_size=32, max_bytes=16 * 2**20)
+
+    """
+
+    def __init__(self, max_size: int = 128, max_bytes: int = 64 * 2**20) -> None:
+        """Initialize an empty pool."""
+
+        if max_size <= 0 or max_bytes <= 0:
+            raise ValueError("Pool size and memory cap must be positive.")
+
+        self.max_size: int = max_size
+        self.max_bytes: int = max_bytes
+
+        # most recently used config is the last one
+        self._configs: OrderedDict[tuple, MachineConfig] = OrderedDict()
+
+        # keep track of how well the pool is doing
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        """Get the number of kept configs."""
+
+        return len(self._configs)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the kept configs, in bytes."""
+
+        return sum(config.nbytes for config in self._configs.values())
+
+    def config(
+        self,
+        order: Iterable[str],
+        ring_settings: str = "",
+        reflector: str = "B",
+        steckers: Iterable[str] = (),
+    ) -> MachineConfig:
+        """Get the config of some key settings, building it on a miss.
+        Least recently used configs are evicted while the pool is over either
+        cap, though the requested config is always kept.
+
+        :param order: names of the rotors from left to right
+        :type order: Iterable[str]
+        :param ring_settings: ring setting letters from left to right, defaults to all A
+        :type ring_settings: str, optional
+        :param reflector: name of the reflector, defaults to "B"
+        :type reflector: str, optional
+        :param steckers: pairs of letters plugged together, defaults to none
+        :type steckers: Iterable[str], optional
+        :returns: config of the settings
+        :rtype: MachineConfig
+        :raises ValueError: if a name is unknown or a letter is plugged twice
+        :example: pool.config(("IV", "I", "III"), "AAA", "B", ["AQ"]) -> MachineConfig(...)
+
+        """
+
+        key: tuple = settings_key(order, ring_settings, reflector, steckers)
+        config: MachineConfig | None = self._configs.get(key)
+
+        if config is not None:
+            self.hits += 1
+            self._configs.move_to_end(key)
+            return config
+
+        self.misses += 1
+        config = MachineConfig.from_names(*key)
+        self._configs[key] = config
+
+        # evict least recently used configs until under both caps
+        while len(self._configs) > 1 and (
+            len(self._configs) > self.max_size or self.nbytes > self.max_bytes
+        ):
+            self._configs.popitem(last=False)
+            self.evictions += 1
+
+        return config
+
+    def machine(
+        self,
+        order: Iterable[str],
+        ring_settings: str = "",
+        reflector: str = "B",
+        steckers: Iterable[str] = (),
+        windows: str = "",
+        tracer: Tracer | None = None,
+        metrics: Metrics | None = None,
+    ) -> Enigma:
+        """Get a machine of its own with some key settings and window letters.
+
+        :param order: names of the rotors from left to right
+        :type order: Iterable[str]
+        :param ring_settings: ring setting letters from left to right, defaults to all A
+        :type ring_settings: str, optional
+        :param reflector: name of the reflector, defaults to "B"
+        :type reflector: str, optional
+        :param steckers: pairs of letters plugged together, defaults to none
+        :type steckers: Iterable[str], optional
+        :param windows: letters on the rotor windows from left to right, defaults to all A
+        :type windows: str, optional
+        :param tracer: receiver of each encryption step, defaults to None
+        :type tracer: Tracer | None, optional
+        :param metrics: counters and timings to be updated, defaults to None
+        :type metrics: Metrics | None, optional
+        :returns: machine that shares nothing mutable with others
+        :rtype: Enigma
+        :raises ValueError: if a setting is wrong
+        :example: pool.machine(("IV", "I", "III"), windows="KDX").encrypt("HELLO") -> " ..."
+
+        """
+
+        return self.config(order, ring_settings, reflector, steckers).machine(
+            windows, tracer=tracer, metrics=metrics
+        )
+
+    def stats(self) -> dict:
+        """Get how well the pool is doing.
+
+        :returns: hits, misses, evictions, hit rate, kept configs and their memory
+        :rtype: dict
+        :example: pool.stats() -> {"hits": 99, "misses": 1, "hit_rate": 0.99, ...}
+
+        """
+
+        lookups: int = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._configs),
+            "nbytes": self.nbytes,
+        }
+
+    def clear(self) -> None:
+        """Remove every kept config; statistics are kept.
+
+        :returns: None
+        :rtype: None
+        :example: pool.clear() -> None
+
+        """
+
+        self._configs.clear()
@@ -2,10 +2,32 @@
 
 """Module for Enigma's rotors and reflectors."""
 
-
 from string import ascii_uppercase
 
-from utils import check_key, letter_to_number, next_char_in_string, prev_char_in_string
+from utils import check_key, letter_to_number
+
+# number of letters in the alphabet, which is also the number of rotor positions
+ALPHABET_SIZE: int = len(ascii_uppercase)
+
+
+def _letter_number(letter: str, what: str) -> int:
+    """Convert a window or ring letter to its number, checking it first.
+
+    :param letter: letter to be converted
+    :type letter: str
+    :param what: what the letter sets, for the error message
+    :type what: str
+    :returns: number of the letter, from 0 to 25
+    :rtype: int
+    :raises ValueError: if `letter` isn't a single uppercase letter
+    :example: _letter_number("C", "Window") -> 2
+
+    """
+
+    if len(letter) != 1 or letter not in ascii_uppercase:
+        raise ValueError(f"{what} must be a single uppercase letter.")
+
+    return letter_to_number(letter)
 
 
 class Stator:
@@ -48,10 +70,14 @@ class Rotor(Stator):
     """Class that models Enigma's rotors.
     Can be used to create custom rotors, since some defaults are provided
     as variables at tail of this file.
+    Position, window and ring setting are kept as numbers and the wiring as
+    forward and inverse tables built once, so encrypting a letter or turning
+    the rotor is a constant-time lookup; `key`, `current_top`, `ring_setting`
+    and `notch` are letter views of that state.
 
     :param key: character mappings
     :type key: str
-    :param notch: letter at which the rotor will turn the adjacent rotor
+    :param notch: letters at which the rotor will turn the adjacent rotor, if any
     :type notch: str
     :param current_top: letter visible on top window of the rotor
     :type current_top: str
@@ -59,6 +85,7 @@ class Rotor(Stator):
     :type ring_setting: str
     :returns: Rotor
     :rtype: Rotor
+    :raises ValueError: if key is not a string of 26 letters, or a window or ring letter isn't a single uppercase letter
     :example: Rotor(key="EKMFLGDQVZNTOWYHXUSPAIBRCJ", notch="Q", current_top="A", ring_setting="A")
 
     """
@@ -68,80 +95,177 @@ class Rotor(Stator):
     ) -> None:
         """Initialize rotor with character mappings and turnover."""
 
-        # initialize stator
-        # super().__init__(key, kind="rotor")
-
         # check key
         if check_key(key=key, kind="rotor"):
             self.init_key: str = key
 
-        # this is the variable that actually changes
-        self.key = self.init_key
+        # relative wiring offset, which is how many times the rotor has turned
+        self._offset: int = 0
+        self._wire(key)
 
-        # letter that is visible on top window when turnover happens
-        self.notch: str = notch
+        # letters that are visible on top window when turnover happens
+        self.notch = notch
         # letter visible on top window
         self.current_top = current_top
         # relative wiring offset
-        self.ring_setting: str = ring_setting
-
-        ############# TODO
-        self.times_turned: int = 0
-
-    # def set_current_top(self, letter: str) -> None:
-    #     """Set current letter on top of the rotor.
-
-    #     :param letter: letter to be set on top
-    #     :type current_top: str
-    #     :returns: None
-    #     :rtype: None
-    #     :raises ValueError: if letter is not a single character or not in the alphabet
-    #     :example: rotor.set_current_top("A") -> None
-
-    #     """
-
-    #     # convert letter to uppercase and remove whitespaces
-    #     letter = letter.strip().upper()
-
-    #     # do nothing if letter is already on top
-    #     if self.current_top == letter:
-    #         return
-    #     elif len(letter) != 1:
-    #         raise ValueError("Letter must be a single character.")
-    #     elif letter not in ascii_uppercase:
-    #         raise ValueError("Letter must be in the alphabet.")
-    #     elif letter > self.current_top:
-    #         # rotate key until letter is on top
-    #         for _ in range(
-    #             letter_to_number(self.current_top) - letter_to_number(letter)
-    #         ):
-    #             self.key = self.key[-1] + self.key[:-1]
-
-    #     elif letter < self.current_top:
-    #         # rotate key backwards until letter is on top
-    #         for _ in range(
-    #             abs(letter_to_number(self.current_top)) - letter_to_number(letter)
-    #         ):
-    #             self.key = self.key[0] + self.key[:-1]
-
-    def turn(self) -> None:
-        """Turn rotor by one letter.
+        self.ring_setting = ring_setting
 
+    def _wire(self, base_key: str) -> None:
+        """Build the forward and inverse wiring tables of the rotor at offset zero.
+
+        :param base_key: character mappings before the rotor was ever turned
+        :type base_key: str
         :returns: None
         :rtype: None
-        :example: rotor.turn() -> None
+        :example: rotor._wire("EKMFLGDQVZNTOWYHXUSPAIBRCJ") -> None
+
+        """
+
+        self._base_key: str = base_key
+        self._forward: tuple[int, ...] = tuple(
+            letter_to_number(letter) for letter in base_key
+        )
+
+        inverse: list[int] = [0] * ALPHABET_SIZE
+        for number, cipher_number in enumerate(self._forward):
+            inverse[cipher_number] = number
+        self._inverse: tuple[int, ...] = tuple(inverse)
+
+    @property
+    def base_key(self) -> str:
+        """Get rotor's character mappings as they were before it was ever turned.
+
+        :returns: rotor's character mappings at offset zero
+        :rtype: str
+        :example: ROTOR_I.base_key -> "EKMFLGDQVZNTOWYHXUSPAIBRCJ"
+
+        """
+
+        return self._base_key
+
+    @property
+    def key(self) -> str:
+        """Get rotor's character mappings as seen after turning it `times_turned` times.
+
+        :returns: base key rotated by the wiring offset
+        :rtype: str
+        :example: rotor.key -> "KMFLGDQVZNTOWYHXUSPAIBRCJE"
+
+        """
+
+        return self._base_key[self._offset :] + self._base_key[: self._offset]
+
+    @key.setter
+    def key(self, key: str) -> None:
+        """Rewire the rotor so it reads `key` at its current wiring offset."""
+
+        if check_key(key=key, kind="rotor"):
+            # undo `times_turned` turns of the key
+            turned: int = self._offset
+            self._wire(key[-turned:] + key[:-turned] if turned else key)
+
+    @property
+    def times_turned(self) -> int:
+        """Get the wiring offset, which is how many times the rotor has turned.
+
+        :returns: wiring offset, from 0 to 25
+        :rtype: int
+        :example: rotor.times_turned -> 0
+
+        """
+
+        return self._offset
+
+    @times_turned.setter
+    def times_turned(self, times_turned: int) -> None:
+        """Set the wiring offset; the window letter is left as it is."""
+
+        self._offset = times_turned % ALPHABET_SIZE
+
+    @property
+    def current_top(self) -> str:
+        """Get the letter visible on top window of the rotor.
+
+        :returns: window letter
+        :rtype: str
+        :example: rotor.current_top -> "A"
+
+        """
+
+        return ascii_uppercase[self._top]
+
+    @current_top.setter
+    def current_top(self, letter: str) -> None:
+        """Set the window letter; the wiring offset is left as it is."""
+
+        self._top: int = _letter_number(letter, "Window")
+
+    @property
+    def ring_setting(self) -> str:
+        """Get the letter at which the wiring is offset.
+
+        :returns: ring setting
+        :rtype: str
+        :example: rotor.ring_setting -> "A"
 
         """
 
-        # rotate key by one letter
-        self.key = self.key[1:] + self.key[0]
+        return ascii_uppercase[self._ring]
 
-        # rotate current letter on top by one letter
-        self.current_top = next_char_in_string(ascii_uppercase, self.current_top)
+    @ring_setting.setter
+    def ring_setting(self, letter: str) -> None:
+        """Set the ring setting."""
 
-        # keep track of how many times the rotor has been turned
-        self.times_turned += 1
-        self.times_turned %= 26
+        self._ring: int = _letter_number(letter, "Ring setting")
+
+    @property
+    def notch(self) -> str:
+        """Get the letters at which the rotor will turn the adjacent rotor.
+
+        :returns: notch letters, possibly none
+        :rtype: str
+        :example: ROTOR_VI.notch -> "ZM"
+
+        """
+
+        return self._notch
+
+    @notch.setter
+    def notch(self, letters: str) -> None:
+        """Set the notch letters and which windows they're on."""
+
+        self._notch: str = letters
+        self._notches: tuple[bool, ...] = tuple(
+            letter in letters for letter in ascii_uppercase
+        )
+
+    @property
+    def on_notch(self) -> bool:
+        """Get whether a notch letter is on top window, so the next keypress turns the adjacent rotor.
+        Same as `rotor.current_top in rotor.notch`, without building a letter.
+
+        :returns: whether the window shows a notch letter
+        :rtype: bool
+        :example: ROTOR_I.on_notch -> False
+
+        """
+
+        return self._notches[self._top]
+
+    def turn(self, times: int = 1) -> None:
+        """Turn rotor by one letter, or by `times` letters at once.
+
+        :param times: number of letters to turn by, defaults to 1
+        :type times: int, optional
+        :returns: None
+        :rtype: None
+        :example: rotor.turn() -> None
+
+        """
+
+        # rotate wiring and letter on top without rebuilding anything
+        self._offset = (self._offset + times) % ALPHABET_SIZE
+        self._top = (self._top + times) % ALPHABET_SIZE
 
     def get_key(self) -> str:
         """Get rotor's character mappings.
@@ -152,24 +276,26 @@ class Rotor(Stator):
 
         """
 
-        new_key: str = ""
+        # same as `encrypt_letter` on every letter, without a call per letter
+        offset, ring = self._offset, self._ring
+        forward: tuple[int, ...] = self._forward[offset:] + self._forward[:offset]
 
-        for letter in ascii_uppercase:
-            new_key += self.encrypt_letter(letter)
-
-        return new_key
+        return "".join(
+            ascii_uppercase[(number - offset + ring) % ALPHABET_SIZE]
+            for number in forward
+        )
 
     def reverse_get_key(self) -> str:
         """Get rotor's character mappings when current's flowing backwards"""
 
-        # hold output in another variable, since python strings are immutable
-        new_key: str = ""
-
-        for letter in ascii_uppercase:
-            # case current flowing backwards, rotors after reflector
-            new_key += self.reverse_encrypt_letter(letter)
+        # same as `reverse_encrypt_letter` on every letter, without a call per letter
+        offset, ring = self._offset, self._ring
+        inverse: tuple[int, ...] = self._inverse[offset:] + self._inverse[:offset]
 
-        return new_key
+        return "".join(
+            ascii_uppercase[(number - offset - ring) % ALPHABET_SIZE]
+            for number in inverse
+        )
 
     def encrypt_letter(self, letter: str) -> str:
         """Encrypt a letter using the rotor's character mappings.
@@ -182,20 +308,12 @@ class Rotor(Stator):
 
         """
 
-        # find letter in key
-        cipherletter: str = self.key[letter_to_number(letter)]
-
-        # rotor offset
-        for _ in range(self.times_turned):
-            # A -> Z, B -> A, C -> B, ...
-            cipherletter = prev_char_in_string(ascii_uppercase, cipherletter)
+        # find letter in key, then undo the rotor offset and apply the ring setting
+        number: int = self._forward[
+            (letter_to_number(letter) + self._offset) % ALPHABET_SIZE
+        ]
 
-        # ring setting
-        for _ in range(letter_to_number(self.ring_setting)):
-            # A -> B, B -> C, C -> D, ...
-            cipherletter = next_char_in_string(ascii_uppercase, cipherletter)
-
-        return cipherletter
+        return ascii_uppercase[(number - self._offset + self._ring) % ALPHABET_SIZE]
 
     def reverse_encrypt_letter(self, letter: str) -> str:
         """Encrypt a letter using the rotor's character mappings when current's flowing backwards.
@@ -208,20 +326,12 @@ class Rotor(Stator):
 
         """
 
-        # rotor offset
-        for _ in range(self.times_turned):
-            # A -> Z, B -> A, C -> B, ...
-            letter = next_char_in_string(ascii_uppercase, letter)
-
-        # find letter in key
-        cipherletter: str = chr(self.key.index(letter) + 65)
-
-        # ring setting
-        for _ in range(letter_to_number(self.ring_setting)):
-            # A -> B, B -> C, C -> D, ...
-            cipherletter = prev_char_in_string(ascii_uppercase, cipherletter)
+        # apply the rotor offset, find letter in key, then undo the ring setting
+        number: int = self._inverse[
+            (letter_to_number(letter) + self._offset) % ALPHABET_SIZE
+        ]
 
-        return cipherletter
+        return ascii_uppercase[(number - self._offset - self._ring) % ALPHABET_SIZE]
 
 
 ## Default rotors and reflectors
@@ -260,9 +370,68 @@ ROTOR_V: Rotor = Rotor(
     ring_setting="A",
 )
 
+# naval rotors turn their neighbour from two letters
+ROTOR_VI: Rotor = Rotor(
+    key="JPGVOUMFYQBENHZRDKASXLICTW",
+    notch="ZM",
+    current_top="A",
+    ring_setting="A",
+)
+
+ROTOR_VII: Rotor = Rotor(
+    key="NZJHGRCXMYSWBOUFAIVLPEKQDT",
+    notch="ZM",
+    current_top="A",
+    ring_setting="A",
+)
+
+ROTOR_VIII: Rotor = Rotor(
+    key="FKQHTLXOCBJSPDZRAMEWNIUYGV",
+    notch="ZM",
+    current_top="A",
+    ring_setting="A",
+)
+
+# thin rotors of the M4 sit left of the others, next to a thin reflector, and never turn
+ROTOR_BETA: Rotor = Rotor(
+    key="LEYJVCNIXWPBQMDRTAKZGFUHOS",
+    notch="",
+    current_top="A",
+    ring_setting="A",
+)
+
+ROTOR_GAMMA: Rotor = Rotor(
+    key="FSOKANUERHMBTIYCWLQPZXVGJD",
+    notch="",
+    current_top="A",
+    ring_setting="A",
+)
+
 PLUGBOARD_EMPTY: Stator = Stator(key=ascii_uppercase, kind="plugboard")
 REFLECTOR_A: Stator = Stator(key="EJMZALYXVBWFCRQUONTSPIKHGD", kind="reflector")
 REFLECTOR_B: Stator = Stator(key="YRUHQSLDPXNGOKMIEBFZCWVJAT", kind="reflector")
 REFLECTOR_C: Stator = Stator(key="FVPJIAOYEDRZXWGCTKUQSBNMHL", kind="reflector")
 REFLECTOR_B_THIN: Stator = Stator(key="ENKQAUYWJICOPBLMDXZVFTHRGS", kind="reflector")
 REFLECTOR_C_THIN: Stator = Stator(key="RDOBJNTKVEHMLFCWZAXGYIPSUQ", kind="reflector")
+
+## Default components by name
+ROTORS: dict[str, Rotor] = {
+    "I": ROTOR_I,
+    "II": ROTOR_II,
+    "III": ROTOR_III,
+    "IV": ROTOR_IV,
+    "V": ROTOR_V,
+    "VI": ROTOR_VI,
+    "VII": ROTOR_VII,
+    "VIII": ROTOR_VIII,
+    "BETA": ROTOR_BETA,
+    "GAMMA": ROTOR_GAMMA,
+}
+
+REFLECTORS: dict[str, Stator] = {
+    "A": REFLECTOR_A,
+    "B": REFLECTOR_B,
+    "C": REFLECTOR_C,
+    "B_THIN": REFLECTOR_B_THIN,
+    "C_THIN": REFLECTOR_C_THIN,
+}
@@ -0,0 +1,311 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with an asyncio server that encrypts streams, one machine per connection.
+
+Protocol: the client sends one JSON line with the machine settings, e.g.
+
+    {"rotors": ["I", "II", "III"], "rings": "AAA", "reflector": "B", "steckers": ["AQ"], "windows": "AAA"}
+
+with rotors, ring settings and windows from left to right; every key is
+optional. The server answers "OK" or "ERROR <reason>" on a line of its own,
+then encrypts whatever the client sends and streams the ciphertext back as
+it is produced, grouped as `Enigma.encrypt` groups it. The connection ends
+once the client closes its side and the last ciphertext is sent.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Executor
+import asyncio
+import json
+import threading
+
+from engine import CompiledEnigma, rotor_offsets
+from formatting import NOT_LETTERS
+from machine import Enigma
+from pool import MachinePool
+
+# most bytes read from a connection at once
+CHUNK_SIZE: int = 1 << 16
+
+# letters from which a chunk is encrypted in the executor instead of the event loop
+BULK_SIZE: int = 1 << 14
+
+# compiled machines an executor process keeps, by signature
+ENGINES_KEPT: int = 32
+_ENGINES: OrderedDict[tuple, CompiledEnigma] = OrderedDict()
+_ENGINES_LOCK: threading.Lock = threading.Lock()
+
+
+def parse_settings(line: bytes, pool: MachinePool) -> Enigma:
+    """Build the machine of a session out of its settings line.
+
+    :param line: JSON object with optional rotors, rings, reflector, steckers and windows
+    :type line: bytes
+    :param pool: pool the machine's config is taken from
+    :type pool: MachinePool
+    :returns: machine set as asked
+    :rtype: Enigma
+    :raises ValueError: if the line isn't a JSON object of valid settings
+    :example: parse_settings(b'{"rotors": ["I", "II", "III"]}', MachinePool()) -> Enigma(...)
+
+    """
+
+    try:
+        settings = json.loads(line)
+    except ValueError as error:
+        raise ValueError(f"Settings must be JSON: {error}.") from error
+
+    if not isinstance(settings, dict):
+        raise ValueError("Settings must be a JSON object.")
+
+    try:
+        return pool.machine(
+            settings.get("rotors", ("I", "II", "III")),
+            settings.get("rings", ""),
+            settings.get("reflector", "B"),
+            settings.get("steckers", ()),
+            settings.get("windows", ""),
+        )
+    except (TypeError, AttributeError, KeyError, IndexError) as error:
+        raise ValueError(f"Settings have the wrong types: {error}.") from error
+
+
+def _engine(wiring: tuple) -> CompiledEnigma:
+    """Get the compiled machine of a signature, building it once per process.
+
+    :param wiring: signature of the machine, as `CompiledEnigma.signature`
+    :type wiring: tuple
+    :returns: compiled machine kept by this process
+    :rtype: CompiledEnigma
+    :example: _engine(engine.signature) -> CompiledEnigma(...)
+
+    """
+
+    # thread executors share the cache of the process
+    with _ENGINES_LOCK:
+        engine: CompiledEnigma | None = _ENGINES.get(wiring)
+
+        if engine is not None:
+            _ENGINES.move_to_end(wiring)
+            return engine
+
+        engine = CompiledEnigma.from_signature(wiring)
+        _ENGINES[wiring] = engine
+
+        # least recently used machines go first
+        while len(_ENGINES) > ENGINES_KEPT:
+            _ENGINES.popitem(last=False)
+
+        return engine
+
+
+def _encrypt_bulk(
+    wiring: tuple, letters: str, offsets: list[int], encryptions: int
+) -> str:
+    """Encrypt a run of letters away from the event loop.
+    Only the signature of the session's machine is sent, so an executor
+    process keeps composed tables between chunks instead of getting a bare
+    engine every time.
+
+    :param wiring: signature of the session's machine
+    :type wiring: tuple
+    :param letters: letters to be encrypted
+    :type letters: str
+    :param offsets: wiring offset of each rotor before the letters
+    :type offsets: list[int]
+    :param encryptions: letters the session encrypted before these
+    :type encryptions: int
+    :returns: encrypted letters, grouped as if they were part of the whole stream
+    :rtype: str
+    :example: _encrypt_bulk(engine.signature, "HELLO", [0, 0, 0], 0) -> " ILBD A"
+
+    """
+
+    ciphertext, _ = _engine(wiring).encrypt(letters, offsets, encryptions)
+
+    return ciphertext
+
+
+class EncryptionServer:
+    """Server giving every connection a machine of its own.
+    Small chunks are encrypted on the event loop; chunks of at least
+    `bulk_size` letters go to the executor, so one client sending a lot
+    doesn't hold the others up.
+
+    :param executor: executor for bulk chunks, defaults to the event loop's own
+    :type executor: Executor | None, optional
+    :param chunk_size: most bytes read from a connection at once, defaults to 65536
+    :type chunk_size: int, optional
+    :param bulk_size: letters from which a chunk goes to the executor, defaults to 16384
+    :type bulk_size: int, optional
+    :param pool: pool sessions take their machines from, defaults to a new one
+    :type pool: MachinePool | None, optional
+    :returns: EncryptionServer
+    :rtype: EncryptionServer
+    :raises ValueError: if `chunk_size` or `bulk_size` is not positive
+    :example: await EncryptionServer(executor=ProcessPoolExecutor()).start(port=8765)
+
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        bulk_size: int = BULK_SIZE,
+        pool: MachinePool | None = None,
+    ) -> None:
+        """Initialize server with where and how much to encrypt at once."""
+
+        if chunk_size <= 0 or bulk_size <= 0:
+            raise ValueError("Chunk and bulk sizes must be positive.")
+
+        self.executor: Executor | None = executor
+        self.chunk_size: int = chunk_size
+        self.bulk_size: int = bulk_size
+        # sessions on the same daily key share its checked and compiled config
+        self.pool: MachinePool = pool if pool is not None else MachinePool()
+
+        # connections being served right now
+        self.sessions: int = 0
+
+    async def start(
+        self, host: str | None = None, port: int = 0, path: str | None = None
+    ) -> asyncio.AbstractServer:
+        """Start listening on a TCP port, or on a Unix socket if `path` is given.
+
+        :param host: address to listen on, defaults to every interface
+        :type host: str | None, optional
+        :param port: TCP port to listen on, defaults to any free one
+        :type port: int, optional
+        :param path: Unix socket to listen on instead, defaults to None
+        :type path: str | None, optional
+        :returns: listening server
+        :rtype: asyncio.AbstractServer
+        :example: await server.start(host="127.0.0.1", port=8765)
+
+        """
+
+        # process executors fork their workers on first use; forked while a
+        # connection is open, they would keep its socket and the client would
+        # never see the end of the stream
+        if self.executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, int)
+
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+
+        return await asyncio.start_server(self.handle, host=host, port=port)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve one connection, from its settings line to the end of its stream.
+
+        :param reader: stream the client writes to
+        :type reader: asyncio.StreamReader
+        :param writer: stream the client reads from
+        :type writer: asyncio.StreamWriter
+        :returns: None
+        :rtype: None
+        :example: await asyncio.start_server(server.handle, port=8765)
+
+        """
+
+        self.sessions += 1
+
+        try:
+            try:
+                machine: Enigma = parse_settings(await reader.readline(), self.pool)
+            except ValueError as error:
+                writer.write(f"ERROR {error}\n".encode("ascii", "replace"))
+                await writer.drain()
+                return
+
+            writer.write(b"OK\n")
+            await writer.drain()
+
+            while chunk := await reader.read(self.chunk_size):
+                ciphertext: str = await self.encrypt(machine, chunk)
+
+                if ciphertext:
+                    writer.write(ciphertext.encode("ascii"))
+                    # stop reading until the client has taken what was sent
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def encrypt(self, machine: Enigma, chunk: bytes) -> str:
+        """Encrypt a chunk of a session's stream, in the executor if it's big.
+
+        :param machine: machine of the session
+        :type machine: Enigma
+        :param chunk: bytes received from the client
+        :type chunk: bytes
+        :returns: encrypted chunk
+        :rtype: str
+        :example: await server.encrypt(machine, b"hello") -> " ILBD A"
+
+        """
+
+        # only ASCII is uppercased; anything outside A-Z is skipped anyway
+        letters: str = NOT_LETTERS.sub("", chunk.upper().decode("latin-1"))
+
+        # composing tables costs more than it saves on a chunk this small
+        if len(letters) < self.bulk_size:
+            return machine.encrypt(letters)
+
+        wiring: tuple = machine.compiled().signature
+        offsets: list[int] = rotor_offsets(machine.rotors)
+        encryptions: int = machine.encryptions
+
+        # the session moves on right away; only the letters are worked out elsewhere
+        machine.advance(len(letters))
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, _encrypt_bulk, wiring, letters, offsets, encryptions
+        )
+
+
+def run_server(
+    host: str | None = None,
+    port: int = 0,
+    path: str | None = None,
+    executor: Executor | None = None,
+) -> None:
+    """Serve until interrupted.
+
+    :param host: address to listen on, defaults to every interface
+    :type host: str | None, optional
+    :param port: TCP port to listen on, defaults to any free one
+    :type port: int, optional
+    :param path: Unix socket to listen on instead, defaults to None
+    :type path: str | None, optional
+    :param executor: executor for bulk chunks, defaults to the event loop's own
+    :type executor: Executor | None, optional
+    :returns: None
+    :rtype: None
+    :example: run_server(host="127.0.0.1", port=8765)
+
+    """
+
+    async def serve() -> None:
+        """Start the server and print where it listens."""
+
+        server: asyncio.AbstractServer = await EncryptionServer(executor).start(
+            host, port, path
+        )
+
+        for socket in server.sockets:
+            print(f"Serving on {socket.getsockname()}")
+
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
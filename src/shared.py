@@ -0,0 +1,248 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module that publishes keystream tables once into shared memory, so worker processes read them without copies."""
+
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.util import Finalize
+from typing import NamedTuple
+import sys
+
+from engine import ALPHABET_SIZE, LETTER_INDEX
+from keystream import STATES, KeystreamTable
+
+# bytes of the substitutions, one letter per state and letter, followed by the successors
+LETTERS_BYTES: int = ALPHABET_SIZE * STATES
+SHARED_TABLE_BYTES: int = LETTERS_BYTES + 2 * STATES
+
+# tables a process keeps mapped; the least recently used one is released past it
+ATTACHED_KEPT: int = 4
+
+# tables attached by this process, by shared memory name, so each is mapped once
+_ATTACHED: OrderedDict[str, "SharedTableView"] = OrderedDict()
+
+# releases every table when a worker process exits, registered on first attach
+_AT_EXIT: Finalize | None = None
+
+
+class KeystreamHandle(NamedTuple):
+    """What a worker process needs to find a published keystream table.
+    Small enough to be sent with every task.
+
+    :param name: name of the shared memory block
+    :type name: str
+    :param signature: hashable description of the machine's wiring, as in `CompiledEnigma.signature`
+    :type signature: tuple
+    :param still: wiring offsets of the rotors that never turn
+    :type still: tuple[int, ...]
+
+    """
+
+    name: str
+    signature: tuple
+    still: tuple[int, ...]
+
+
+class SharedTableView:
+    """Keystream table read from shared memory, without copying it.
+    Encrypts the same way `KeystreamTable.encrypt_letters` does.
+
+    :param memory: shared memory block holding the table
+    :type memory: SharedMemory
+    :param handle: handle the block was found with
+    :type handle: KeystreamHandle
+    :returns: SharedTableView
+    :rtype: SharedTableView
+    :example: SharedTableView(SharedMemory(handle.name), handle)
+
+    """
+
+    def __init__(self, memory: SharedMemory, handle: KeystreamHandle) -> None:
+        """Map the substitutions and successors of a published table, read-only."""
+
+        # the block must outlive the views over it
+        self._memory: SharedMemory = memory
+        self.signature: tuple = handle.signature
+        self.still: tuple[int, ...] = handle.still
+
+        buffer: memoryview = memory.buf.toreadonly()
+
+        # 26 letters per state, where index 26 * state + X holds the letter X is encrypted to
+        self.letters: memoryview = buffer[:LETTERS_BYTES]
+        # state reached from each state on the next keypress
+        self.successor: memoryview = buffer[LETTERS_BYTES:SHARED_TABLE_BYTES].cast("H")
+
+    def encrypt_letters(self, letters: str, state: int) -> tuple[str, int]:
+        """Encrypt uppercase letters, ungrouped, starting from the given state.
+
+        :param letters: uppercase letters, nothing else
+        :type letters: str
+        :param state: state number to start from
+        :type state: int
+        :returns: encrypted letters and state number reached
+        :rtype: tuple[str, int]
+        :example: view.encrypt_letters("AAAAA", 0) -> ("BDZGO", 5)
+
+        """
+
+        table: memoryview = self.letters
+        successor: memoryview = self.successor
+
+        # result of encryption of `letters`
+        ciphertext: bytearray = bytearray()
+        append = ciphertext.append
+
+        for letter in letters:
+            state = successor[state]
+            append(table[ALPHABET_SIZE * state + LETTER_INDEX[letter]])
+
+        return ciphertext.decode("ascii"), state
+
+    def release(self) -> None:
+        """Drop the views and unmap the block; the table stays published.
+
+        :returns: None
+        :rtype: None
+        :example: view.release() -> None
+
+        """
+
+        self.letters.release()
+        self.successor.release()
+        self._memory.close()
+
+
+class SharedKeystream:
+    """Keystream table published once into shared memory.
+    Worker processes attach to it with `attach` and read it in place, so
+    memory stays the same however many workers there are. The publisher
+    owns the block and removes it on `close`, or when leaving a `with` block.
+
+    :param table: keystream table to be published
+    :type table: KeystreamTable
+    :returns: SharedKeystream
+    :rtype: SharedKeystream
+    :example: with SharedKeystream(KEYSTREAM_CACHE.get(engine)) as shared: pool.submit(task, shared.handle)
+
+    """
+
+    def __init__(self, table: KeystreamTable) -> None:
+        """Copy the substitutions and successors of a table into a new shared memory block."""
+
+        self._memory: SharedMemory = SharedMemory(create=True, size=SHARED_TABLE_BYTES)
+        self._memory.buf[:LETTERS_BYTES] = table.tables.encode("ascii")
+        self._memory.buf[LETTERS_BYTES:SHARED_TABLE_BYTES] = table.successor.tobytes()
+
+        self.handle: KeystreamHandle = KeystreamHandle(
+            self._memory.name, table.signature, table.still
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the published table, in bytes, once for every process.
+
+        :returns: size of the shared memory block
+        :rtype: int
+        :example: shared.nbytes -> 492128
+
+        """
+
+        return SHARED_TABLE_BYTES
+
+    def close(self) -> None:
+        """Remove the block; processes still attached keep their mapping until they release it.
+
+        :returns: None
+        :rtype: None
+        :example: shared.close() -> None
+
+        """
+
+        # a view attached by the publisher itself would pin the block
+        release(self.handle)
+
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "SharedKeystream":
+        """Use the published table in a `with` block."""
+
+        return self
+
+    def __exit__(self, *_) -> None:
+        """Remove the block when leaving the `with` block."""
+
+        self.close()
+
+
+def attach(handle: KeystreamHandle) -> SharedTableView:
+    """Get a read-only view of a published keystream table, mapping it once per process.
+    At most `ATTACHED_KEPT` tables stay mapped; the least recently used one
+    is released to make room, and every one is released when the process exits.
+
+    :param handle: handle of the published table, from `SharedKeystream.handle`
+    :type handle: KeystreamHandle
+    :returns: view of the table
+    :rtype: SharedTableView
+    :raises FileNotFoundError: if the table is no longer published
+    :example: attach(shared.handle).encrypt_letters("AAAAA", 0) -> ("BDZGO", 5)
+
+    """
+
+    global _AT_EXIT  # pylint: disable=global-statement
+
+    view: SharedTableView | None = _ATTACHED.get(handle.name)
+
+    if view is not None:
+        _ATTACHED.move_to_end(handle.name)
+        return view
+
+    # only the publisher may remove the block, so attaching must not track it
+    if sys.version_info >= (3, 13):
+        memory: SharedMemory = SharedMemory(  # pylint: disable=unexpected-keyword-arg
+            handle.name, track=False
+        )
+    else:
+        memory = SharedMemory(handle.name)
+
+    view = SharedTableView(memory, handle)
+    _ATTACHED[handle.name] = view
+
+    while len(_ATTACHED) > ATTACHED_KEPT:
+        _ATTACHED.popitem(last=False)[1].release()
+
+    # pool workers leave through multiprocessing, which runs finalizers but not `atexit`
+    if _AT_EXIT is None:
+        _AT_EXIT = Finalize(None, release_all, exitpriority=0)
+
+    return view
+
+
+def release(handle: KeystreamHandle) -> None:
+    """Unmap a published keystream table from this process, if it's mapped.
+
+    :param handle: handle of the published table
+    :type handle: KeystreamHandle
+    :returns: None
+    :rtype: None
+    :example: release(shared.handle) -> None
+
+    """
+
+    view: SharedTableView | None = _ATTACHED.pop(handle.name, None)
+
+    if view is not None:
+        view.release()
+
+
+def release_all() -> None:
+    """Unmap every published keystream table from this process.
+
+    :returns: None
+    :rtype: None
+    :example: release_all() -> None
+
+    """
+
+    while _ATTACHED:
+        _ATTACHED.popitem()[1].release()
@@ -0,0 +1,146 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with tracers that receive the encryption steps of each letter."""
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TextIO
+
+import json
+
+
+class Tracer(ABC):
+    """Receiver of the encryption steps of each letter.
+    Steps are (formatted key, input letter, output letter) tuples, one per
+    component the signal goes through. Subclasses must implement `record`,
+    or they can't be instantiated.
+
+    :returns: Tracer
+    :rtype: Tracer
+    :example: Enigma(..., tracer=RingBufferTracer(maxlen=100))
+
+    """
+
+    @abstractmethod
+    def record(self, position: int, steps: list[tuple[str, str, str]]) -> None:
+        """Receive the steps of one letter.
+
+        :param position: number of letters the machine encrypted before this one
+        :type position: int
+        :param steps: encryption steps of the letter
+        :type steps: list[tuple[str, str, str]]
+        :returns: None
+        :rtype: None
+        :example: tracer.record(0, [("(A)BC...", "A", "A"), ...]) -> None
+
+        """
+
+
+class RingBufferTracer(Tracer):
+    """Tracer that keeps the steps of the last few letters only.
+
+    :param maxlen: number of letters to keep, defaults to 64
+    :type maxlen: int, optional
+    :returns: RingBufferTracer
+    :rtype: RingBufferTracer
+    :raises ValueError: if `maxlen` is not positive
+    :example: RingBufferTracer(maxlen=10)
+
+    """
+
+    def __init__(self, maxlen: int = 64) -> None:
+        """Initialize an empty buffer."""
+
+        if maxlen <= 0:
+            raise ValueError("Buffer must hold at least one letter.")
+
+        # oldest letters are dropped once the buffer is full
+        self.entries: deque[tuple[int, list[tuple[str, str, str]]]] = deque(
+            maxlen=maxlen
+        )
+
+    def record(self, position: int, steps: list[tuple[str, str, str]]) -> None:
+        """Keep the steps of one letter, dropping the oldest one if full."""
+
+        self.entries.append((position, steps))
+
+    def steps(self) -> list[tuple[str, str, str]]:
+        """Get the kept steps of every letter in order.
+
+        :returns: encryption steps, oldest first
+        :rtype: list[tuple[str, str, str]]
+        :example: tracer.steps() -> [("(A)BC...", "A", "A"), ...]
+
+        """
+
+        return [step for _, steps in self.entries for step in steps]
+
+    def clear(self) -> None:
+        """Drop every kept letter.
+
+        :returns: None
+        :rtype: None
+        :example: tracer.clear() -> None
+
+        """
+
+        self.entries.clear()
+
+
+class JsonlTracer(Tracer):
+    """Tracer that writes each letter as a JSON line to a text sink.
+
+    :param sink: file-like object to write to
+    :type sink: TextIO
+    :returns: JsonlTracer
+    :rtype: JsonlTracer
+    :example: JsonlTracer(sink=open("trace.jsonl", "w", encoding="utf-8"))
+
+    """
+
+    def __init__(self, sink: TextIO) -> None:
+        """Initialize tracer with the sink it writes to."""
+
+        self.sink: TextIO = sink
+
+    def record(self, position: int, steps: list[tuple[str, str, str]]) -> None:
+        """Write the steps of one letter as a JSON line."""
+
+        self.sink.write(
+            json.dumps(
+                {
+                    "position": position,
+                    "steps": [
+                        {"key": key, "input": letter, "output": cypher_letter}
+                        for key, letter, cypher_letter in steps
+                    ],
+                }
+            )
+            + "\n"
+        )
+
+
+class PrintTracer(Tracer):
+    """Tracer that prints each step to stdout, as `verbose` encryption does.
+
+    :param then: tracer that also receives the steps, defaults to None
+    :type then: Tracer | None, optional
+    :returns: PrintTracer
+    :rtype: PrintTracer
+    :example: PrintTracer(then=RingBufferTracer())
+
+    """
+
+    def __init__(self, then: Tracer | None = None) -> None:
+        """Initialize tracer with the tracer it forwards to."""
+
+        self.then: Tracer | None = then
+
+    def record(self, position: int, steps: list[tuple[str, str, str]]) -> None:
+        """Print the steps of one letter and forward them."""
+
+        for step in steps:
+            print(step)
+
+        if self.then is not None:
+            self.then.record(position, steps)
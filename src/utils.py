@@ -1,5 +1,6 @@
 """Utility functions for the project."""
 
+from string import ascii_uppercase
 from typing import Any, Callable
 
 import sys
@@ -167,8 +168,18 @@ def check_key(key: str, kind: str) -> bool:
     # plugboard
     elif kind == "plugboard":
         ## Conditions that must be true for plugboards
-        # TODO
-        pass
+        # True if key has 26 characters, False otherwise
+        length: bool = len(key) == 26
+        # True if key holds every letter from A to Z, False otherwise
+        alphabet: bool = set(key) == set(ascii_uppercase)
+
+        # check if key is A-Z with no letter repeated, before indexing by letter
+        if not (length and alphabet):
+            raise ValueError("Key must be a string of 26 letters.")
+
+        # plugs connect pairs of letters, or leave a letter unplugged
+        if any(key[ord(key[i]) - 65] != chr(i + 65) for i in range(26)):
+            raise ValueError("Wrong characters mappings.")
     # rotors
     else:
         ## Conditions that must be true for rotors
@@ -0,0 +1,133 @@
+# pylint: disable=locally-disabled, fixme, line-too-long
+
+"""Module with a NumPy backend that encrypts whole messages as batched table gathers."""
+
+from engine import ALPHABET_SIZE, CompiledEnigma, stepping_schedule
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, callers fall back to pure Python
+    np = None
+
+# whether the NumPy backend can be used
+NUMPY_AVAILABLE: bool = np is not None
+
+# letters encrypted per batch, which bounds memory on very long messages
+BLOCK_SIZE: int = 1 << 20
+
+
+def rotor_states(
+    offsets: list[int], notches: list[tuple[int, ...]], start: int, count: int
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Work out the offsets of the three turning rotors for a run of keypresses.
+    Vectorized `engine.offsets_after`: entry i holds the offsets the machine
+    encrypts with on keypress `start` + i + 1.
+
+    :param offsets: wiring offset of each rotor before any keypress
+    :type offsets: list[int]
+    :param notches: wiring offsets at which the right-most and middle rotors' notches are on top
+    :type notches: list[tuple[int, ...]]
+    :param start: keypresses already done
+    :type start: int
+    :param count: number of keypresses to work out
+    :type count: int
+    :returns: offsets of the right-most, middle and left rotors
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    :example: rotor_states([0, 0, 0], [(21,), (4,)], 0, 3) -> (array([1, 2, 3]), array([0, 0, 0]), array([0, 0, 0]))
+
+    """
+
+    keypresses: np.ndarray = np.arange(start + 1, start + count + 1, dtype=np.int64)
+
+    # turnovers up to each keypress of the way into the cycle and of one lap
+    carried, doubled, tail = stepping_schedule(tuple(notches)).totals(offsets)
+    lap: int = len(carried) - 1 - tail
+
+    # keypresses past the way in are whole laps plus part of one
+    laps, rest = np.divmod(np.maximum(keypresses - tail, 0), lap)
+    index: np.ndarray = np.minimum(keypresses, tail) + rest
+
+    carries: np.ndarray = np.array(carried)[index] + laps * (
+        carried[-1] - carried[tail]
+    )
+    double_steps: np.ndarray = np.array(doubled)[index] + laps * (
+        doubled[-1] - doubled[tail]
+    )
+
+    return (
+        (offsets[0] + keypresses) % ALPHABET_SIZE,
+        (offsets[1] + carries + double_steps) % ALPHABET_SIZE,
+        (offsets[2] + double_steps) % ALPHABET_SIZE,
+    )
+
+
+def _matrix(tables: tuple[bytes, ...]) -> "np.ndarray":
+    """Stack a rotor's per-offset tables into a 26 x 26 array.
+
+    :param tables: one table per wiring offset
+    :type tables: tuple[bytes, ...]
+    :returns: array indexed by offset and then by letter number
+    :rtype: np.ndarray
+    :example: _matrix(engine.forward[0])[0, 0] -> 1
+
+    """
+
+    return np.frombuffer(b"".join(tables), dtype=np.uint8).reshape(
+        ALPHABET_SIZE, ALPHABET_SIZE
+    )
+
+
+def encrypt_letters(
+    engine: CompiledEnigma, offsets: list[int], letters: bytes, should_turn: bool = True
+) -> bytes:
+    """Encrypt a run of uppercase ASCII letters with batched gathers.
+
+    :param engine: compiled machine to encrypt with
+    :type engine: CompiledEnigma
+    :param offsets: wiring offset of each rotor before the first letter
+    :type offsets: list[int]
+    :param letters: uppercase ASCII letters, nothing else
+    :type letters: bytes
+    :param should_turn: whether to turn rotors, defaults to True
+    :type should_turn: bool, optional
+    :returns: encrypted letters, ungrouped
+    :rtype: bytes
+    :raises RuntimeError: if NumPy is not installed
+    :example: encrypt_letters(machine.compiled(), [0, 0, 0], b"AAAAA") -> b"BDZGO"
+
+    """
+
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy backend needs NumPy to be installed.")
+
+    plugboard: np.ndarray = np.frombuffer(engine.plugboard, dtype=np.uint8)
+    forward: list[np.ndarray] = [_matrix(tables) for tables in engine.forward]
+    reverse: list[np.ndarray] = [_matrix(tables) for tables in engine.reverse]
+
+    # rotors that never turn are folded into the reflector once
+    reflector: np.ndarray = np.frombuffer(engine.reflector, dtype=np.uint8)
+    for rotor in range(len(offsets) - 1, 2, -1):
+        reflector = reverse[rotor][offsets[rotor]][
+            reflector[forward[rotor][offsets[rotor]]]
+        ]
+
+    numbers: np.ndarray = np.frombuffer(letters, dtype=np.uint8) - ord("A")
+    output: np.ndarray = np.empty_like(numbers)
+
+    for start in range(0, len(numbers), BLOCK_SIZE):
+        block: np.ndarray = numbers[start : start + BLOCK_SIZE]
+
+        if should_turn:
+            states = rotor_states(offsets, list(engine.notches[:2]), start, len(block))
+        else:
+            states = tuple(np.full(len(block), offset) for offset in offsets[:3])
+
+        block = plugboard[block]
+        for rotor in range(3):
+            block = forward[rotor][states[rotor], block]
+        block = reflector[block]
+        for rotor in range(2, -1, -1):
+            block = reverse[rotor][states[rotor], block]
+        output[start : start + len(block)] = plugboard[block]
+
+    return (output + ord("A")).tobytes()
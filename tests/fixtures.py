@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""Machines built by hand, shared by the tests that check other ways of building them"""
+
+from copy import copy
+from random import Random
+from string import ascii_uppercase
+from typing import Iterable
+
+from machine import Enigma
+from metrics import Metrics
+from rotors import PLUGBOARD_EMPTY, REFLECTORS, ROTORS, Rotor, Stator
+from utils import switch
+
+# stecker pairs of the test messages
+STECKERS: list[str] = ["AQ", "EZ", "RT", "NM", "LP", "WX", "CH", "UO", "DF", "BK"]
+
+
+def plugboard(steckers: Iterable[str]) -> Stator:
+    """Plug pairs of letters together one by one."""
+
+    board: Stator = copy(PLUGBOARD_EMPTY)
+    for a, b in steckers:
+        board.key = switch(board.key, a, b)
+
+    return board
+
+
+def build_machine(
+    order: tuple[str, ...] = ("I", "II", "III"),
+    ring_settings: str = "",
+    reflector: str = "B",
+    steckers: Iterable[str] = (),
+    windows: str = "",
+    metrics: Metrics | None = None,
+) -> Enigma:
+    """Build a machine out of copies of the default rotors, turning each to its window letter."""
+
+    # machines list the right-most rotor first
+    rotors: list[Rotor] = [copy(ROTORS[name]) for name in reversed(order)]
+    for rotor, ring, window in zip(
+        rotors,
+        reversed(ring_settings or "A" * len(order)),
+        reversed(windows or "A" * len(order)),
+    ):
+        rotor.ring_setting = ring
+        rotor.turn(ord(window) - 65)
+
+    return Enigma(
+        rotors=rotors,
+        plugboard=plugboard(steckers),
+        reflector=copy(REFLECTORS[reflector]),
+        metrics=metrics,
+    )
+
+
+def random_machine(seed: int) -> Enigma:
+    """Build a machine with a random but reproducible configuration.
+    Top letters are set apart from the wiring, which moves the notches with them.
+    """
+
+    random: Random = Random(seed)
+
+    rotors: list[Rotor] = [
+        copy(ROTORS[name]) for name in random.sample(["I", "II", "III", "IV", "V"], 3)
+    ]
+    for rotor in rotors:
+        rotor.ring_setting = random.choice(ascii_uppercase)
+        rotor.current_top = random.choice(ascii_uppercase)
+        rotor.turn(random.randrange(26))
+
+    letters: list[str] = random.sample(ascii_uppercase, 12)
+
+    return Enigma(
+        rotors=rotors,
+        plugboard=plugboard(a + b for a, b in zip(letters[::2], letters[1::2])),
+        reflector=copy(REFLECTORS[random.choice(["B", "C"])]),
+    )
+
+
+def windows(machine: Enigma) -> list[tuple]:
+    """Get the full rotor state of a machine."""
+
+    return [
+        (rotor.key, rotor.current_top, rotor.times_turned) for rotor in machine.rotors
+    ]
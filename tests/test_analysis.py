@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+"""Test that cryptanalysis tools recover the settings of a known message"""
+
+from copy import copy
+from io import BytesIO
+from pathlib import Path
+from random import Random
+from string import ascii_uppercase
+import tempfile
+import time
+import unittest
+
+from attack import _search_task, ciphertext_only_attack
+from bombe import build_menu, run_bombe
+from cribs import (
+    _positions_bytes,
+    _positions_numpy,
+    crib_positions,
+    iter_crib_positions,
+    scan_files,
+)
+from fixtures import STECKERS, build_machine
+from hillclimb import NgramScorer, solve_plugboard
+from machine import Enigma
+from rotors import PLUGBOARD_EMPTY, Stator
+from vectorized import NUMPY_AVAILABLE
+
+# plaintext of the test message, whose start is used as crib
+PLAINTEXT: str = "WETTERVORHERSAGEBISKAYANICHTSNEUESZUMELDEN"
+
+# sample of German text the hill climber learns its trigrams from
+CORPUS: str = """
+Die Wettervorhersage fuer die Biskaya meldet starken Wind aus Westen und schwere
+Gewitter in der Nacht. Keine feindlichen Schiffe gesichtet. Das Boot steht auf
+Position und wartet auf weitere Befehle des Befehlshabers der Unterseeboote.
+Der Geleitzug wurde am Abend gesichtet und wird verfolgt. Treibstoff reicht fuer
+zehn Tage. Die Besatzung ist wohlauf und meldet keine Verluste. Alle Boote sollen
+sich im Planquadrat sammeln und auf den Angriffsbefehl warten. Die Sicht ist gut,
+der Seegang maessig.
+"""
+
+
+def message_machine(windows: str = "KDX") -> Enigma:
+    """Build machine with config B-IV-I-III, rings AAA and ten stecker pairs."""
+
+    return build_machine(("IV", "I", "III"), steckers=STECKERS, windows=windows)
+
+
+class TestAnalysis(unittest.TestCase):
+    """"""
+
+    def setUp(self) -> None:
+        """Encrypt the test message"""
+
+        self.ciphertext: str = message_machine().encrypt(PLAINTEXT, backend="compiled")
+
+    def test_menu(self) -> None:
+        """Test that cribs encrypting a letter to itself are rejected."""
+
+        self.assertEqual(len(build_menu("WETTER", self.ciphertext)), 6)
+
+        with self.assertRaises(ValueError):
+            build_menu("A", "A")
+
+    def test_bombe(self) -> None:
+        """Test that the bombe stops at the right settings only."""
+
+        stops = run_bombe(
+            PLAINTEXT[:23],
+            self.ciphertext,
+            rotors=("I", "III", "IV"),
+            windows=["AAA", "KDW", "KDX", "KDY", "ZZZ"],
+            workers=1,
+        )
+
+        self.assertEqual(len(stops), 1)
+        self.assertEqual(stops[0].order, ("IV", "I", "III"))
+        self.assertEqual(stops[0].windows, "KDX")
+        # test letter A is steckered to Q
+        self.assertEqual((stops[0].test_letter, stops[0].steckers), ("A", "Q"))
+
+    def test_crib_positions(self) -> None:
+        """Test that cribs are placed wherever no letter would encrypt to itself."""
+
+        # the true placement is always possible
+        self.assertIn(0, crib_positions(PLAINTEXT[:23], self.ciphertext))
+        for offset in crib_positions(PLAINTEXT[:10], self.ciphertext):
+            build_menu(PLAINTEXT[:10], self.ciphertext, offset)
+
+        random: Random = Random(2)
+        ciphertext: bytes = bytes(random.choice(b"ABCDE .") for _ in range(3000))
+        letters: bytes = ciphertext.translate(None, b" .")
+        crib: str = "ABBA CAD"
+
+        expected: list[int] = [
+            offset
+            for offset in range(len(letters) - 6)
+            if all(a != b for a, b in zip(b"ABBACAD", letters[offset:]))
+        ]
+
+        self.assertEqual(list(_positions_bytes(b"ABBACAD", letters)), expected)
+        if NUMPY_AVAILABLE:
+            self.assertEqual(list(_positions_numpy(b"ABBACAD", letters)), expected)
+        self.assertEqual(list(crib_positions(crib, ciphertext.decode())), expected)
+
+        # placements across the pieces of a stream are found too
+        streamed: list[int] = [
+            offset
+            for block in iter_crib_positions(crib, BytesIO(ciphertext), chunk_size=5)
+            for offset in block
+        ]
+        self.assertEqual(streamed, expected)
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths: list[Path] = [Path(directory, f"{day}.txt") for day in range(3)]
+            for day, path in enumerate(paths):
+                path.write_bytes(ciphertext[day * 1000 :])
+
+            found = scan_files(crib, paths, workers=2, chunk_size=333)
+
+        self.assertEqual(list(found[str(paths[0])]), expected)
+        self.assertEqual(
+            [len(found[str(path)]) for path in paths],
+            [len(crib_positions(crib, ciphertext[day * 1000 :])) for day in range(3)],
+        )
+
+        with self.assertRaises(ValueError):
+            crib_positions(".", ascii_uppercase)
+
+    def test_ciphertext_only(self) -> None:
+        """Test that the right unsteckered settings get the best index of coincidence."""
+
+        machine: Enigma = message_machine()
+        machine.plugboard = copy(PLUGBOARD_EMPTY)
+        ciphertext: str = machine.encrypt(PLAINTEXT * 3, backend="compiled")
+
+        progress: list[tuple[int, int]] = []
+        candidates = ciphertext_only_attack(
+            ciphertext,
+            rotors=("IV", "I", "III"),
+            top=3,
+            threshold=0.06,
+            workers=1,
+            progress=lambda tried, total: progress.append((tried, total)),
+        )
+
+        self.assertEqual(candidates[0].order, ("IV", "I", "III"))
+        self.assertEqual(candidates[0].windows, "KDX")
+        # the first rotor order was enough to meet the threshold
+        self.assertEqual(len(progress), 1)
+        self.assertLess(progress[0][0], progress[0][1])
+
+    def test_ciphertext_only_stops(self) -> None:
+        """Test that tasks still running stop once another one meets the threshold."""
+
+        machine: Enigma = message_machine("AAA")
+        machine.plugboard = copy(PLUGBOARD_EMPTY)
+        ciphertext: str = machine.encrypt(PLAINTEXT * 10, backend="compiled")
+
+        # a whole task of a wrong rotor order tries every start position
+        started: float = time.perf_counter()
+        _search_task(("I", "II", "III"), "AAA", "B", b"\x00" * 420, 1, None)
+        whole_task: float = time.perf_counter() - started
+
+        # the first task meets the threshold on its first start position,
+        # while the second one is busy with a wrong rotor order
+        started = time.perf_counter()
+        candidates = ciphertext_only_attack(
+            ciphertext, rotors=("IV", "I", "III", "II"), threshold=0.06, workers=2
+        )
+        elapsed: float = time.perf_counter() - started
+
+        self.assertEqual(candidates[0].order, ("IV", "I", "III"))
+        self.assertLess(elapsed, whole_task)
+
+    def test_plugboard(self) -> None:
+        """Test that hill climbing recovers the steckers once rotor settings are known."""
+
+        message: str = (
+            "DIEWETTERVORHERSAGEFUERDIEBISKAYAMELDETSTARKENWINDAUSWESTENUNDSCHWERE"
+            "GEWITTERINDERNACHTKEINEFEINDLICHENSCHIFFEGESICHTETDASBOOTSTEHTAUFPOSITION"
+        )
+        ciphertext: str = message_machine().encrypt(message, backend="compiled")
+        scorer: NgramScorer = NgramScorer.from_text(CORPUS, n=3)
+
+        solution = solve_plugboard(
+            message_machine(),
+            ciphertext,
+            scorer,
+            restarts=20,
+            time_budget=60.0,
+        )
+
+        expected: list[str] = sorted("".join(sorted(pair)) for pair in STECKERS)
+        self.assertEqual(sorted(solution.steckers), expected)
+        self.assertEqual(solution.plaintext, message)
+
+        # no climb could run at all
+        with self.assertRaises(ValueError):
+            solve_plugboard(message_machine(), ciphertext, scorer, workers=0)
+
+    def test_plugboard_key(self) -> None:
+        """Test that plugboards must plug letters in pairs."""
+
+        Stator(key="BACDEFGHIJKLMNOPQRSTUVWXYZ", kind="plugboard")
+
+        with self.assertRaises(ValueError):
+            Stator(key="BCADEFGHIJKLMNOPQRSTUVWXYZ", kind="plugboard")
+        with self.assertRaises(ValueError):
+            Stator(key="AACDEFGHIJKLMNOPQRSTUVWXYZ", kind="plugboard")
+        # letters outside A-Z, which `isalpha` lets through
+        with self.assertRaises(ValueError):
+            Stator(key="ÄBCDEFGHIJKLMNOPQRSTUVWXYZ", kind="plugboard")
+        with self.assertRaises(ValueError):
+            Stator(key="[BCDEFGHIJKLMNOPQRSTUVWXYZ", kind="plugboard")
+
+
+if __name__ == "__main__":
+    unittest.main()
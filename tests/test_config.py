@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""Test that machines cloned from a config are independent and encrypt like hand-built ones"""
+
+import pickle
+import unittest
+
+from config import MachineConfig
+from fixtures import STECKERS, build_machine
+from formatting import TextFormat
+from machine import Enigma
+from rotors import PLUGBOARD_EMPTY
+
+# rotor order, ring settings, reflector and steckers of the test machine
+KEY: tuple = (("IV", "I", "III"), "AAB", "B", STECKERS)
+
+
+class TestConfig(unittest.TestCase):
+    """"""
+
+    def setUp(self) -> None:
+        """Build the config of the test machine"""
+
+        self.config: MachineConfig = MachineConfig.from_names(*KEY)
+
+    def test_same_encryption(self) -> None:
+        """Test that cloned machines encrypt like a machine built by hand."""
+
+        expected: str = build_machine(*KEY, windows="KDX").encrypt("HELLOWORLD" * 100)
+
+        for backend in ("reference", "compiled"):
+            machine: Enigma = self.config.machine("KDX")
+            ciphertext: str = machine.encrypt("HELLOWORLD" * 100, backend=backend)
+            self.assertEqual(ciphertext, expected)
+
+    def test_independent(self) -> None:
+        """Test that encrypting with one clone leaves the others untouched."""
+
+        first: Enigma = self.config.machine("KDX")
+        second: Enigma = self.config.machine("KDX")
+
+        first.encrypt("A" * 500)
+
+        expected: str = self.config.machine("KDX").encrypt("HELLO")
+        self.assertEqual(second.encrypt("HELLO"), expected)
+        self.assertEqual(self.config.machine().rotors[0].current_top, "A")
+
+    def test_shared_tables(self) -> None:
+        """Test that clones reuse the config's compiled tables."""
+
+        engine = self.config.compiled()
+
+        self.assertIs(self.config.machine().compiled(), engine)
+        self.assertIs(self.config.machine("ZZZ").compiled(), engine)
+
+    def test_immutable(self) -> None:
+        """Test that configs can't be changed, but compare and hash by value."""
+
+        with self.assertRaises(AttributeError):
+            self.config.plugboard = PLUGBOARD_EMPTY.key
+        with self.assertRaises(AttributeError):
+            self.config.extra = 1
+
+        same: MachineConfig = MachineConfig.from_names(*KEY)
+        self.assertEqual(same, self.config)
+        self.assertEqual(len({same, self.config}), 1)
+        self.assertEqual(pickle.loads(pickle.dumps(self.config)), self.config)
+
+    def test_from_machine(self) -> None:
+        """Test that the config of a machine is the one it was built from."""
+
+        machine: Enigma = build_machine(*KEY, windows="KDX")
+
+        self.assertEqual(MachineConfig.from_machine(machine), self.config)
+
+    def test_encrypt_batch(self) -> None:
+        """Test that a batch encrypts each message like a machine of its own."""
+
+        messages: list[str] = ["HELLO WORLD", "", "WETTER.", "HELLO", "A" * 60, "KDX"]
+        start_positions: list[str] = ["KDX", "AAA", "KDX", "ZZZ", "KDX", "AAA"]
+
+        expected: list[str] = [
+            self.config.machine(windows).encrypt(message)
+            for message, windows in zip(messages, start_positions)
+        ]
+
+        self.assertEqual(self.config.encrypt_batch(messages, start_positions), expected)
+
+        # every format lays batches out as it lays single messages out
+        for text_format in (
+            TextFormat(group_size=5),
+            TextFormat(fold_case=True, space="X"),
+            TextFormat(keep_punctuation=True),
+        ):
+            self.assertEqual(
+                self.config.encrypt_batch(messages, start_positions, text_format),
+                [
+                    self.config.machine(windows).encrypt(
+                        message, text_format=text_format
+                    )
+                    for message, windows in zip(messages, start_positions)
+                ],
+            )
+
+        with self.assertRaises(ValueError):
+            self.config.encrypt_batch(messages, start_positions[1:])
+
+    def test_wrong_settings(self) -> None:
+        """Test that wrong names, plugs and windows are rejected."""
+
+        with self.assertRaises(ValueError):
+            MachineConfig.from_names(("IV", "I", "IX"))
+        with self.assertRaises(ValueError):
+            MachineConfig.from_names(("IV", "I", "III"), steckers=["AB", "BC"])
+        for pair in ("A[", "AÄ", "A@", "ABC"):
+            with self.assertRaises(ValueError):
+                MachineConfig.from_names(("IV", "I", "III"), steckers=[pair])
+        with self.assertRaises(ValueError):
+            self.config.machine("KD")
+
+
+if __name__ == "__main__":
+    unittest.main()
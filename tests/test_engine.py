@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+"""Test that the compiled engine gives the same output as the reference machine"""
+
+from copy import copy
+from io import BytesIO
+from random import Random
+from string import ascii_uppercase
+import unittest
+
+from fixtures import random_machine, windows
+from keystream import KeystreamCache, pack_state
+from machine import Enigma
+from tracing import RingBufferTracer
+from vectorized import NUMPY_AVAILABLE
+from rotors import ROTOR_I, ROTOR_II
+
+
+class TestEngine(unittest.TestCase):
+    """"""
+
+    def test_compiled_matches_reference(self) -> None:
+        """Test that the compiled backend is byte-identical to the reference one."""
+
+        for seed in range(8):
+            reference: Enigma = random_machine(seed)
+            compiled: Enigma = random_machine(seed)
+
+            text: str = "".join(
+                Random(seed).choice(ascii_uppercase + " .") for _ in range(300)
+            )
+
+            self.assertEqual(
+                compiled.encrypt(text, backend="compiled"), reference.encrypt(text)
+            )
+            self.assertEqual(windows(compiled), windows(reference))
+            self.assertEqual(compiled.encryptions, reference.encryptions)
+
+            # keep going from where the previous call stopped
+            self.assertEqual(
+                compiled.encrypt(text[:37], backend="compiled"),
+                reference.encrypt(text[:37]),
+            )
+
+    def test_compiled_without_turning(self) -> None:
+        """Test that the compiled backend can encrypt without turning rotors."""
+
+        reference: Enigma = random_machine(0)
+        compiled: Enigma = random_machine(0)
+
+        self.assertEqual(
+            compiled.encrypt(ascii_uppercase, should_turn=False, backend="compiled"),
+            reference.encrypt(ascii_uppercase, should_turn=False),
+        )
+        self.assertEqual(windows(compiled), windows(reference))
+
+    def test_inner_path(self) -> None:
+        """Test that untraced letters, which reuse the path behind the right-most rotor, match traced ones."""
+
+        for seed in range(4):
+            traced: Enigma = random_machine(seed)
+            traced.tracer = RingBufferTracer(maxlen=1)
+            untraced: Enigma = random_machine(seed)
+
+            # put the middle rotor on its notch to hit the double-step on the first keypress
+            if seed % 2:
+                for machine in (traced, untraced):
+                    machine.rotors[1].current_top = machine.rotors[1].notch
+
+            text: str = "".join(
+                Random(seed).choice(ascii_uppercase) for _ in range(1500)
+            )
+
+            self.assertEqual(untraced.encrypt(text), traced.encrypt(text))
+            self.assertEqual(windows(untraced), windows(traced))
+
+    def test_keystream_matches_reference(self) -> None:
+        """Test that the keystream backend is byte-identical to the reference one."""
+
+        for seed in range(4):
+            reference: Enigma = random_machine(seed)
+            keystream: Enigma = random_machine(seed)
+
+            text: str = "".join(
+                Random(seed).choice(ascii_uppercase) for _ in range(300)
+            )
+
+            self.assertEqual(
+                keystream.encrypt(text, backend="keystream"), reference.encrypt(text)
+            )
+            self.assertEqual(windows(keystream), windows(reference))
+
+    def test_keystream_offsets(self) -> None:
+        """Test that any offset of the keystream can be reached by indexing."""
+
+        machine: Enigma = random_machine(5)
+        table = KeystreamCache().get(machine.compiled())
+        state: int = pack_state([rotor.times_turned for rotor in machine.rotors])
+
+        stepped: int = state
+        for keypresses in range(1, 700):
+            stepped = table.successor[stepped]
+            self.assertEqual(table.state_at(state, keypresses), stepped)
+
+        self.assertEqual(
+            table.state_at(state, table.period(state) + 3), table.state_at(state, 3)
+        )
+
+    def test_keystream_cache_eviction(self) -> None:
+        """Test that the least recently used table is evicted over the memory cap."""
+
+        cache: KeystreamCache = KeystreamCache(max_bytes=1_000_000)
+        first = random_machine(0).compiled()
+        second = random_machine(1).compiled()
+
+        cache.get(first)
+        cache.get(first)
+        cache.get(second)
+
+        self.assertEqual(len(cache), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertIs(cache.get(second), cache.get(second))
+
+    def test_advance(self) -> None:
+        """Test that advancing gives the same rotor state as turning one by one."""
+
+        for seed in range(6):
+            stepped: Enigma = random_machine(seed)
+            advanced: Enigma = random_machine(seed)
+
+            # put the middle rotor on its notch to hit the double-step on the first keypress
+            if seed % 2:
+                for machine in (stepped, advanced):
+                    machine.rotors[1].current_top = machine.rotors[1].notch
+
+            keypresses: int = 0
+            for skip in (0, 1, 2, 25, 26, 27, 300, 651, 676, 17000):
+                for _ in range(skip):
+                    stepped._turn_rotors()
+                advanced.advance(skip)
+                keypresses += skip
+
+                self.assertEqual(windows(advanced), windows(stepped))
+                self.assertEqual(advanced.encryptions, keypresses)
+
+    def test_seek(self) -> None:
+        """Test that seeking resumes a stream where it would have been."""
+
+        text: str = "".join(Random(3).choice(ascii_uppercase) for _ in range(200))
+
+        whole: str = random_machine(3).encrypt(text, backend="compiled")
+
+        machine: Enigma = random_machine(3)
+        machine.encrypt("SOMETHING ELSE ENTIRELY")
+        machine.seek(130)
+
+        # letter 130 comes after 33 group separators
+        self.assertEqual(machine.encrypt(text[130:], backend="compiled"), whole[163:])
+
+    def test_snapshot(self) -> None:
+        """Test that a restored machine carries on where the snapshot was taken."""
+
+        text: str = "".join(Random(5).choice(ascii_uppercase) for _ in range(300))
+
+        machine: Enigma = random_machine(5)
+        head: str = machine.encrypt(text[:101], backend="compiled")
+        blob: bytes = machine.snapshot()
+        tail: str = machine.encrypt(text[101:])
+
+        self.assertEqual(len(blob), 27)
+
+        # a machine wired the same way, whatever its state, picks the stream up
+        other: Enigma = random_machine(5)
+        other.encrypt("SOMETHING ELSE", backend="compiled")
+        for rotor in other.rotors:
+            rotor.ring_setting = "Q"
+        other.restore(blob)
+
+        self.assertEqual(other.snapshot(), blob)
+        self.assertEqual(other.encrypt(text[101:]), tail)
+        self.assertEqual(head + tail, random_machine(5).encrypt(text))
+
+        # ... but one wired differently doesn't
+        with self.assertRaises(ValueError):
+            random_machine(6).restore(blob)
+        with self.assertRaises(ValueError):
+            other.restore(blob[:-1])
+
+    def test_parallel(self) -> None:
+        """Test that encrypting in chunks across processes matches one pass."""
+
+        text: str = "".join(
+            Random(4).choice(ascii_uppercase + " ") for _ in range(5000)
+        )
+
+        reference: Enigma = random_machine(4)
+        reference.encrypt("ABC", backend="compiled")
+        parallel: Enigma = random_machine(4)
+        parallel.encrypt("ABC", backend="compiled")
+
+        self.assertEqual(
+            parallel.encrypt_parallel(text, workers=3, chunk_size=700),
+            reference.encrypt(text, backend="compiled"),
+        )
+        self.assertEqual(windows(parallel), windows(reference))
+        self.assertEqual(parallel.encryptions, reference.encryptions)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+    def test_numpy_matches_reference(self) -> None:
+        """Test that the NumPy backend is byte-identical to the reference one."""
+
+        for seed in range(6):
+            reference: Enigma = random_machine(seed)
+            vectorized: Enigma = random_machine(seed)
+
+            # put the middle rotor on its notch to hit the double-step on the first keypress
+            if seed % 2:
+                for machine in (reference, vectorized):
+                    machine.rotors[1].current_top = machine.rotors[1].notch
+
+            text: str = "".join(
+                Random(seed).choice(ascii_uppercase + " ,") for _ in range(2000)
+            )
+
+            for should_turn in (True, False):
+                self.assertEqual(
+                    vectorized.encrypt(text, should_turn=should_turn, backend="numpy"),
+                    reference.encrypt(
+                        text, should_turn=should_turn, backend="compiled"
+                    ),
+                )
+                self.assertEqual(windows(vectorized), windows(reference))
+
+    def test_stream(self) -> None:
+        """Test that streamed chunks join into what a single call returns."""
+
+        text: str = "".join(
+            Random(6).choice(ascii_uppercase + " \n") for _ in range(3000)
+        )
+        whole: str = random_machine(6).encrypt(text, backend="compiled")
+
+        # a binary file read in uneven chunks
+        streamed: Enigma = random_machine(6)
+        self.assertEqual(
+            "".join(streamed.encrypt_stream(BytesIO(text.encode()), chunk_size=333)),
+            whole,
+        )
+        self.assertEqual(streamed.encryptions, len(whole.replace(" ", "")))
+
+        # an iterable mixing str and bytes
+        pieces: list[str | bytes] = [text[:1000], text[1000:1001].encode(), text[1001:]]
+        self.assertEqual(
+            "".join(random_machine(6).encrypt_stream(pieces, chunk_size=64)), whole
+        )
+
+    def test_encrypt_into(self) -> None:
+        """Test that bytes encrypted into a buffer match what a single call returns."""
+
+        text: str = "".join(
+            Random(7).choice(ascii_uppercase + " .\n") for _ in range(3000)
+        )
+        reference: Enigma = random_machine(7)
+        whole: str = reference.encrypt(text, backend="compiled")
+        data: bytes = text.encode()
+
+        for source in (data, bytearray(data), memoryview(data)):
+            machine: Enigma = random_machine(7)
+            out: bytearray = bytearray(len(data))
+            written: int = machine.encrypt_into(source, out)
+
+            self.assertEqual(out[:written].decode(), whole.replace(" ", ""))
+            self.assertEqual(windows(machine), windows(reference))
+            self.assertEqual(machine.encryptions, reference.encryptions)
+
+        # two calls into one buffer carry grouping over
+        machine = random_machine(7)
+        out = bytearray(len(whole))
+        written = machine.encrypt_into(data[:1001], out, group=True)
+        written += machine.encrypt_into(
+            data[1001:], memoryview(out)[written:], group=True
+        )
+        self.assertEqual((written, out.decode()), (len(whole), whole))
+
+        # a buffer too small is refused before the machine moves
+        machine = random_machine(7)
+        with self.assertRaises(ValueError):
+            machine.encrypt_into(data, bytearray(len(whole) - 1), group=True)
+        self.assertEqual(windows(machine), windows(random_machine(7)))
+
+    def test_rotor_views(self) -> None:
+        """Test that a rotor's letter views follow its numeric state."""
+
+        rotor = copy(ROTOR_I)
+        rotor.current_top = "X"
+        rotor.turn(29)
+
+        self.assertEqual((rotor.current_top, rotor.times_turned), ("A", 3))
+        self.assertEqual(rotor.key, ROTOR_I.key[3:] + ROTOR_I.key[:3])
+        self.assertEqual(ROTOR_I.times_turned, 0)
+
+        # setting a key rewires the rotor as seen at its current offset
+        rotor.key = ROTOR_II.key[3:] + ROTOR_II.key[:3]
+        turned = copy(ROTOR_II)
+        turned.turn(3)
+        self.assertEqual(rotor.base_key, ROTOR_II.key)
+        self.assertEqual(
+            (rotor.get_key(), rotor.reverse_get_key()),
+            (turned.get_key(), turned.reverse_get_key()),
+        )
+
+        with self.assertRaises(ValueError):
+            rotor.current_top = "AB"
+        with self.assertRaises(ValueError):
+            rotor.ring_setting = "a"
+
+    def test_unknown_backend(self) -> None:
+        """Test that unknown backends are rejected."""
+
+        with self.assertRaises(ValueError):
+            random_machine(0).encrypt("HELLO", backend="quantum")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""Test that normalization and layout are applied around the cipher the same for every backend"""
+
+from random import Random
+from string import ascii_uppercase
+import unittest
+
+from fixtures import random_machine
+from formatting import TextFormat, group_text
+from machine import Enigma
+from vectorized import NUMPY_AVAILABLE
+
+# letters, lowercase, spaces and punctuation, as typed
+TEXT: str = "".join(
+    Random(8).choice(ascii_uppercase + "abcxyz  .,!\n") for _ in range(1500)
+)
+
+
+class TestFormatting(unittest.TestCase):
+    """"""
+
+    def test_default(self) -> None:
+        """Test that the default format drops anything but A-Z and groups by four."""
+
+        letters: str = "".join(letter for letter in TEXT if letter in ascii_uppercase)
+
+        self.assertEqual(
+            random_machine(8).encrypt(TEXT), random_machine(8).encrypt(letters)
+        )
+        self.assertEqual(group_text("ABCDEFGHI", 2), "AB CDEF GHI")
+        self.assertEqual(group_text("ABCDEFGHI", 0, 0), "ABCDEFGHI")
+
+    def test_backends_match_reference(self) -> None:
+        """Test that every backend lays text out like the reference one."""
+
+        backends: list[str] = ["compiled", "keystream"]
+        if NUMPY_AVAILABLE:
+            backends.append("numpy")
+
+        for text_format in (
+            TextFormat(fold_case=True, space="X", group_size=5),
+            TextFormat(fold_case=True, keep_punctuation=True),
+            TextFormat(group_size=0),
+        ):
+            expected: str = random_machine(8).encrypt(TEXT, text_format=text_format)
+
+            for backend in backends:
+                machine: Enigma = random_machine(8)
+                self.assertEqual(
+                    machine.encrypt(TEXT, backend=backend, text_format=text_format),
+                    expected,
+                )
+
+    def test_options(self) -> None:
+        """Test that each option changes the text as described."""
+
+        ciphertext: str = random_machine(8).encrypt(
+            "hello world", text_format=TextFormat(fold_case=True, space="X")
+        )
+        self.assertEqual(ciphertext, random_machine(8).encrypt("HELLOXWORLD"))
+
+        # punctuation stays in place, around the letters encrypted as usual
+        kept: TextFormat = TextFormat(keep_punctuation=True)
+        ciphertext = random_machine(8).encrypt("HELLO, WORLD!", text_format=kept)
+        letters: str = random_machine(8).encrypt(
+            "HELLOWORLD", text_format=TextFormat(group_size=0)
+        )
+        self.assertEqual(ciphertext, f"{letters[:5]}, {letters[5:]}!")
+
+        # groups carry over from one call to the next
+        machine: Enigma = random_machine(8)
+        fives: TextFormat = TextFormat(group_size=5)
+        self.assertEqual(
+            machine.encrypt(TEXT[:333], text_format=fives)
+            + machine.encrypt(TEXT[333:], text_format=fives),
+            random_machine(8).encrypt(TEXT, text_format=fives),
+        )
+
+        with self.assertRaises(ValueError):
+            TextFormat(space="xx")
+        with self.assertRaises(ValueError):
+            TextFormat(group_size=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
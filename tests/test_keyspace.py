@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""Test that keyspaces number every candidate once, split into shards and resume from checkpoints"""
+
+from itertools import islice
+from pathlib import Path
+from random import Random
+from typing import Iterator
+import tempfile
+import unittest
+
+from keyspace import Keyspace, Settings, ShardProgress
+
+# small keyspace: 6 orders, 2 ring settings and 26 start positions of the right-most rotor
+SMALL: Keyspace = Keyspace(
+    ("I", "II", "III"),
+    ring_settings=["AAA", "BCD"],
+    windows=[f"AA{letter}" for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"],
+)
+
+
+class TestKeyspace(unittest.TestCase):
+    """"""
+
+    def test_numbering(self) -> None:
+        """Test that candidates and settings convert into each other."""
+
+        full: Keyspace = Keyspace()
+        self.assertEqual(len(full), 60 * 26**6)
+        self.assertEqual(full.decode(1), Settings(("I", "II", "III"), "AAA", "AAB"))
+        self.assertEqual(
+            full.decode(len(full) - 1), Settings(("V", "IV", "III"), "ZZZ", "ZZZ")
+        )
+
+        random: Random = Random(0)
+        for keyspace in (full, SMALL, Keyspace(("BETA", "VI", "I", "II"), slots=4)):
+            for _ in range(200):
+                candidate: int = random.randrange(len(keyspace))
+                self.assertEqual(
+                    keyspace.encode(*keyspace.decode(candidate)), candidate
+                )
+
+        # candidates of an order and ring setting are next to each other
+        self.assertEqual(
+            {SMALL.decode(candidate)[:2] for candidate in range(26)},
+            {(("I", "II", "III"), "AAA")},
+        )
+
+        with self.assertRaises(ValueError):
+            SMALL.decode(len(SMALL))
+        with self.assertRaises(ValueError):
+            full.encode(("I", "II", "III"), "AA", "AAA")
+        with self.assertRaises(ValueError):
+            Keyspace(("I", "II", "IX"))
+
+    def test_shards(self) -> None:
+        """Test that shards split the keyspace without overlap or gaps."""
+
+        for count in (1, 5, 7, len(SMALL)):
+            shards: list[range] = [SMALL.shard(index, count) for index in range(count)]
+
+            self.assertEqual(
+                [candidate for shard in shards for candidate in shard],
+                list(range(len(SMALL))),
+            )
+            self.assertLessEqual(max(map(len, shards)) - min(map(len, shards)), 1)
+
+        with self.assertRaises(ValueError):
+            SMALL.shard(3, 3)
+
+    def test_checkpoint(self) -> None:
+        """Test that a shard stopped mid-batch resumes from the first candidate not done."""
+
+        shard: range = SMALL.shard(1, 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path: Path = Path(directory, "shard-1.ckpt")
+
+            # candidates are fetched in batches of 10 and finish out of order;
+            # the job is killed in the middle of the sixth batch
+            progress: ShardProgress = SMALL.iterate(1, 3, path, every=8)
+            fetched: Iterator[int] = iter(progress)
+            done: list[int] = []
+            for _ in range(6):
+                batch: list[int] = list(islice(fetched, 10))
+                finished: list[int] = batch[::-1] if len(done) < 50 else batch[1:5]
+                for candidate in finished:
+                    progress.commit(candidate)
+                done.extend(finished)
+
+            # 50 candidates in a row are done, then one that never was
+            resumed: ShardProgress = SMALL.iterate(1, 3, path, every=8)
+            self.assertEqual(resumed.start, shard.start + 50)
+            self.assertFalse(resumed.finished)
+
+            # nothing that wasn't done is skipped
+            rest: list[int] = list(resumed)
+            self.assertEqual(sorted(set(done) | set(rest)), list(shard))
+            self.assertIn(shard.start + 50, rest)
+
+            for candidate in rest:
+                resumed.commit(candidate)
+            self.assertTrue(resumed.finished)
+
+            # a finished shard has nothing left
+            self.assertEqual(list(SMALL.iterate(1, 3, path)), [])
+
+            # ... and its checkpoint is refused by any other shard or search
+            with self.assertRaises(ValueError):
+                SMALL.iterate(0, 3, path)
+            with self.assertRaises(ValueError):
+                Keyspace(("I", "II", "III")).iterate(1, 3, path)
+            with self.assertRaises(ValueError):
+                resumed.commit(shard.stop)
+
+
+if __name__ == "__main__":
+    unittest.main()
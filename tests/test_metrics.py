@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""Test that metrics count what the machine did, whichever backend encrypts"""
+
+import unittest
+
+from fixtures import build_machine
+from machine import BACKENDS, Enigma
+from metrics import STAGES, Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """"""
+
+    def test_turns(self) -> None:
+        """Test that counted turns match the turns the rotors actually made."""
+
+        # ADU is one keypress away from a double step, AEV starts on one
+        for windows in ("AAA", "ADU", "AEV"):
+            machine: Enigma = build_machine(windows=windows)
+
+            turns: list[int] = [0, 0, 0]
+            for number, rotor in enumerate(machine.rotors):
+
+                def turn(rotor=rotor, number=number) -> None:
+                    turns[number] += 1
+                    type(rotor).turn(rotor)
+
+                rotor.turn = turn
+
+            machine.encrypt("A" * 1000)
+
+            for backend in BACKENDS:
+                metrics: Metrics = Metrics()
+                machine = build_machine(windows=windows, metrics=metrics)
+                machine.encrypt("A" * 1000, backend=backend)
+
+                snapshot: dict = metrics.snapshot()
+                self.assertEqual(snapshot["letters"], 1000)
+                self.assertEqual(snapshot["rotor_turns"], turns, (windows, backend))
+                self.assertEqual(snapshot["double_steps"], turns[2])
+                self.assertEqual(snapshot["calls"], {backend: 1})
+
+    def test_sampled_stages(self) -> None:
+        """Test that only sampled letters are timed, and only by the reference backend."""
+
+        metrics: Metrics = Metrics(sample_every=10)
+        machine: Enigma = build_machine(metrics=metrics)
+
+        machine.encrypt("HELLO WORLD" * 10)
+        self.assertEqual(metrics.samples, 10)
+        self.assertEqual(set(metrics.snapshot()["stage_seconds"]), set(STAGES))
+
+        machine.encrypt("A" * 100, backend="compiled")
+        self.assertEqual(metrics.samples, 10)
+        self.assertEqual(metrics.letters, 200)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()["letters"], 0)
+
+    def test_no_turn(self) -> None:
+        """Test that letters encrypted without turning don't count as turns."""
+
+        metrics: Metrics = Metrics()
+        build_machine(metrics=metrics).encrypt("A" * 100, should_turn=False)
+
+        self.assertEqual(metrics.snapshot()["rotor_turns"], [0, 0, 0])
+        self.assertEqual(metrics.letters, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
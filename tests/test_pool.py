@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""Test that the machine pool reuses configs and evicts the least recently used"""
+
+import unittest
+
+from machine import Enigma
+from pool import MachinePool, settings_key
+
+
+class TestPool(unittest.TestCase):
+    """"""
+
+    def test_reuse(self) -> None:
+        """Test that equal settings written differently share a config."""
+
+        pool: MachinePool = MachinePool()
+
+        first: Enigma = pool.machine(["IV", "I", "III"], "", "B", ["AQ", "EZ"])
+        second: Enigma = pool.machine(["iv", "I", "III"], "AAA", "b", ["ze", "QA"])
+
+        self.assertIs(first.compiled(), second.compiled())
+        self.assertEqual(pool.stats()["hit_rate"], 0.5)
+        self.assertEqual(
+            settings_key(["iv", "I", "III"], "", "B", ["QA"]),
+            (("IV", "I", "III"), "AAA", "B", ("AQ",)),
+        )
+
+    def test_independent(self) -> None:
+        """Test that machines handed out start at their windows whatever others did."""
+
+        pool: MachinePool = MachinePool()
+
+        used: Enigma = pool.machine(("I", "II", "III"), windows="AAA")
+        used.encrypt("A" * 100)
+
+        self.assertEqual(pool.machine(("I", "II", "III")).encrypt("AAAAA"), " BDZG O")
+
+    def test_size_cap(self) -> None:
+        """Test that the least recently used config goes first."""
+
+        pool: MachinePool = MachinePool(max_size=2)
+
+        pool.config(("I", "II", "III"))
+        pool.config(("II", "III", "IV"))
+        pool.config(("I", "II", "III"))
+        pool.config(("III", "IV", "V"))
+
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(pool.evictions, 1)
+
+        pool.config(("I", "II", "III"))
+        self.assertEqual(pool.misses, 3)
+
+    def test_memory_cap(self) -> None:
+        """Test that configs are evicted once their tables outgrow the memory cap."""
+
+        pool: MachinePool = MachinePool(max_bytes=100_000)
+
+        # encrypting composes tables, which makes the config bigger
+        pool.machine(("I", "II", "III")).encrypt("A" * 2000, backend="compiled")
+        pool.config(("II", "III", "IV"))
+
+        self.assertEqual(len(pool), 1)
+        self.assertLessEqual(pool.nbytes, 100_000)
+
+    def test_wrong_settings(self) -> None:
+        """Test that wrong settings are rejected and nothing is kept."""
+
+        pool: MachinePool = MachinePool()
+
+        with self.assertRaises(ValueError):
+            pool.config(("I", "II", "IX"))
+        with self.assertRaises(ValueError):
+            MachinePool(max_size=0)
+
+        self.assertEqual(len(pool), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
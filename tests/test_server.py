@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""Test that the server encrypts each connection's stream with a machine of its own"""
+
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import json
+import unittest
+
+from config import MachineConfig
+from server import _ENGINES, EncryptionServer
+
+# settings of the test sessions, from left to right
+SETTINGS: dict = {
+    "rotors": ["IV", "I", "III"],
+    "rings": "AAB",
+    "reflector": "B",
+    "steckers": ["AQ", "EZ", "RT"],
+    "windows": "KDX",
+}
+
+
+def kept_tables(wiring: tuple) -> int:
+    """Count the composed tables an executor process keeps for a signature."""
+
+    return len(_ENGINES[wiring]._tables)  # pylint: disable=protected-access
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    """"""
+
+    async def asyncSetUp(self) -> None:
+        """Start a server on a free local port"""
+
+        # a small bulk size sends some chunks to the executor
+        self.server: EncryptionServer = EncryptionServer(chunk_size=512, bulk_size=300)
+        self.listener: asyncio.AbstractServer = await self.server.start("127.0.0.1")
+        self.port: int = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self) -> None:
+        """Stop the server"""
+
+        self.listener.close()
+        await self.listener.wait_closed()
+
+    async def session(self, settings: dict, pieces: list[bytes]) -> bytes:
+        """Send settings and text in pieces, then read everything sent back."""
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        writer.write(json.dumps(settings).encode("ascii") + b"\n")
+        for piece in pieces:
+            writer.write(piece)
+            await writer.drain()
+        writer.write_eof()
+
+        response: bytes = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+        return response
+
+    async def test_sessions(self) -> None:
+        """Test that concurrent sessions get the same output as a local machine."""
+
+        text: bytes = b"Wetter vorhersage Biskaya, 42! " * 100
+        expected: str = (
+            MachineConfig.from_names(
+                SETTINGS["rotors"],
+                SETTINGS["rings"],
+                SETTINGS["reflector"],
+                SETTINGS["steckers"],
+            )
+            .machine(SETTINGS["windows"])
+            .encrypt(text.decode("ascii").upper(), backend="compiled")
+        )
+
+        # each session sends the text in pieces of a different size
+        sessions: list = [
+            self.session(SETTINGS, [text[i : i + n] for i in range(0, len(text), n)])
+            for n in (7, 100, len(text))
+        ]
+        responses: list[bytes] = await asyncio.gather(*sessions)
+
+        for response in responses:
+            self.assertEqual(response, b"OK\n" + expected.encode("ascii"))
+
+        self.assertEqual(self.server.sessions, 0)
+        # sessions on the same key share one config
+        self.assertEqual((self.server.pool.misses, self.server.pool.hits), (1, 2))
+
+    async def test_bulk_in_processes(self) -> None:
+        """Test that an executor process keeps its compiled machine between chunks."""
+
+        config: MachineConfig = MachineConfig.from_names(
+            SETTINGS["rotors"],
+            SETTINGS["rings"],
+            SETTINGS["reflector"],
+            SETTINGS["steckers"],
+        )
+        text: bytes = b"WETTERVORHERSAGEBISKAYA" * 200
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            # listen with a server of its own, whose executor is a process pool
+            self.listener.close()
+            await self.listener.wait_closed()
+            self.server = EncryptionServer(executor, chunk_size=512, bulk_size=300)
+            self.listener = await self.server.start("127.0.0.1")
+            self.port = self.listener.sockets[0].getsockname()[1]
+
+            response: bytes = await asyncio.wait_for(
+                self.session(SETTINGS, [text]), timeout=30
+            )
+            self.assertEqual(
+                response,
+                b"OK\n"
+                + config.machine(SETTINGS["windows"])
+                .encrypt(text.decode("ascii"), backend="compiled")
+                .encode("ascii"),
+            )
+
+            # tables composed for earlier chunks are still there
+            tables: int = executor.submit(
+                kept_tables, config.compiled().signature
+            ).result()
+            self.assertGreater(tables, 0)
+
+    async def test_wrong_settings(self) -> None:
+        """Test that wrong settings are answered with an error."""
+
+        response: bytes = await self.session({"rotors": ["IX"]}, [b"HELLO"])
+        self.assertTrue(response.startswith(b"ERROR "))
+
+        response = await self.session({"steckers": 5}, [b"HELLO"])
+        self.assertTrue(response.startswith(b"ERROR "))
+
+        # steckers outside A-Z, plugged twice or not in pairs
+        for steckers in (["A["], ["AÄ"], ["AB", "BC"], ["ABC"], [5]):
+            response = await self.session({"steckers": steckers}, [b"HELLO"])
+            self.assertTrue(response.startswith(b"ERROR "), steckers)
+
+
+if __name__ == "__main__":
+    unittest.main()
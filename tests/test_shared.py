@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""Test that keystream tables published into shared memory encrypt like the ones they come from"""
+
+from random import Random
+from string import ascii_uppercase
+import unittest
+
+from fixtures import random_machine, windows
+from keystream import KeystreamCache, KeystreamTable, pack_state
+from machine import Enigma
+from shared import (
+    ATTACHED_KEPT,
+    SharedKeystream,
+    SharedTableView,
+    attach,
+    release,
+    release_all,
+)
+
+
+class TestShared(unittest.TestCase):
+    """"""
+
+    def test_view(self) -> None:
+        """Test that an attached view matches its table and can't be written to."""
+
+        machine: Enigma = random_machine(7)
+        table: KeystreamTable = KeystreamCache().get(machine.compiled())
+        letters: str = "".join(Random(7).choice(ascii_uppercase) for _ in range(3000))
+
+        with SharedKeystream(table) as shared:
+            view: SharedTableView = attach(shared.handle)
+
+            # attaching again reuses the mapping
+            self.assertIs(attach(shared.handle), view)
+
+            for state in (0, 1234, pack_state([25, 25, 25])):
+                self.assertEqual(
+                    view.encrypt_letters(letters, state),
+                    table.encrypt_letters(letters, state),
+                )
+
+            with self.assertRaises(TypeError):
+                view.letters[0] = 65
+
+        # once closed, the table can't be found anymore
+        with self.assertRaises(FileNotFoundError):
+            attach(shared.handle)
+
+    def test_release(self) -> None:
+        """Test that a process keeps at most a few tables mapped, and can unmap them."""
+
+        table: KeystreamTable = KeystreamCache().get(random_machine(9).compiled())
+        published: list[SharedKeystream] = [
+            SharedKeystream(table) for _ in range(ATTACHED_KEPT + 1)
+        ]
+
+        try:
+            views: list[SharedTableView] = [
+                attach(shared.handle) for shared in published
+            ]
+
+            # the least recently used table is unmapped to make room
+            with self.assertRaises(ValueError):
+                views[0].encrypt_letters("A", 0)
+            self.assertIsNot(attach(published[0].handle), views[0])
+
+            release(published[1].handle)
+            with self.assertRaises(ValueError):
+                views[1].encrypt_letters("A", 0)
+            self.assertEqual(
+                views[2].encrypt_letters("A", 0), table.encrypt_letters("A", 0)
+            )
+
+            release_all()
+            for view in views[2:]:
+                with self.assertRaises(ValueError):
+                    view.encrypt_letters("A", 0)
+        finally:
+            for shared in published:
+                shared.close()
+
+    def test_parallel(self) -> None:
+        """Test that workers reading a shared table match one pass."""
+
+        text: str = "".join(
+            Random(8).choice(ascii_uppercase + " ") for _ in range(5000)
+        )
+
+        reference: Enigma = random_machine(8)
+        reference.encrypt("ABC", backend="compiled")
+        parallel: Enigma = random_machine(8)
+        parallel.encrypt("ABC", backend="compiled")
+
+        self.assertEqual(
+            parallel.encrypt_parallel(text, workers=3, chunk_size=700, shared=True),
+            reference.encrypt(text, backend="compiled"),
+        )
+        self.assertEqual(windows(parallel), windows(reference))
+        self.assertEqual(parallel.encryptions, reference.encryptions)
+
+
+if __name__ == "__main__":
+    unittest.main()
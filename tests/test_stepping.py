@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""Test that machines with double notches and a fourth rotor step like the reference machine"""
+
+from random import Random
+from string import ascii_uppercase
+import unittest
+
+from config import MachineConfig
+from engine import rotor_notch_offsets, step_counts
+from machine import Enigma
+from rotors import ROTORS
+from vectorized import NUMPY_AVAILABLE
+
+
+def build_config(seed: int) -> MachineConfig:
+    """Build an M4 config with naval rotors, in a random but reproducible order."""
+
+    random: Random = Random(seed)
+    order: list[str] = [random.choice(["BETA", "GAMMA"])]
+    order += random.sample(["VI", "VII", "VIII", "I", "IV"], 3)
+
+    return MachineConfig.from_names(
+        order,
+        "".join(random.choice(ascii_uppercase) for _ in order),
+        random.choice(["B_THIN", "C_THIN"]),
+        ["AQ", "EZ", "RT", "NM"],
+    )
+
+
+def random_windows(seed: int, config: MachineConfig) -> str:
+    """Pick windows that put the middle rotor on one of its notches every other seed."""
+
+    random: Random = Random(seed)
+    windows: list[str] = [random.choice(ascii_uppercase) for _ in config.rotors]
+    if seed % 2:
+        windows[-2] = random.choice(config.notches[1])
+
+    return "".join(windows)
+
+
+class TestStepping(unittest.TestCase):
+    """"""
+
+    def test_m4_matches_m3(self) -> None:
+        """Test that an M4 with its thin rotor at A encrypts like an M3 with the thick reflector."""
+
+        text: str = "DASOBERKOMMANDODERWEHRMACHTGIBTBEKANNT" * 10
+
+        for thin, reflector in (("BETA", "B"), ("GAMMA", "C")):
+            m3: Enigma = MachineConfig.from_names(
+                ("VI", "II", "VIII"), "CZM", reflector, ["AQ"]
+            ).machine("UZV")
+            m4: Enigma = MachineConfig.from_names(
+                (thin, "VI", "II", "VIII"), "ACZM", reflector + "_THIN", ["AQ"]
+            ).machine("AUZV")
+
+            self.assertEqual(m4.encrypt(text), m3.encrypt(text))
+            # the thin rotor never turns
+            self.assertEqual(m4.rotors[3].current_top, "A")
+
+    def test_backends_match_reference(self) -> None:
+        """Test that every backend steps double notches like the reference machine."""
+
+        text: str = "".join(Random(1).choice(ascii_uppercase) for _ in range(2000))
+        backends: list[str] = ["compiled", "keystream"]
+        if NUMPY_AVAILABLE:
+            backends.append("numpy")
+
+        for seed in range(4):
+            config: MachineConfig = build_config(seed)
+            windows: str = random_windows(seed, config)
+            reference: Enigma = config.machine(windows)
+            expected: str = reference.encrypt(text, backend="reference")
+
+            for backend in backends:
+                machine: Enigma = config.machine(windows)
+                self.assertEqual(machine.encrypt(text, backend=backend), expected)
+                self.assertEqual(
+                    [rotor.current_top for rotor in machine.rotors],
+                    [rotor.current_top for rotor in reference.rotors],
+                )
+
+    def test_advance(self) -> None:
+        """Test that advancing past double notches gives the same state as turning one by one."""
+
+        for seed in range(6):
+            config: MachineConfig = build_config(seed)
+            stepped: Enigma = config.machine(random_windows(seed, config))
+            advanced: Enigma = config.machine(random_windows(seed, config))
+
+            for skip in (0, 1, 2, 13, 25, 26, 27, 300, 651, 17000):
+                for _ in range(skip):
+                    stepped._turn_rotors()
+                advanced.advance(skip)
+
+                self.assertEqual(
+                    [rotor.times_turned for rotor in advanced.rotors],
+                    [rotor.times_turned for rotor in stepped.rotors],
+                )
+
+    def test_adjacent_notches(self) -> None:
+        """Test that turnovers are counted right even for notches next to each other."""
+
+        config: MachineConfig = MachineConfig(
+            rotors=tuple(ROTORS[name].init_key for name in ("III", "II", "I")),
+            notches=("XYZ", "CAB", ""),
+            ring_settings=("A", "A", "A"),
+        )
+
+        for windows in ("AAA", "ABX", "AZB", "QCY"):
+            machine: Enigma = config.machine(windows)
+            offsets: list[int] = [rotor.times_turned for rotor in machine.rotors]
+            notches: list[tuple[int, ...]] = [
+                rotor_notch_offsets(rotor) for rotor in machine.rotors[:2]
+            ]
+
+            carries: int = 0
+            double_steps: int = 0
+            for _ in range(1000):
+                carries += machine.rotors[0].current_top in machine.rotors[0].notch
+                double_steps += machine.rotors[1].current_top in machine.rotors[1].notch
+                machine._turn_rotors()
+
+            self.assertEqual(
+                step_counts(offsets, notches, 1000), (carries, double_steps)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+"""Test that tracers receive the encryption steps of each letter"""
+
+from copy import copy
+from io import StringIO
+import json
+import unittest
+
+from machine import Enigma
+from rotors import ROTOR_I, ROTOR_II, ROTOR_III, PLUGBOARD_EMPTY, REFLECTOR_B
+from tracing import JsonlTracer, RingBufferTracer, Tracer
+
+
+class TestTracing(unittest.TestCase):
+    """"""
+
+    def setUp(self) -> None:
+        """Set up the machine"""
+
+        # build machine with config B-I-II-III AAA 01.01.01 with no plugboard
+        self.machine: Enigma = Enigma(
+            rotors=[copy(ROTOR_III), copy(ROTOR_II), copy(ROTOR_I)],
+            plugboard=copy(PLUGBOARD_EMPTY),
+            reflector=copy(REFLECTOR_B),
+        )
+
+    def test_untraced(self) -> None:
+        """Test that nothing is kept when no tracer is set."""
+
+        self.machine.encrypt("AAAAA")
+
+        self.assertEqual(self.machine.log, [])
+
+    def test_ring_buffer(self) -> None:
+        """Test that the ring buffer only keeps the last letters."""
+
+        self.machine.tracer = RingBufferTracer(maxlen=2)
+
+        self.assertEqual(self.machine.encrypt("AAAAA"), " BDZG O")
+
+        # plugboard, 3 rotors, reflector, 3 rotors, plugboard and the input itself
+        self.assertEqual(len(self.machine.log), 2 * 10)
+        self.assertEqual(
+            [position for position, _ in self.machine.tracer.entries], [3, 4]
+        )
+        self.assertEqual(self.machine.log[-1][1:], ("A", "O"))
+
+    def test_jsonl(self) -> None:
+        """Test that the JSONL tracer writes one line per letter."""
+
+        sink: StringIO = StringIO()
+        self.machine.tracer = JsonlTracer(sink)
+
+        self.machine.encrypt("AAA")
+
+        lines: list[dict] = [json.loads(line) for line in sink.getvalue().splitlines()]
+
+        self.assertEqual([line["position"] for line in lines], [0, 1, 2])
+        self.assertEqual(lines[0]["steps"][-1]["output"], "B")
+
+    def test_traced_backend(self) -> None:
+        """Test that tracing still works when a compiled backend is asked for."""
+
+        self.machine.tracer = RingBufferTracer(maxlen=1)
+
+        self.assertEqual(self.machine.encrypt("A", backend="compiled"), " B")
+        self.assertEqual(len(self.machine.log), 10)
+
+    def test_incomplete_tracer(self) -> None:
+        """Test that a tracer without `record` is refused before it's used."""
+
+        # leaving `record` out is the point of this test
+        class Silent(Tracer):  # pylint: disable=abstract-method
+            """Tracer that forgot to implement `record`."""
+
+        with self.assertRaises(TypeError):
+            Silent()  # pylint: disable=abstract-class-instantiated
+
+
+if __name__ == "__main__":
+    unittest.main()